@@ -0,0 +1,245 @@
+"""
+Backfill Lambda: Rebuild derived article indexes from ArticlesTable
+
+ArticlesTable is the source of truth. Derived stores are normally kept in
+step by the write paths (create/update/delete/moderation); this function
+rebuilds them for articles written before a store existed.
+
+Targets:
+- feed: PublicFeedTable entries for approved (or legacy, no status) public articles
+- geohash: base-32 geohash/gh5 (geo.py) for articles that still carry the
+  old "lat,lng" strings; runs before approved_index so geoCell can be derived
+- approved_index: sparse approvedOwnerId + geoCell attributes
+  (gsi_approved_owner_createdAt, gsi_geo_cell) for the same articles; legacy
+  items without status were never approved by moderation, so they only get
+  them from here. Also counts the same articles into the map cluster tree
+  (clusterPoint, map_clusters.py) - each one once, so it can be rerun
+- search_index: SearchIndexTable token postings and type-ahead suggestions
+  (search_index.py) for the same articles; stale postings of articles that
+  are no longer visible are removed. Rerun after a change to tokenization
+  (e.g. diacritic folding): postings are re-keyed from the doc item diff.
+  Also fills tf/dl on postings written before BM25 ranking and the
+  collection counters (df, #stats) - each article counts once, and the
+  typo-tolerance vocabulary with its trigram items (fuzzy.py)
+- map_tiles: rebuilds every static map tile (map_tiles.py) that holds a
+  visible article or was written before, then invalidates tiles/* once.
+  Writes tiles directly: run it with MapUpdatesQueue drained
+- feed_shards: migration after changing FEED_SHARDS - moves every feed entry
+  that sits in another partition than feed_shard_key(articleId) (including the
+  old single "public" partition) to its current shard
+
+Usage:
+- Manual invoke from AWS Console
+- Event parameters: {"targets": ["feed", "geohash", "approved_index", "search_index", "map_tiles", "feed_shards"]}  (default: all targets)
+"""
+import os
+import boto3
+
+from feed_store import (
+    feed_table, is_feed_visible, put_feed_entry, delete_feed_entry, sync_sparse_attrs,
+    feed_shard_key, FEED_META_KEY, FEED_SHARDS
+)
+from search_index import search_table, sync_search_index
+from geo import encode, GEOHASH_PRECISION, GH5_PRECISION
+from map_clusters import cluster_point
+from map_tiles import MAP_TILES_BUCKET, point_tile, list_tiles, rebuild_tiles
+
+dynamodb = boto3.resource('dynamodb')
+
+TABLE_NAME = os.environ.get('TABLE_NAME', '')
+articles_table = dynamodb.Table(TABLE_NAME) if TABLE_NAME else None
+
+ALL_TARGETS = ['feed', 'geohash', 'approved_index', 'search_index', 'map_tiles', 'feed_shards']
+ARTICLE_TARGETS = ('feed', 'geohash', 'approved_index', 'search_index', 'map_tiles')  # targets driven by the ArticlesTable scan
+
+
+def scan_articles():
+    """Yield every article in ArticlesTable, page by page"""
+    scan_kwargs = {}
+    while True:
+        response = articles_table.scan(**scan_kwargs)
+        for item in response.get('Items', []):
+            yield item
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def scan_feed_entries():
+    """Yield every entry in PublicFeedTable, page by page"""
+    scan_kwargs = {}
+    while True:
+        response = feed_table.scan(**scan_kwargs)
+        for item in response.get('Items', []):
+            yield item
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def reshard_feed_entry(entry):
+    """Move one feed entry to its partition under the current FEED_SHARDS; returns True if moved"""
+    if entry.get('feedKey') == FEED_META_KEY['feedKey'] or not entry.get('articleId'):
+        return False
+    target = feed_shard_key(entry['articleId'])
+    if entry['feedKey'] == target:
+        return False
+    # Write the new copy first: a reader never sees the article missing
+    feed_table.put_item(Item={**entry, 'feedKey': target})
+    feed_table.delete_item(Key={'feedKey': entry['feedKey'], 'sortKey': entry['sortKey']})
+    return True
+
+
+def backfill_feed(article):
+    """Write/remove the feed entry for one article; returns True if it is in the feed"""
+    if is_feed_visible(article):
+        return put_feed_entry(article)
+    delete_feed_entry(article)
+    return False
+
+
+def backfill_geohash(article):
+    """Rewrite geohash/gh5 from lat/lng when stale (updates `article` too); returns True if changed"""
+    if article.get('lat') is None or article.get('lng') is None:
+        return False
+    geohash = encode(article['lat'], article['lng'], GEOHASH_PRECISION)
+    if article.get('geohash') == geohash and article.get('gh5') == geohash[:GH5_PRECISION]:
+        return False
+    articles_table.update_item(
+        Key={'articleId': article['articleId']},
+        UpdateExpression='SET geohash = :geohash, gh5 = :gh5',
+        ConditionExpression='attribute_exists(articleId)',
+        ExpressionAttributeValues={':geohash': geohash, ':gh5': geohash[:GH5_PRECISION]},
+    )
+    article['geohash'] = geohash
+    article['gh5'] = geohash[:GH5_PRECISION]
+    return True
+
+
+def backfill_approved_index(article):
+    """Set/remove approvedOwnerId, geoCell and clusterPoint for one article; returns True if changed"""
+    return sync_sparse_attrs(article)
+
+
+def lambda_handler(event, context):
+    """
+    Lambda handler for backfilling derived article indexes
+
+    Event parameters:
+        - targets (list): subset of ALL_TARGETS to rebuild (default: all)
+
+    Returns:
+        dict: Summary of backfill operation
+    """
+    print("="*60)
+    print("ARTICLE INDEXES BACKFILL")
+    print("="*60)
+
+    event = event or {}
+    targets = [t for t in (event.get('targets') or ALL_TARGETS) if t in ALL_TARGETS]
+
+    if not articles_table:
+        error_msg = "Articles table not configured"
+        print(f"ERROR: {error_msg}")
+        return {'statusCode': 500, 'body': {'success': False, 'error': error_msg}}
+
+    if 'search_index' in targets and not search_table:
+        error_msg = "Search index table not configured"
+        print(f"ERROR: {error_msg}")
+        return {'statusCode': 500, 'body': {'success': False, 'error': error_msg}}
+
+    if 'map_tiles' in targets and not MAP_TILES_BUCKET:
+        error_msg = "Map tiles bucket not configured"
+        print(f"ERROR: {error_msg}")
+        return {'statusCode': 500, 'body': {'success': False, 'error': error_msg}}
+
+    if ('feed' in targets or 'feed_shards' in targets) and not feed_table:
+        error_msg = "Feed table not configured"
+        print(f"ERROR: {error_msg}")
+        return {'statusCode': 500, 'body': {'success': False, 'error': error_msg}}
+
+    print(f"Configuration:")
+    print(f"  - Articles Table: {TABLE_NAME}")
+    print(f"  - Targets: {targets}")
+    print(f"  - Feed Shards: {FEED_SHARDS}")
+    print()
+
+    results = {
+        'success': False,
+        'articles_scanned': 0,
+        'feed_entries': 0,
+        'geohash_updates': 0,
+        'approved_index_updates': 0,
+        'feed_entries_moved': 0,
+        'search_postings_added': 0,
+        'search_postings_removed': 0,
+        'map_tiles_written': 0,
+        'errors': []
+    }
+
+    try:
+        tiles = set()
+        if any(t in targets for t in ARTICLE_TARGETS):
+            for article in scan_articles():
+                results['articles_scanned'] += 1
+
+                if 'feed' in targets and backfill_feed(article):
+                    results['feed_entries'] += 1
+
+                if 'geohash' in targets and backfill_geohash(article):
+                    results['geohash_updates'] += 1
+
+                if 'approved_index' in targets and backfill_approved_index(article):
+                    results['approved_index_updates'] += 1
+
+                if 'search_index' in targets:
+                    added, removed = sync_search_index(article)
+                    results['search_postings_added'] += added
+                    results['search_postings_removed'] += removed
+
+                if 'map_tiles' in targets and is_feed_visible(article):
+                    point = cluster_point(article)
+                    if point:
+                        tiles.add(point_tile(point))
+
+        if 'map_tiles' in targets:
+            # Tiles written before whose articles are all gone are rewritten empty
+            tiles |= list_tiles()
+            results['map_tiles_written'] = len(rebuild_tiles(tiles))
+
+        if 'feed_shards' in targets:
+            for entry in scan_feed_entries():
+                if reshard_feed_entry(entry):
+                    results['feed_entries_moved'] += 1
+
+        results['success'] = True
+
+    except Exception as e:
+        error_msg = f"Backfill failed: {str(e)}"
+        print(f"ERROR: {error_msg}")
+        import traceback
+        traceback.print_exc()
+        results['errors'].append(error_msg)
+
+    # Summary
+    print("\n" + "="*60)
+    print("BACKFILL SUMMARY")
+    print("="*60)
+    print(f"Success: {results['success']}")
+    print(f"Articles Scanned: {results['articles_scanned']}")
+    print(f"Feed Entries: {results['feed_entries']}")
+    print(f"Geohash Updates: {results['geohash_updates']}")
+    print(f"Approved Index Updates: {results['approved_index_updates']}")
+    print(f"Feed Entries Moved: {results['feed_entries_moved']}")
+    print(f"Search Postings Added/Removed: {results['search_postings_added']}/{results['search_postings_removed']}")
+    print(f"Map Tiles Written: {results['map_tiles_written']}")
+    if results['errors']:
+        print(f"Errors: {len(results['errors'])}")
+        for error in results['errors']:
+            print(f"  - {error}")
+    print("="*60)
+
+    return {
+        'statusCode': 200 if results['success'] else 500,
+        'body': results
+    }
@@ -10,20 +10,40 @@ Purpose:
 - Can be run manually or scheduled
 
 Process:
-1. Clear existing GalleryTrendsTable (optional, controlled by parameter)
-2. Scan all photos from GalleryPhotosTable
-3. Count tags across all photos
-4. Write aggregated counts to GalleryTrendsTable
+1. Scan all photos from GalleryPhotosTable (parallel segments, streamed)
+2. Count tags across all photos as they arrive
+3. Clear existing GalleryTrendsTable (optional, controlled by parameter)
+4. Write aggregated counts to GalleryTrendsTable, then the top-K
+   leaderboard item and its tag counter (trending_board.py)
+5. Rebuild the hourly / daily buckets of the 24h / 7d windows from the
+   photos created inside them (clear_existing also deleted the old ones)
+
+If the scan runs out of Lambda time, nothing is cleared or written.
+
+With {"board_only": true} only the all-time leaderboard is rebuilt, from
+the tag rows of GalleryTrendsTable (no photo scan), and only when
+update_board marked it dirty after giving up a merge - cheap enough to run
+on a schedule (BoardRebuild event).
+
+With {"tag_index": true} the same scan also writes the tag -> photo index
+entries (GalleryTagPhotosTable, gallery_tag_index.py) of every photo as it
+streams in - for photos saved before the index existed. Those writes are
+idempotent, so a run that stops early can simply be rerun.
 
 Usage:
 - Manual invoke from AWS Console
-- Can pass event parameter: {"clear_existing": true/false}
+- Can pass event parameters: {"clear_existing": true/false, "tag_index": true/false, "board_only": true/false}
 """
 import os
 import boto3
 from collections import defaultdict
 from datetime import datetime, timezone
 from decimal import Decimal
+from parallel_scan import ParallelScan
+from gallery_tag_index import tag_photos_table, index_entries
+from trending_board import (
+    write_board, read_board, write_buckets, bucket_start, window_keys, bucket_key, WINDOWS,
+)
 
 dynamodb = boto3.resource('dynamodb')
 
@@ -33,8 +53,10 @@ GALLERY_TRENDS_TABLE = os.environ.get('GALLERY_TRENDS_TABLE', '')
 photos_table = dynamodb.Table(GALLERY_PHOTOS_TABLE) if GALLERY_PHOTOS_TABLE else None
 trends_table = dynamodb.Table(GALLERY_TRENDS_TABLE) if GALLERY_TRENDS_TABLE else None
 
+SCAN_SEGMENTS = 8
+
 
-def clear_trends_table():
+def clear_trends_table(context=None):
     """Clear all items from GalleryTrendsTable"""
     if not trends_table:
         print("Trends table not configured")
@@ -43,21 +65,19 @@ def clear_trends_table():
     try:
         print("Clearing existing trends data...")
         
-        # Scan all items
-        response = trends_table.scan()
-        items = response.get('Items', [])
-        
-        # Handle pagination
-        while 'LastEvaluatedKey' in response:
-            response = trends_table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
-            items.extend(response.get('Items', []))
-        
-        # Delete all items
+        # Parallel scan (keys only), deleting as the items stream in
+        scan = ParallelScan(
+            GALLERY_TRENDS_TABLE, SCAN_SEGMENTS, key_attrs=('tag_name',), context=context,
+            ProjectionExpression='tag_name',
+        )
         with trends_table.batch_writer() as batch:
-            for item in items:
+            for item in scan:
                 batch.delete_item(Key={'tag_name': item['tag_name']})
         
-        print(f"✓ Cleared {len(items)} existing trend records")
+        if scan.truncated:
+            print(f"Stopped after {scan.item_count} trend records: Lambda time budget spent")
+            return False
+        print(f"✓ Cleared {scan.item_count} existing trend records")
         return True
         
     except Exception as e:
@@ -65,30 +85,93 @@ def clear_trends_table():
         return False
 
 
-def scan_all_photos():
-    """Scan all photos from GalleryPhotosTable"""
+def rebuild_dirty_board(context=None):
+    """
+    Rebuild the leaderboard from the tag rows if it is marked dirty.
+    Returns 'clean', 'rebuilt' or 'retry' (scan cut short, or the board
+    changed meanwhile: it stays dirty for the next run).
+    """
+    board = read_board(consistent=True)
+    if not board or not board.get('dirty'):
+        return 'clean'
+    print(f"Rebuilding dirty leaderboard (version {board.get('version')})...")
+    scan = ParallelScan(
+        GALLERY_TRENDS_TABLE, SCAN_SEGMENTS, key_attrs=('tag_name',), context=context,
+        ProjectionExpression='tag_name, #count, cover_image, last_updated',
+        ExpressionAttributeNames={'#count': 'count'},
+    )
+    # Buckets and the board itself share the table: tag rows never start with "#"
+    rows = [item for item in scan if not item['tag_name'].startswith('#')]
+    if scan.truncated:
+        print(f"Stopped after {scan.item_count} trend records: Lambda time budget spent")
+        return 'retry'
+    try:
+        write_board(rows, version=board['version'])
+    except trends_table.meta.client.exceptions.ConditionalCheckFailedException:
+        print("Leaderboard changed during the rebuild: left dirty for the next run")
+        return 'retry'
+    print(f"✓ Rebuilt leaderboard from {len(rows)} tag rows")
+    return 'rebuilt'
+
+
+def scan_all_photos(context=None):
+    """
+    Stream all photos from GalleryPhotosTable (parallel segmented scan).
+    Iterate the returned ParallelScan once; check .truncated afterwards.
+    """
     if not photos_table:
         print("Photos table not configured")
-        return []
+        return None
     
+    print(f"Scanning all photos from GalleryPhotosTable ({SCAN_SEGMENTS} segments)...")
+    # Only what aggregate_tag_counts() and index_entries() read
+    return ParallelScan(
+        GALLERY_PHOTOS_TABLE, SCAN_SEGMENTS, key_attrs=('photo_id',), context=context,
+        ProjectionExpression='photo_id, tags, image_url, imageKeys, imageKey, created_at, #status',
+        ExpressionAttributeNames={'#status': 'status'},
+    )
+
+
+def parse_time(value):
     try:
-        print("Scanning all photos from GalleryPhotosTable...")
-        
-        all_photos = []
-        response = photos_table.scan()
-        all_photos.extend(response.get('Items', []))
-        
-        # Handle pagination
-        while 'LastEvaluatedKey' in response:
-            response = photos_table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
-            all_photos.extend(response.get('Items', []))
-        
-        print(f"✓ Found {len(all_photos)} photos")
-        return all_photos
-        
-    except Exception as e:
-        print(f"Failed to scan photos: {e}")
-        return []
+        at = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    return at if at.tzinfo else at.replace(tzinfo=timezone.utc)
+
+
+def bucket_photos(photos, buckets, now):
+    """
+    Pass photos through, counting the recent ones into the window buckets
+    they were created in: {(window, bucket start): {'counts', 'covers', 'last_updated'}}
+    """
+    live_keys = {window: set(window_keys(window, now)) for window in WINDOWS}
+    for photo in photos:
+        created = parse_time(photo.get('created_at'))
+        tags = list(dict.fromkeys(tag.lower() for tag in photo.get('tags') or []))
+        for window in (WINDOWS if created and tags else ()):
+            if bucket_key(window, created) not in live_keys[window]:
+                continue
+            bucket = buckets.setdefault((window, bucket_start(window, created)), {
+                'counts': defaultdict(int), 'covers': {}, 'cover_times': {}, 'last_updated': '',
+            })
+            bucket['last_updated'] = max(bucket['last_updated'], created.isoformat())
+            for tag in tags:
+                bucket['counts'][tag] += 1
+                # Latest image as the cover, like the live path
+                if get_display_key(photo) and created.isoformat() >= bucket['cover_times'].get(tag, ''):
+                    bucket['covers'][tag] = get_display_key(photo)
+                    bucket['cover_times'][tag] = created.isoformat()
+        yield photo
+
+
+def index_photos(photos, batch, counter):
+    """Pass photos through, writing their tag index entries on the way"""
+    for photo in photos:
+        for entry in index_entries(photo):
+            batch.put_item(Item=entry)
+            counter['entries'] += 1
+        yield photo
 
 
 def get_display_key(photo):
@@ -187,6 +270,7 @@ def write_trends_to_table(tag_data):
         timestamp = datetime.now(timezone.utc).isoformat()
         
         # Batch write for efficiency
+        items = []
         with trends_table.batch_writer() as batch:
             for tag_name, data in tag_data.items():
                 item = {
@@ -196,8 +280,12 @@ def write_trends_to_table(tag_data):
                     'last_updated': timestamp
                 }
                 batch.put_item(Item=item)
+                items.append(item)
         
-        print(f"✓ Successfully wrote {len(tag_data)} trend records")
+        # Leaderboard last: the endpoint reads only this item
+        write_board(items, tag_count=len(items))
+        
+        print(f"✓ Successfully wrote {len(tag_data)} trend records (+ leaderboard)")
         return True
         
     except Exception as e:
@@ -214,6 +302,10 @@ def lambda_handler(event, context):
     Event parameters:
         - clear_existing (bool): Whether to clear existing trends before backfill
           Default: True (recommended for full rebuild)
+        - tag_index (bool): Also write the tag -> photo index entries of every photo
+          Default: False
+        - board_only (bool): Only rebuild the leaderboard from the tag rows, if dirty
+          Default: False
     
     Returns:
         dict: Summary of backfill operation
@@ -234,13 +326,32 @@ def lambda_handler(event, context):
             }
         }
     
+    if event.get('board_only'):
+        try:
+            board_status = rebuild_dirty_board(context)
+        except Exception as e:
+            print(f"ERROR: Leaderboard rebuild failed: {e}")
+            return {'statusCode': 500, 'body': {'success': False, 'error': str(e)}}
+        return {'statusCode': 200, 'body': {'success': board_status != 'retry', 'board': board_status}}
+
     # Get parameters
     clear_existing = event.get('clear_existing', True)
+    tag_index = bool(event.get('tag_index', False))
+    
+    if tag_index and not tag_photos_table:
+        return {
+            'statusCode': 500,
+            'body': {
+                'success': False,
+                'error': "Gallery tag index table not configured"
+            }
+        }
     
     print(f"Configuration:")
     print(f"  - Photos Table: {GALLERY_PHOTOS_TABLE}")
     print(f"  - Trends Table: {GALLERY_TRENDS_TABLE}")
     print(f"  - Clear Existing: {clear_existing}")
+    print(f"  - Tag Index: {tag_index}")
     print()
     
     results = {
@@ -249,21 +360,38 @@ def lambda_handler(event, context):
         'tags_aggregated': 0,
         'trends_written': 0,
         'cleared_records': 0,
+        'tag_index_entries': 0,
+        'buckets_written': 0,
         'errors': []
     }
     
     try:
-        # Step 1: Clear existing trends (if requested)
-        if clear_existing:
-            if not clear_trends_table():
-                results['errors'].append("Failed to clear existing trends")
-                # Continue anyway
+        # Step 1+2: Scan all photos, counting tags as they stream in
+        photos = scan_all_photos(context)
+        buckets = {}
+        stream = bucket_photos(photos, buckets, datetime.now(timezone.utc))
+        if tag_index:
+            counter = {'entries': 0}
+            with tag_photos_table.batch_writer() as batch:
+                tag_data = aggregate_tag_counts(index_photos(stream, batch, counter))
+            results['tag_index_entries'] = counter['entries']
+            print(f"✓ Wrote {counter['entries']} tag index entries")
+        else:
+            tag_data = aggregate_tag_counts(stream)
+        results['photos_scanned'] = photos.item_count
+        print(f"✓ Found {photos.item_count} photos")
         
-        # Step 2: Scan all photos
-        photos = scan_all_photos()
-        results['photos_scanned'] = len(photos)
+        if photos.truncated:
+            # Partial counts would overwrite good ones: leave the table as it is
+            error_msg = f"Photo scan stopped after {photos.item_count} photos: Lambda time budget spent"
+            print(f"ERROR: {error_msg}")
+            results['errors'].append(error_msg)
+            return {
+                'statusCode': 500,
+                'body': results
+            }
         
-        if not photos:
+        if not photos.item_count:
             error_msg = "No photos found in GalleryPhotosTable"
             print(f"WARNING: {error_msg}")
             results['errors'].append(error_msg)
@@ -272,9 +400,12 @@ def lambda_handler(event, context):
                 'body': results
             }
         
-        # Step 3: Aggregate tag counts
-        tag_data = aggregate_tag_counts(photos)
+        # Step 3: Clear existing trends (if requested), once the new counts are known
         results['tags_aggregated'] = len(tag_data)
+        if clear_existing:
+            if not clear_trends_table(context):
+                results['errors'].append("Failed to clear existing trends")
+                # Continue anyway
         
         if not tag_data:
             error_msg = "No tags found in photos"
@@ -292,6 +423,14 @@ def lambda_handler(event, context):
         else:
             results['errors'].append("Failed to write trends to table")
         
+        # Step 5: Window buckets (24h / 7d)
+        write_buckets({
+            key: {'counts': dict(b['counts']), 'covers': b['covers'], 'last_updated': b['last_updated']}
+            for key, b in buckets.items()
+        })
+        results['buckets_written'] = len(buckets)
+        print(f"✓ Wrote {len(buckets)} trending window buckets")
+        
     except Exception as e:
         error_msg = f"Backfill failed: {str(e)}"
         print(f"ERROR: {error_msg}")
@@ -307,6 +446,8 @@ def lambda_handler(event, context):
     print(f"Photos Scanned: {results['photos_scanned']}")
     print(f"Tags Aggregated: {results['tags_aggregated']}")
     print(f"Trends Written: {results['trends_written']}")
+    print(f"Tag Index Entries: {results['tag_index_entries']}")
+    print(f"Window Buckets: {results['buckets_written']}")
     if results['errors']:
         print(f"Errors: {len(results['errors'])}")
         for error in results['errors']:
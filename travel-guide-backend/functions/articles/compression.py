@@ -0,0 +1,102 @@
+"""
+Response compression negotiated from Accept-Encoding
+
+compress_response() takes a finished API Gateway proxy response and, when
+the client accepts it and the body is big enough to be worth the CPU,
+replaces the body with a gzip/brotli-compressed, base64-encoded one
+(isBase64Encoded=true, Content-Encoding set). Small bodies are returned
+untouched - below ~1 KB compression saves little and can even grow the
+payload. API Gateway only decodes base64 bodies because the API declares
+BinaryMediaTypes */* (template.yaml), which also makes every request body
+arrive base64-encoded (README, "Response Compression"). Vary is only set on
+bodies big enough to be negotiated.
+
+brotli is optional: without the package only gzip is offered.
+Keep functions/auth/compression.py in sync.
+"""
+import os
+import gzip
+import base64
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESSION_MIN_BYTES = int(os.environ.get("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", "4"))  # 4-5: near gzip-9 ratio at gzip-6 speed
+
+
+def accepted_encodings(event):
+    """{encoding: q} from the request's Accept-Encoding header"""
+    headers = (event or {}).get("headers") or {}
+    value = headers.get("Accept-Encoding") or headers.get("accept-encoding") or ""
+    accepted = {}
+    for part in value.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name] = q
+    return accepted
+
+
+def choose_encoding(event):
+    """'br', 'gzip' or None - brotli preferred when available and accepted"""
+    accepted = accepted_encodings(event)
+    wildcard = accepted.get("*", 0.0)
+    offers = (["br"] if brotli else []) + ["gzip"]
+    best, best_q = None, 0.0
+    for encoding in offers:
+        q = accepted.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def compress_response(response, event):
+    """Compress response['body'] in place if the client accepts it and it's big enough"""
+    body = response.get("body")
+    if not body or response.get("isBase64Encoded"):
+        return response
+
+    data = body.encode("utf-8")
+    if len(data) < COMPRESSION_MIN_BYTES:
+        return response  # never compressed: same bytes for every client, no Vary
+
+    # From here the representation depends on Accept-Encoding (even when the
+    # client gets identity), so shared caches must key on it
+    headers = response.setdefault("headers", {})
+    headers["Vary"] = "Accept-Encoding"
+
+    encoding = choose_encoding(event)
+    if not encoding:
+        return response
+
+    compressed = compress(data, encoding)
+    if len(compressed) >= len(data):
+        return response
+
+    response["body"] = base64.b64encode(compressed).decode("ascii")
+    response["isBase64Encoded"] = True
+    headers["Content-Encoding"] = encoding
+    headers.setdefault("Content-Type", "application/json")
+    # Different bytes than the identity representation: strong ETag -> weak
+    etag = headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        headers["ETag"] = "W/" + etag
+    return response
@@ -1,22 +1,68 @@
 # cors.py
-import os, json
+# Keep functions/auth/cors.py in sync.
+import os, hashlib
+from compression import compress_response
+from json_encoder import dumps
 
 CORS_ORIGIN = os.getenv("CORS_ORIGIN", "*")
 
 def cors_headers():
     return {
         "Access-Control-Allow-Origin": CORS_ORIGIN,  # dev có thể dùng '*'
-        "Access-Control-Allow-Headers": "Content-Type,Authorization,X-User-Id",
+        "Access-Control-Allow-Headers": "Content-Type,Authorization,X-User-Id,If-None-Match",
         "Access-Control-Allow-Methods": "OPTIONS,GET,POST,PATCH,DELETE",
+        "Access-Control-Expose-Headers": "ETag",
     }
 
-def ok(status, body):
-    return {"statusCode": status, "headers": cors_headers(),
-            "body": json.dumps(body, ensure_ascii=False)}
+# ---- Conditional GET (ETag / If-None-Match) ----
+# content_etag: hash of the serialized body (saves bytes, not work)
+# version_etag: built from cheap version values (updatedAt, page fingerprint...)
+#   so a handler can answer 304 before enriching / serializing the response
+
+def content_etag(payload):
+    return '"' + hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32] + '"'
+
+def version_etag(*parts):
+    raw = "|".join(str(p) for p in parts)
+    return '"v-' + hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32] + '"'
+
+def if_none_match(event, etag):
+    """True if the request's If-None-Match already names this etag"""
+    headers = (event or {}).get("headers") or {}
+    value = headers.get("If-None-Match") or headers.get("if-none-match")
+    if not value or not etag:
+        return False
+    candidates = [v.strip() for v in value.split(",")]
+    # Weak comparison: W/"x" matches "x" (CDNs may weaken tags after compression)
+    return "*" in candidates or etag in [c[2:] if c.startswith("W/") else c for c in candidates]
+
+def not_modified(etag):
+    headers = cors_headers()
+    headers["ETag"] = etag
+    headers["Cache-Control"] = "private, no-cache"
+    return {"statusCode": 304, "headers": headers, "body": ""}
+
+def ok(status, body, event=None, etag=None):
+    """
+    JSON response. Pass the request `event` to get an ETag (content hash
+    unless `etag` is given; GET 200 only), a 304 when the client already has
+    it, and gzip/brotli compression negotiated from Accept-Encoding.
+    """
+    payload = dumps(body)
+    headers = cors_headers()
+    if event is None:
+        return {"statusCode": status, "headers": headers, "body": payload}
+    if status == 200:
+        etag = etag or content_etag(payload)
+        if if_none_match(event, etag):
+            return not_modified(etag)
+        headers["ETag"] = etag
+        headers["Cache-Control"] = "private, no-cache"
+    return compress_response({"statusCode": status, "headers": headers, "body": payload}, event)
 
 def options():
     return {"statusCode": 204, "headers": cors_headers(), "body": ""}
 
 def error(status, msg):
     return {"statusCode": status, "headers": cors_headers(),
-            "body": json.dumps({"error": msg}, ensure_ascii=False)}
+            "body": dumps({"error": msg})}
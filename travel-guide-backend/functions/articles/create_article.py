@@ -9,6 +9,8 @@ import boto3
 import urllib.request
 import urllib.parse
 from cors import options, ok, error  # Giả định các hàm này đã được định nghĩa trong file cors.py
+from search_index import queue_search_sync
+from geo import encode as geohash_encode, GH5_PRECISION
 
 # Clients
 s3 = boto3.client("s3")
@@ -169,6 +171,8 @@ def lambda_handler(event, context):
             cover_image_key = valid_image_keys[0]  # Ảnh cover là ảnh đầu tiên
             thumbnail_key = _thumb_from_image_key(cover_image_key)  # Tạo thumbnailKey từ ảnh cover
 
+        geohash = geohash_encode(lat_f, lng_f)
+
         # Build item
         item = {
             "articleId": article_id,
@@ -183,8 +187,8 @@ def lambda_handler(event, context):
             # Chuyển float sang Decimal cho DynamoDB
             "lat": Decimal(str(lat_f)),
             "lng": Decimal(str(lng_f)),
-            "geohash": f"{lat_f:.6f},{lng_f:.6f}",
-            "gh5": f"{lat_f:.2f},{lng_f:.2f}",
+            "geohash": geohash,  # base-32, ~5 m (geo.py)
+            "gh5": geohash[:GH5_PRECISION],
             "tags": tags,
             "favoriteCount": 0,  # Khởi tạo counter
         }
@@ -232,18 +236,11 @@ def lambda_handler(event, context):
         
         # Lưu vào DynamoDB
         table.put_item(Item=item)
-
-        # Chuẩn bị response (chuyển Decimal → float/int)
-        resp = {}
-        for k, v in item.items():
-            if isinstance(v, Decimal):
-                # Chuyển Decimal sang float hoặc int
-                resp[k] = int(v) if v % 1 == 0 else float(v)
-            else:
-                resp[k] = v
+        # Indexed once approved + public; a no-op while the post is pending
+        queue_search_sync(item, is_new=True)
 
         print(f"Article created: {article_id} by user {owner_id}")
-        return ok(201, resp)
+        return ok(201, item)  # Decimals are converted by the encoder
 
     except Exception as e:
         print(f"Create error: {e}")
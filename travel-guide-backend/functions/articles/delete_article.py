@@ -2,6 +2,9 @@ import os
 import json
 import boto3
 from cors import options, ok, error
+from feed_store import delete_feed_entry
+from search_index import queue_search_removal
+from map_clusters import CLUSTER_ATTR, queue_map_move
 
 dynamodb = boto3.resource("dynamodb")
 s3 = boto3.client("s3")
@@ -42,7 +45,12 @@ def lambda_handler(event, context):
             return error(403, "Forbidden: You do not own this article")
 
         # 🗑️ Xóa DB
-        table.delete_item(Key={"articleId": article_id})
+        deleted = table.delete_item(Key={"articleId": article_id}, ReturnValues="ALL_OLD").get("Attributes")
+        delete_feed_entry(article)
+        queue_search_removal(article_id)
+        if deleted and deleted.get(CLUSTER_ATTR):
+            # Chỉ request xoá thật sự (ALL_OLD) mới trừ khỏi map clusters
+            queue_map_move(article_id, deleted[CLUSTER_ATTR], None)
 
         # 🖼️ Xóa ảnh S3
         image_key = article.get("imageKey")
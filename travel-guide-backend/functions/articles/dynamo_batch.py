@@ -0,0 +1,42 @@
+"""
+Chunked BatchGetItem with UnprocessedKeys retry
+"""
+import time
+import boto3
+
+dynamodb = boto3.resource("dynamodb")
+
+BATCH_GET_LIMIT = 100  # DynamoDB BatchGetItem hard limit
+MAX_BATCH_RETRIES = 5
+
+
+def batch_get_items(table_name, keys, projection=None, attribute_names=None):
+    """
+    Fetch items by primary key in chunks of 100, retrying throttled
+    (unprocessed) keys with exponential backoff. Order is not preserved;
+    keys that don't exist are simply absent from the result.
+    """
+    found = []
+    for start in range(0, len(keys), BATCH_GET_LIMIT):
+        chunk = keys[start:start + BATCH_GET_LIMIT]
+        table_request = {'Keys': chunk}
+        if projection:
+            table_request['ProjectionExpression'] = projection
+        if attribute_names:
+            table_request['ExpressionAttributeNames'] = attribute_names
+        request = {table_name: table_request}
+
+        attempt = 0
+        while request:
+            response = dynamodb.batch_get_item(RequestItems=request)
+            found.extend(response.get('Responses', {}).get(table_name, []))
+
+            request = response.get('UnprocessedKeys') or None
+            if request:
+                attempt += 1
+                if attempt > MAX_BATCH_RETRIES:
+                    print(f"⚠️ Giving up on {len(request[table_name]['Keys'])} unprocessed keys in {table_name}")
+                    break
+                # Exponential backoff before retrying throttled keys
+                time.sleep(0.05 * (2 ** attempt))
+    return found
@@ -6,6 +6,7 @@ from datetime import datetime, timezone
 import boto3
 from boto3.dynamodb.conditions import Key
 from cors import ok, error, options
+from feed_store import update_feed_favorite_count
 
 dynamodb = boto3.resource("dynamodb")
 
@@ -72,15 +73,19 @@ def lambda_handler(event, context):
         )
 
         # Tăng favoriteCount trong articles table
-        articles_table.update_item(
+        updated = articles_table.update_item(
             Key={"articleId": article_id},
             UpdateExpression="SET favoriteCount = if_not_exists(favoriteCount, :zero) + :inc",
             ExpressionAttributeValues={
                 ":zero": 0,
                 ":inc": 1
-            }
+            },
+            ReturnValues="ALL_NEW"
         )
 
+        # Keep the public feed card's count in step
+        update_feed_favorite_count(updated.get("Attributes", {}))
+
         return ok(200, {
             "message": "Article favorited",
             "userId": user_id,
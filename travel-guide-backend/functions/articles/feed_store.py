@@ -0,0 +1,363 @@
+"""
+Public feed store - materialized view of approved public articles
+
+Every approved + public article has one compact entry in PublicFeedTable:
+    feedKey = "public#<shard>"              (partition, shard = hash(articleId) % FEED_SHARDS)
+    sortKey = "<createdAt>#<articleId>"     (newest-first range key)
+
+The public feed is a key-range read per shard that always fills the
+requested page, instead of a filtered GSI query that throws away pending,
+rejected and private posts after paying for them. Writes are spread over
+FEED_SHARDS partition keys (FEED_SHARDS=1 keeps the single "public" key);
+query_feed_page() queries all shards in parallel and k-way merges them
+newest first. Changing FEED_SHARDS needs the backfill target "feed_shards",
+which moves existing entries to their new partition. FEED_SHARDS comes from
+the FeedShards stack parameter and has no code default: a function reading
+or writing the feed with another shard count would miss entries, so
+importing fails when FEED_TABLE_NAME is set without it.
+
+The same articles also carry a sparse attribute on ArticlesTable:
+    approvedOwnerId = ownerId               (only while approved + public)
+which feeds the sparse GSI gsi_approved_owner_createdAt, so a user's public
+profile page is a plain key-range query with no FilterExpression, and
+    geoCell = geohash prefix                (see geo.py)
+which feeds the sparse GSI gsi_geo_cell used by bbox searches, and
+    clusterPoint = {cell, lat, lng, ...}    (see map_clusters.py)
+which records where the article is counted in the map cluster tree and
+shown on the static map tiles.
+
+There is no global feed version: list_articles derives its ETag from the
+page it read (entries minus favoriteCount), so writes spread over the
+shards never meet on one item. FEED_META_KEY is the meta item older
+versions bumped on every write; the reshard backfill skips it.
+
+Writers: content moderation (approve / reject), update_article, delete_article,
+detect_labels (autoTags) and the backfill Lambda. Keep functions/rekognition/feed_store.py in sync.
+"""
+import os
+import hashlib
+import threading
+import boto3
+from concurrent.futures import ThreadPoolExecutor
+from geo import GEO_CELL_ATTR, geo_cell
+from map_clusters import CLUSTER_ATTR, clusters_table, cluster_point, queue_map_move
+
+dynamodb = boto3.resource("dynamodb")
+
+FEED_TABLE_NAME = os.environ.get("FEED_TABLE_NAME", "")
+feed_table = dynamodb.Table(FEED_TABLE_NAME) if FEED_TABLE_NAME else None
+TABLE_NAME = os.environ.get("TABLE_NAME", "")
+articles_table = dynamodb.Table(TABLE_NAME) if TABLE_NAME else None
+
+FEED_PARTITION = "public"
+if FEED_TABLE_NAME and not os.environ.get("FEED_SHARDS"):
+    raise RuntimeError("FEED_SHARDS is not set (FeedShards stack parameter)")
+FEED_SHARDS = max(1, int(os.environ.get("FEED_SHARDS") or "1"))
+# Items read per shard per page ~ limit / shards * overfetch; a shard that runs
+# dry before the page is full is topped up with another query
+FEED_SHARD_OVERFETCH = float(os.environ.get("FEED_SHARD_OVERFETCH", "1.5"))
+FEED_META_KEY = {"feedKey": "#meta", "sortKey": "version"}  # legacy, no longer written
+APPROVED_OWNER_ATTR = "approvedOwnerId"
+APPROVED_OWNER_INDEX = "gsi_approved_owner_createdAt"
+
+# Fields copied into a feed entry (everything a feed card renders).
+# Search helpers (*Lower), labelDetails, imageMetadata, validation/moderation
+# details stay on the article and are served by get_article only.
+FEED_FIELDS = (
+    "articleId", "ownerId", "username", "title", "content", "createdAt",
+    "visibility", "status", "lat", "lng", "locationName", "tags", "autoTags",
+    "imageKey", "imageKeys", "thumbnailKey", "favoriteCount",
+)
+
+
+def is_feed_visible(item):
+    """Approved (or legacy, no status) public articles belong in the feed"""
+    if not item or item.get("visibility") != "public":
+        return False
+    return item.get("status", "approved") == "approved"
+
+
+def feed_sort_key(item):
+    return f"{item['createdAt']}#{item['articleId']}"
+
+
+def feed_shard_key(article_id, shards=None):
+    """Feed partition of an article: stable hash of its id, so any writer finds it again"""
+    shards = shards or FEED_SHARDS
+    if shards == 1:
+        return FEED_PARTITION
+    digest = hashlib.md5(article_id.encode("utf-8")).digest()
+    return f"{FEED_PARTITION}#{int.from_bytes(digest[:4], 'big') % shards}"
+
+
+def feed_shard_keys(shards=None):
+    shards = shards or FEED_SHARDS
+    if shards == 1:
+        return [FEED_PARTITION]
+    return [f"{FEED_PARTITION}#{i}" for i in range(shards)]
+
+
+def feed_entry_key(item):
+    return {"feedKey": feed_shard_key(item["articleId"]), "sortKey": feed_sort_key(item)}
+
+
+def to_feed_entry(item):
+    """Build the compact feed entry for an article item"""
+    entry = {k: item[k] for k in FEED_FIELDS if k in item}
+    entry["status"] = "approved"
+    entry.update(feed_entry_key(item))
+    return entry
+
+
+def put_feed_entry(item):
+    if not feed_table:
+        return False
+    try:
+        feed_table.put_item(Item=to_feed_entry(item))
+        return True
+    except Exception as e:
+        print(f"⚠️ Failed to write feed entry for {item.get('articleId')}: {e}")
+        return False
+
+
+def delete_feed_entry(item):
+    if not feed_table or not item.get("createdAt") or not item.get("articleId"):
+        return False
+    try:
+        feed_table.delete_item(Key=feed_entry_key(item))
+        return True
+    except Exception as e:
+        print(f"⚠️ Failed to delete feed entry for {item.get('articleId')}: {e}")
+        return False
+
+
+def sync_sparse_attrs(item):
+    """
+    Set/remove the sparse attributes approvedOwnerId and geoCell so the
+    article is in gsi_approved_owner_createdAt and gsi_geo_cell exactly while
+    it is approved + public (geoCell also follows a moved location), and
+    clusterPoint with the map cluster tree (map_clusters.py) and the
+    static map tiles (map_tiles.py).
+    Only writes when something actually changed.
+    """
+    if not articles_table or not item or not item.get("articleId"):
+        return False
+    visible = is_feed_visible(item)
+    wanted = {
+        APPROVED_OWNER_ATTR: item.get("ownerId") if visible else None,
+        GEO_CELL_ATTR: geo_cell(item) if visible else None,
+    }
+    if clusters_table:
+        wanted[CLUSTER_ATTR] = cluster_point(item) if visible else None
+    changed = {attr: value for attr, value in wanted.items() if item.get(attr) != value}
+    if not changed:
+        return False
+    set_parts, remove_parts, names, values = [], [], {}, {}
+    condition = "attribute_exists(articleId)"
+    for i, (attr, value) in enumerate(changed.items()):
+        names[f"#a{i}"] = attr
+        if value is None:
+            remove_parts.append(f"#a{i}")
+        else:
+            set_parts.append(f"#a{i} = :v{i}")
+            values[f":v{i}"] = value
+        if attr == CLUSTER_ATTR:
+            # clusterPoint is what the cluster tree counts: only one writer may move it
+            if item.get(attr) is None:
+                condition += f" AND attribute_not_exists(#a{i})"
+            else:
+                condition += f" AND #a{i} = :old{i}"
+                values[f":old{i}"] = item[attr]
+    update_expression = " ".join(
+        part for part in (
+            "SET " + ", ".join(set_parts) if set_parts else "",
+            "REMOVE " + ", ".join(remove_parts) if remove_parts else "",
+        ) if part
+    )
+    try:
+        update_params = {
+            "Key": {"articleId": item["articleId"]},
+            "UpdateExpression": update_expression,
+            "ConditionExpression": condition,
+            "ExpressionAttributeNames": names,
+        }
+        if values:
+            update_params["ExpressionAttributeValues"] = values
+        articles_table.update_item(**update_params)
+        if CLUSTER_ATTR in changed:
+            queue_map_move(item["articleId"], item.get(CLUSTER_ATTR), changed[CLUSTER_ATTR])
+        return True
+    except Exception as e:
+        print(f"⚠️ Failed to sync {', '.join(changed)} for {item.get('articleId')}: {e}")
+        return False
+
+
+def update_feed_favorite_count(item):
+    """Copy the article's new favoriteCount onto its feed entry (if it has one)"""
+    if not feed_table or not is_feed_visible(item):
+        return False
+    try:
+        feed_table.update_item(
+            Key=feed_entry_key(item),
+            UpdateExpression="SET favoriteCount = :count",
+            ConditionExpression="attribute_exists(sortKey)",
+            ExpressionAttributeValues={":count": item.get("favoriteCount", 0)},
+        )
+        return True
+    except Exception as e:
+        print(f"⚠️ Failed to update feed favoriteCount for {item.get('articleId')}: {e}")
+        return False
+
+
+def sync_feed_entry(item):
+    """Write or remove the feed entry (and the sparse index attributes) so they match the article's current state"""
+    sync_sparse_attrs(item)
+    if is_feed_visible(item):
+        return put_feed_entry(item)
+    return delete_feed_entry(item)
+
+
+# ---- Reads: scatter-gather over the shards ----
+
+_executor = None
+_local = threading.local()
+
+
+def _pool():
+    """Module-level pool: threads (and their tables) survive warm invocations"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=max(FEED_SHARDS, 2), thread_name_prefix="feed")
+    return _executor
+
+
+def _shard_table():
+    """boto3 resources are not thread-safe: one Table object per thread"""
+    table = getattr(_local, "table", None)
+    if table is None:
+        table = _local.table = boto3.session.Session().resource("dynamodb").Table(FEED_TABLE_NAME)
+    return table
+
+
+class _ShardReader:
+    """Buffered newest-first reader over one feed shard"""
+
+    def __init__(self, shard_key, batch_size, before=None):
+        self.shard_key = shard_key
+        self.batch_size = batch_size
+        self.start_key = {"feedKey": shard_key, "sortKey": before} if before else None
+        self.buffer = []
+        self.more = True
+        self.read_calls = 0
+        self.scanned = 0
+
+    def fetch(self):
+        query_params = {
+            "KeyConditionExpression": "feedKey = :feed_key",
+            "ExpressionAttributeValues": {":feed_key": self.shard_key},
+            "ScanIndexForward": False,
+            "Limit": self.batch_size,
+        }
+        if self.start_key:
+            query_params["ExclusiveStartKey"] = self.start_key
+        response = _shard_table().query(**query_params)
+        items = response.get("Items", [])
+        self.read_calls += 1
+        self.scanned += len(items)
+        self.buffer.extend(reversed(items))  # pop() from the end = newest first
+        self.start_key = response.get("LastEvaluatedKey")
+        self.more = bool(self.start_key)
+        return self
+
+    def peek(self):
+        if not self.buffer and self.more:
+            self.fetch()
+        return self.buffer[-1] if self.buffer else None
+
+    @property
+    def exhausted(self):
+        return not self.buffer and not self.more
+
+
+def query_feed_page(limit, before=None, exhausted=0):
+    """
+    Newest-first page of the public feed, merged from all shards.
+
+    before: sortKey of the last item of the previous page (None = first page)
+    exhausted: bitmask of shards known to have nothing older than `before`
+
+    The merged output is a prefix of the global newest-first order, so every
+    unread entry of every shard is older than the last item returned: the
+    (before, exhausted) pair is a complete composite cursor.
+
+    Returns {'items', 'before', 'exhausted', 'hasMore', 'readCalls', 'scannedCount'}
+    """
+    shard_keys = feed_shard_keys()
+    batch_size = max(1, min(limit, -(-int(limit * FEED_SHARD_OVERFETCH) // len(shard_keys))))
+    readers = {
+        i: _ShardReader(key, batch_size, before)
+        for i, key in enumerate(shard_keys) if not exhausted & (1 << i)
+    }
+
+    # Scatter: first batch of every live shard in parallel
+    if len(readers) > 1:
+        list(_pool().map(_ShardReader.fetch, readers.values()))
+    else:
+        for reader in readers.values():
+            reader.fetch()
+
+    # Gather: k-way merge on sortKey. Shards are few, so picking the newest
+    # head linearly is cheaper than maintaining a heap.
+    items = []
+    while len(items) < limit:
+        heads = [(r.peek(), r) for r in readers.values()]
+        heads = [(head, r) for head, r in heads if head]
+        if not heads:
+            break
+        _, reader = max(heads, key=lambda pair: pair[0]["sortKey"])
+        items.append(reader.buffer.pop())
+
+    mask = exhausted
+    for i, reader in readers.items():
+        if reader.exhausted:
+            mask |= 1 << i
+    return {
+        "items": items,
+        "before": items[-1]["sortKey"] if items else before,
+        "exhausted": mask,
+        "hasMore": bool(items) and any(not r.exhausted for r in readers.values()),
+        "readCalls": sum(r.read_calls for r in readers.values()),
+        "scannedCount": sum(r.scanned for r in readers.values()),
+    }
+
+
+def _query_shard_since(shard_key, since, limit):
+    return _shard_table().query(
+        KeyConditionExpression="feedKey = :feed_key AND sortKey > :since",
+        ExpressionAttributeValues={
+            ":feed_key": shard_key,
+            # "\uffff" sorts after any articleId, so posts at exactly `since` are excluded
+            ":since": f"{since}#\uffff",
+        },
+        ProjectionExpression="sortKey",
+        ScanIndexForward=False,
+        Limit=limit,
+    )
+
+
+def query_feed_since(since, limit):
+    """
+    Sort keys of feed entries created strictly after `since` (newest first),
+    merged from all shards. Key-range reads with a keys-only projection:
+    ~0.5 RCU per shard per poll.
+
+    Returns {'Items': [{'sortKey': ...}], 'hasMore': bool}
+    """
+    shard_keys = feed_shard_keys()
+    responses = list(_pool().map(lambda key: _query_shard_since(key, since, limit), shard_keys))
+    items = sorted(
+        (item for response in responses for item in response.get("Items", [])),
+        key=lambda item: item["sortKey"], reverse=True
+    )
+    has_more = len(items) > limit or any("LastEvaluatedKey" in r for r in responses)
+    return {"Items": items[:limit], "hasMore": has_more}
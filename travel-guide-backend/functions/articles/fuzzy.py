@@ -0,0 +1,160 @@
+"""
+Typo-tolerant search - query word correction on the trigram index
+
+search_index.py keeps a vocabulary of the words in titles, place names and
+tags, with the trigrams of "$word$" pointing back to each word. A query word
+the vocabulary doesn't know ("quok") is corrected like this:
+
+1. its trigrams ($qu, quo, uok, ok$) are read in parallel, one Query each,
+   at most TRIGRAM_READ_LIMIT words per trigram - so the cost is bounded by
+   the length of the word, never by the size of the vocabulary
+2. the words sharing most trigrams (Dice overlap) become candidates, at most
+   MAX_FUZZY_CANDIDATES of them
+3. candidates within max_edits() (Damerau-Levenshtein, adjacent swaps count
+   once) win, ranked by edit distance, overlap, then how many articles use
+   the word
+
+A glued place name is a vocabulary word of its own ("halong" -> "ha long"),
+so it is corrected to every word of the phrase. search_article.py only
+calls this when an exact search finds fewer than FUZZY_MIN_RESULTS.
+"""
+from dynamo_batch import batch_get_items
+from search_index import (
+    SEARCH_INDEX_TABLE_NAME, VOCAB_PREFIX, VOCAB_SORT_KEY, TRIGRAM_PREFIX, MIN_VOCAB_LENGTH,
+    MAX_VOCAB_LENGTH, trigrams, _pool, _thread_table,
+)
+
+FUZZY_MIN_RESULTS = 3  # exact searches returning fewer try the corrected query
+MAX_FUZZY_WORDS = 3  # unknown words corrected per query
+MAX_WORD_TRIGRAMS = 12  # trigram Queries per word
+TRIGRAM_READ_LIMIT = 200  # vocabulary words read per trigram (one Query)
+MAX_FUZZY_CANDIDATES = 20  # best-overlap words checked by edit distance
+
+
+def max_edits(word):
+    return 1 if len(word) <= 5 else 2
+
+
+def edit_distance(a, b, limit):
+    """Damerau-Levenshtein (optimal string alignment) distance, or limit + 1 once it exceeds limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous, current = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+    return current[-1]
+
+
+def _sample(grams):
+    """At most MAX_WORD_TRIGRAMS, spread over the whole word"""
+    if len(grams) <= MAX_WORD_TRIGRAMS:
+        return grams
+    step = len(grams) / MAX_WORD_TRIGRAMS
+    return [grams[int(i * step)] for i in range(MAX_WORD_TRIGRAMS)]
+
+
+def _read_trigram(gram):
+    response = _thread_table().query(
+        KeyConditionExpression="#term = :term",
+        ExpressionAttributeNames={"#term": "term", "#text": "text"},
+        ExpressionAttributeValues={":term": f"{TRIGRAM_PREFIX}{gram}"},
+        ProjectionExpression="sortKey, #text",
+        Limit=TRIGRAM_READ_LIMIT,
+    )
+    return response.get("Items", [])
+
+
+def _vocabulary_items(words):
+    """{word: vocab item} for the words that are in the vocabulary"""
+    keys = [{"term": f"{VOCAB_PREFIX}{word}", "sortKey": VOCAB_SORT_KEY} for word in dict.fromkeys(words)]
+    if not keys:
+        return {}
+    return {
+        item["term"][len(VOCAB_PREFIX):]: item
+        for item in batch_get_items(SEARCH_INDEX_TABLE_NAME, keys)
+        if int(item.get("count", 0)) > 0
+    }
+
+
+def suggest_words(words):
+    """
+    {word: [(text, distance, overlap)]} best first, for each word (read in
+    parallel). Words shorter than MIN_VOCAB_LENGTH get no suggestion.
+    """
+    plans = {word: _sample(trigrams(word)) for word in words if MIN_VOCAB_LENGTH <= len(word) <= MAX_VOCAB_LENGTH}
+    grams = list(dict.fromkeys(gram for word_grams in plans.values() for gram in word_grams))
+    postings = dict(zip(grams, _pool().map(_read_trigram, grams))) if grams else {}
+
+    overlaps, texts = {}, {}
+    for word, word_grams in plans.items():
+        shared = overlaps.setdefault(word, {})
+        for gram in word_grams:
+            for item in postings[gram]:
+                shared[item["sortKey"]] = shared.get(item["sortKey"], 0) + 1
+                texts[item["sortKey"]] = item.get("text", item["sortKey"])
+
+    ranked = {}
+    for word, shared in overlaps.items():
+        word_grams = len(trigrams(word))
+        # Dice overlap on the trigram sets; only sampled trigrams were read
+        scored = sorted(
+            ((2 * count / (word_grams + len(trigrams(candidate))), candidate)
+             for candidate, count in shared.items() if candidate != word),
+            reverse=True,
+        )[:MAX_FUZZY_CANDIDATES]
+        limit = max_edits(word)
+        ranked[word] = []
+        for overlap, candidate in scored:
+            distance = edit_distance(word, candidate, limit)
+            if distance <= limit:
+                ranked[word].append((candidate, distance, overlap))
+
+    counts = _vocabulary_items(c for matches in ranked.values() for c, _, _ in matches)
+    return {
+        word: [
+            (texts[candidate], distance, round(overlap, 3))
+            for candidate, distance, overlap in sorted(
+                matches, key=lambda m: (m[1], -m[2], -int(counts.get(m[0], {}).get("count", 0)), m[0])
+            )
+            if candidate in counts
+        ]
+        for word, matches in ranked.items()
+    }
+
+
+def correct_terms(terms):
+    """
+    Query terms with the misspelled words replaced (a glued place name
+    becomes all its words), or None when there is nothing to correct.
+    """
+    glued = "".join(terms) if len(terms) > 1 else None
+    known = _vocabulary_items(list(terms) + [glued] if glued else terms)
+    corrected, unknown = [], []
+    for term in terms:
+        text = known[term].get("text", term) if term in known else None
+        if text is None and len(term) >= MIN_VOCAB_LENGTH and len(unknown) < MAX_FUZZY_WORDS:
+            unknown.append(term)
+        corrected.append(text or term)
+
+    if glued in known:
+        # "ha long" typed "halong" the other way round: "hal ong"
+        corrected = [known[glued].get("text", glued)]
+    elif unknown or any(term not in known for term in terms):
+        # The whole query as one word too: "hoi ann" -> "hoian" -> "hoi an"
+        suggestions = suggest_words(unknown + ([glued] if glued else []))
+        if suggestions.get(glued):
+            corrected = [suggestions[glued][0][0]]  # a known place / tag name as a whole
+        else:
+            corrected = [
+                suggestions[term][0][0] if suggestions.get(term) else text
+                for term, text in zip(terms, corrected)
+            ]
+    words = list(dict.fromkeys(word for text in corrected for word in text.split()))
+    return words if words != list(terms) else None
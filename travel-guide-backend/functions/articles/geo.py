@@ -0,0 +1,319 @@
+"""
+Geohash helpers - base-32 geohash encoding and bounding-box cell covers
+
+Every article stores
+    geohash = encode(lat, lng)              (9 chars, ~5 m cell)
+    gh5     = geohash[:5]                   (~5 km cell)
+and, while approved + public (feed_store.sync_sparse_attrs),
+    geoCell = geohash[:GEO_CELL_PRECISION]  (~156 km cell)
+which partitions the sparse GSI gsi_geo_cell (range key: geohash). A point
+lies in a cell iff its geohash starts with the cell, so a cell of any
+precision >= GEO_CELL_PRECISION is one key-range Query:
+    geoCell = cell[:GEO_CELL_PRECISION] AND begins_with(geohash, cell)
+
+plan_cover() picks the finest precision whose cover of a bbox stays within
+MAX_COVER_CELLS; results are then filtered on the exact lat/lng.
+nearest_in_rings() is the nearby search: it reads square rings of cells
+around a point, ranks candidates by haversine distance and stops once the
+k-th distance is no larger than the closest anything outside the rings
+read so far can be. Pure Python, no boto3 (cells are read by a callback).
+Keep functions/rekognition/geo.py in sync.
+"""
+import math
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE = {c: i for i, c in enumerate(BASE32)}
+
+GEOHASH_PRECISION = 9
+GH5_PRECISION = 5
+GEO_CELL_PRECISION = 3  # changing it needs the backfill target "geohash"
+GEO_CELL_ATTR = "geoCell"
+GEO_INDEX = "gsi_geo_cell"
+MAX_COVER_CELLS = 16  # parallel prefix queries for one bbox
+MAX_CELL_QUERIES = 64  # cap when the bbox is coarser than GEO_CELL_PRECISION
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_KM / 180
+MAX_NEARBY_RINGS = 4  # ring 4 = a 9x9 block of cells
+MAX_NEARBY_PRECISION = 7  # ~150 m cells
+
+
+class InvalidBBox(ValueError):
+    """Malformed or oversized ?bbox= value"""
+
+
+def encode(lat, lng, precision=GEOHASH_PRECISION):
+    """Base-32 geohash of a point"""
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    lat, lng = float(lat), float(lng)
+    chars = []
+    bits = 0
+    value = 0
+    even = True  # even bits split longitude
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                value = value * 2 + 1
+                lng_lo = mid
+            else:
+                value = value * 2
+                lng_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                value = value * 2 + 1
+                lat_lo = mid
+            else:
+                value = value * 2
+                lat_hi = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def is_geohash(value, min_precision=1):
+    return isinstance(value, str) and len(value) >= min_precision and all(c in _DECODE for c in value)
+
+
+def decode_bbox(geohash):
+    """(min_lat, min_lng, max_lat, max_lng) of a geohash cell"""
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    even = True
+    for c in geohash:
+        value = _DECODE[c]
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            if even:
+                mid = (lng_lo + lng_hi) / 2
+                if bit:
+                    lng_lo = mid
+                else:
+                    lng_hi = mid
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                if bit:
+                    lat_lo = mid
+                else:
+                    lat_hi = mid
+            even = not even
+    return lat_lo, lng_lo, lat_hi, lng_hi
+
+
+def cell_size(precision):
+    """(lat degrees, lng degrees) of a cell at this precision"""
+    bits = 5 * precision
+    return 180.0 / (1 << (bits // 2)), 360.0 / (1 << ((bits + 1) // 2))
+
+
+def geo_cell(item):
+    """GSI partition value of an article, or None if it has no geohash yet"""
+    geohash = item.get("geohash")
+    if not is_geohash(geohash, GEOHASH_PRECISION):
+        return None  # legacy "lat,lng" value: fixed by the backfill
+    return geohash[:GEO_CELL_PRECISION]
+
+
+def parse_bbox(value):
+    """'minLng,minLat,maxLng,maxLat' -> (min_lat, min_lng, max_lat, max_lng)"""
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(v) for v in value.split(","))
+    except (AttributeError, ValueError):
+        raise InvalidBBox("bbox must be minLng,minLat,maxLng,maxLat")
+    if not all(math.isfinite(v) for v in (min_lng, min_lat, max_lng, max_lat)):
+        raise InvalidBBox("bbox must be minLng,minLat,maxLng,maxLat")
+    if not (-90 <= min_lat <= max_lat <= 90) or not (-180 <= min_lng <= max_lng <= 180):
+        raise InvalidBBox("bbox out of range (antimeridian-crossing boxes are not supported)")
+    return min_lat, min_lng, max_lat, max_lng
+
+
+def _grid_range(lo, hi, origin, step, cells):
+    first = int((lo - origin) // step)
+    last = int((hi - origin) // step)
+    return max(first, 0), min(last, cells - 1)
+
+
+def _cover_ranges(bbox, precision):
+    min_lat, min_lng, max_lat, max_lng = bbox
+    lat_step, lng_step = cell_size(precision)
+    lat_cells = round(180.0 / lat_step)
+    lng_cells = round(360.0 / lng_step)
+    rows = _grid_range(min_lat, max_lat, -90.0, lat_step, lat_cells)
+    cols = _grid_range(min_lng, max_lng, -180.0, lng_step, lng_cells)
+    return rows, cols, lat_step, lng_step
+
+
+def cover_count(bbox, precision):
+    (r0, r1), (c0, c1), _, _ = _cover_ranges(bbox, precision)
+    return (r1 - r0 + 1) * (c1 - c0 + 1)
+
+
+def cover_cells(bbox, precision):
+    """Every cell of this precision that intersects bbox (disjoint, no gaps)"""
+    (r0, r1), (c0, c1), lat_step, lng_step = _cover_ranges(bbox, precision)
+    return [
+        encode(-90.0 + (row + 0.5) * lat_step, -180.0 + (col + 0.5) * lng_step, precision)
+        for row in range(r0, r1 + 1)
+        for col in range(c0, c1 + 1)
+    ]
+
+
+def plan_cover(bbox):
+    """
+    Cells to query for a bbox: the finest precision with at most
+    MAX_COVER_CELLS cells, but never coarser than GEO_CELL_PRECISION (a
+    coarser cell spans several GSI partitions). Raises InvalidBBox when
+    even that needs more than MAX_CELL_QUERIES queries.
+    """
+    precision = GEOHASH_PRECISION
+    while precision > GEO_CELL_PRECISION and cover_count(bbox, precision) > MAX_COVER_CELLS:
+        precision -= 1
+    if cover_count(bbox, precision) > MAX_CELL_QUERIES:
+        raise InvalidBBox("bbox too large, zoom in")
+    return cover_cells(bbox, precision)
+
+
+def in_bbox(item, bbox):
+    """Exact check on the stored coordinates (cover cells overhang the bbox)"""
+    try:
+        lat, lng = float(item["lat"]), float(item["lng"])
+    except (KeyError, TypeError, ValueError):
+        return False
+    min_lat, min_lng, max_lat, max_lng = bbox
+    return min_lat <= lat <= max_lat and min_lng <= lng <= max_lng
+
+
+# ---- Distances and rings (nearby search) ----
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance in km"""
+    lat1, lng1, lat2, lng2 = (math.radians(float(v)) for v in (lat1, lng1, lat2, lng2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def precision_for_radius(radius_km, rings=3):
+    """Finest precision (GEO_CELL_PRECISION..7) whose cells are >= radius / rings tall"""
+    for precision in range(7, GEO_CELL_PRECISION, -1):
+        if cell_size(precision)[0] * KM_PER_DEGREE_LAT >= radius_km / rings:
+            return precision
+    return GEO_CELL_PRECISION
+
+
+def _cell_index(lat, lng, precision):
+    lat_step, lng_step = cell_size(precision)
+    rows, cols = round(180.0 / lat_step), round(360.0 / lng_step)
+    row = min(int((float(lat) + 90.0) // lat_step), rows - 1)
+    col = min(int((float(lng) + 180.0) // lng_step), cols - 1)
+    return row, col, rows, cols, lat_step, lng_step
+
+
+def ring_cells(lat, lng, precision, ring):
+    """
+    Cells at Chebyshev distance `ring` from the cell holding (lat, lng):
+    ring 0 is that cell, ring 1 its 8 neighbours, ring r has 8r cells
+    (fewer near the poles; longitude wraps around).
+    """
+    row, col, rows, cols, lat_step, lng_step = _cell_index(lat, lng, precision)
+    cells = []
+    for dr in range(-ring, ring + 1):
+        r = row + dr
+        if not 0 <= r < rows:
+            continue
+        for dc in range(-ring, ring + 1):
+            if max(abs(dr), abs(dc)) != ring:
+                continue
+            c = (col + dc) % cols
+            cells.append(encode(-90.0 + (r + 0.5) * lat_step, -180.0 + (c + 0.5) * lng_step, precision))
+    return list(dict.fromkeys(cells))  # wrapped columns can repeat on tiny grids
+
+
+def ring_min_distance_km(lat, lng, precision, ring):
+    """
+    Lower bound on the distance from (lat, lng) to any point outside rings
+    0..ring: the distance to the nearest edge of that square block of cells.
+    """
+    row, col, rows, cols, lat_step, lng_step = _cell_index(lat, lng, precision)
+    lat, lng = float(lat), float(lng)
+    bounds = []
+    south = -90.0 + (row - ring) * lat_step
+    north = -90.0 + (row + ring + 1) * lat_step
+    if south > -90.0:
+        bounds.append((lat - south) * KM_PER_DEGREE_LAT)
+    if north < 90.0:
+        bounds.append((north - lat) * KM_PER_DEGREE_LAT)
+    if (2 * ring + 1) < cols:
+        west = -180.0 + (col - ring) * lng_step
+        east = -180.0 + (col + ring + 1) * lng_step
+        for edge in (lng - west, east - lng):
+            # Distance to a meridian; beyond 90 degrees the pole is closer than the edge
+            delta = math.radians(min(edge, 90.0))
+            bounds.append(EARTH_RADIUS_KM * math.asin(abs(math.sin(delta)) * math.cos(math.radians(lat))))
+    return min(bounds) if bounds else math.inf
+
+
+def nearest_in_rings(lat, lng, radius_km, k, read_cells):
+    """
+    Up to k items within radius_km of (lat, lng), nearest first, each with
+    distanceKm.
+
+    read_cells(cells) -> [(items, read_calls, truncated)], one per cell;
+    items need articleId, lat and lng. The starting precision follows the
+    radius (about three rings reach it); a cell too dense to read in full
+    restarts the search one precision finer.
+
+    Returns {'items', 'precision', 'rings', 'cellsRead', 'readCalls',
+    'scannedCount', 'truncated'}; truncated means the ring or precision
+    limits were hit before the answer was proven complete.
+    """
+    precision = precision_for_radius(radius_km)
+    read_calls = scanned = cells_read = 0
+    while True:
+        candidates = {}  # articleId -> (distance, item)
+        truncated = dense = False
+        ring = 0
+        while True:
+            cells = ring_cells(lat, lng, precision, ring)
+            cells_read += len(cells)
+            for items, calls, cell_truncated in read_cells(cells):
+                read_calls += calls
+                scanned += len(items)
+                dense = dense or cell_truncated
+                for item in items:
+                    distance = haversine_km(lat, lng, item["lat"], item["lng"])
+                    if distance <= radius_km:
+                        candidates[item["articleId"]] = (distance, item)
+            if dense:
+                break
+            # Nothing outside rings 0..ring is closer than this
+            bound = ring_min_distance_km(lat, lng, precision, ring)
+            distances = sorted(d for d, _ in candidates.values())
+            if bound >= radius_km or (len(distances) >= k and distances[k - 1] <= bound):
+                break
+            if ring >= MAX_NEARBY_RINGS:
+                truncated = True
+                break
+            ring += 1
+        if not dense:
+            break
+        if precision >= MAX_NEARBY_PRECISION:
+            truncated = True
+            break
+        precision += 1
+
+    ranked = sorted(candidates.values(), key=lambda pair: (pair[0], pair[1]["articleId"]))[:k]
+    return {
+        "items": [{**item, "distanceKm": round(distance, 3)} for distance, item in ranked],
+        "precision": precision,
+        "rings": ring + 1,
+        "cellsRead": cells_read,
+        "readCalls": read_calls,
+        "scannedCount": scanned,
+        "truncated": truncated,
+    }
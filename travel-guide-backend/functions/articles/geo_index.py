@@ -0,0 +1,114 @@
+"""
+Geo index reads - bbox queries on the sparse GSI gsi_geo_cell
+
+gsi_geo_cell (HASH geoCell, RANGE geohash, INCLUDE card fields) holds the
+approved + public articles only (see geo.py and feed_store.sync_sparse_attrs).
+query_bbox() plans a cell cover of the box, runs one prefix Query per cell
+in parallel and keeps the articles whose exact lat/lng is inside the box.
+Read cost follows the area of the box, not the size of the table.
+
+query_nearby() answers "k nearest within a radius" with geo.nearest_in_rings:
+ring 0 is the point's cell, ring 1 its 8 neighbours, ...; every ring's
+cells are queried in parallel.
+"""
+import os
+import threading
+import boto3
+from concurrent.futures import ThreadPoolExecutor
+from geo import GEO_CELL_PRECISION, GEO_INDEX, plan_cover, in_bbox, nearest_in_rings
+from projections import card_projection
+
+TABLE_NAME = os.environ.get("TABLE_NAME", "")
+
+MAX_BBOX_ITEMS = 1000  # index items read per bbox request (all cells together)
+CELL_QUERY_LIMIT = 200
+MAX_NEARBY_CELL_ITEMS = 500  # a cell holding more is split (finer precision)
+
+_executor = None
+_local = threading.local()
+
+
+def _pool():
+    """Module-level pool: threads (and their tables) survive warm invocations"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="geo")
+    return _executor
+
+
+def _table():
+    """boto3 resources are not thread-safe: one Table object per thread"""
+    table = getattr(_local, "table", None)
+    if table is None:
+        table = _local.table = boto3.session.Session().resource("dynamodb").Table(TABLE_NAME)
+    return table
+
+
+def query_cell(cell, max_items=MAX_BBOX_ITEMS):
+    """
+    Card items of one cover cell (any precision >= GEO_CELL_PRECISION).
+    Returns (items, read_calls, truncated).
+    """
+    projection, names = card_projection()
+    condition = "geoCell = :cell"
+    values = {":cell": cell[:GEO_CELL_PRECISION]}
+    if len(cell) > GEO_CELL_PRECISION:
+        condition += " AND begins_with(geohash, :prefix)"
+        values[":prefix"] = cell
+    query_params = {
+        "IndexName": GEO_INDEX,
+        "KeyConditionExpression": condition,
+        "ExpressionAttributeValues": values,
+        "ProjectionExpression": projection,
+        "ExpressionAttributeNames": names,
+        "Limit": min(CELL_QUERY_LIMIT, max_items),
+    }
+    items, read_calls = [], 0
+    while True:
+        response = _table().query(**query_params)
+        read_calls += 1
+        items.extend(response.get("Items", []))
+        start_key = response.get("LastEvaluatedKey")
+        if not start_key:
+            return items, read_calls, False
+        if len(items) >= max_items:
+            return items, read_calls, True
+        query_params["ExclusiveStartKey"] = start_key
+
+
+def _query_cells(cells, max_items):
+    if len(cells) > 1:
+        return list(_pool().map(lambda cell: query_cell(cell, max_items), cells))
+    return [query_cell(cell, max_items) for cell in cells]
+
+
+def query_bbox(bbox, max_items=MAX_BBOX_ITEMS):
+    """
+    Approved public articles (card fields) inside bbox =
+    (min_lat, min_lng, max_lat, max_lng), in no particular order.
+
+    Returns {'items', 'cells', 'readCalls', 'scannedCount', 'truncated'};
+    truncated means some cell held more than its share of max_items and
+    the box should be narrowed (or zoomed in) to see everything.
+    Raises geo.InvalidBBox for boxes that need too many queries.
+    """
+    cells = plan_cover(bbox)
+    results = _query_cells(cells, -(-max_items // len(cells)))
+
+    scanned = [item for items, _, _ in results for item in items]
+    return {
+        "items": [item for item in scanned if in_bbox(item, bbox)],
+        "cells": cells,
+        "readCalls": sum(calls for _, calls, _ in results),
+        "scannedCount": len(scanned),
+        "truncated": any(truncated for _, _, truncated in results),
+    }
+
+
+def query_nearby(lat, lng, radius_km, k):
+    """
+    Up to k approved public articles (card fields) within radius_km of
+    (lat, lng), nearest first, each with distanceKm. See geo.nearest_in_rings
+    for the search and the returned statistics.
+    """
+    return nearest_in_rings(lat, lng, radius_km, k, lambda cells: _query_cells(cells, MAX_NEARBY_CELL_ITEMS))
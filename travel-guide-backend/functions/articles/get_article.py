@@ -1,8 +1,10 @@
 import os
 import json
+import time
 import boto3
-from decimal import Decimal
-from cors import ok, error, options # Giả định các hàm này đã được định nghĩa
+from json_encoder import dumps
+from cors import ok, error, options, version_etag, if_none_match, not_modified # Giả định các hàm này đã được định nghĩa
+from compression import compress_response
 
 # Clients
 dynamodb = boto3.resource("dynamodb")
@@ -12,15 +14,22 @@ TABLE_NAME = os.environ["TABLE_NAME"]
 BUCKET_NAME = os.environ["BUCKET_NAME"]
 table = dynamodb.Table(TABLE_NAME)
 
-def _response(status, body_dict):
+PRESIGN_EXPIRES = 3600
+
+def _response(status, body_dict, etag=None):
     """Hàm tạo response chuẩn."""
+    headers = {
+        "Content-Type": "application/json",
+        "Access-Control-Allow-Origin": "*",
+    }
+    if etag:
+        headers["ETag"] = etag
+        headers["Cache-Control"] = "private, no-cache"
+        headers["Access-Control-Expose-Headers"] = "ETag"
     return {
         "statusCode": status,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-        },
-        "body": json.dumps(body_dict, ensure_ascii=False),
+        "headers": headers,
+        "body": dumps(body_dict),
     }
 
 def lambda_handler(event, context):
@@ -43,15 +52,22 @@ def lambda_handler(event, context):
 
         item = response['Item']
 
-        # Chuyển Decimal sang float/int cho response
-        processed_item = {}
-        for k, v in item.items():
-            if isinstance(v, Decimal):
-                # Chuyển Decimal sang int nếu là số nguyên, ngược lại float
-                processed_item[k] = int(v) if v % 1 == 0 else float(v)
-            else:
-                processed_item[k] = v
-            
+        # ETag from the stored item (+ the presign window, so cached presigned
+        # URLs are always at least half their lifetime away from expiring).
+        # 304 skips the serialization and the S3 signing below.
+        params = event.get("queryStringParameters") or {}
+        presign = params.get('presign') == '1'
+        etag = version_etag(
+            'article',
+            json.dumps(item, sort_keys=True, default=str),
+            int(time.time() // (PRESIGN_EXPIRES // 2)) if presign else ''
+        )
+        if if_none_match(event, etag):
+            return not_modified(etag)
+
+        # Decimal (kể cả lồng trong labelDetails/imageMetadata) được encoder chuyển khi serialize
+        processed_item = item
+
         # Đảm bảo imageKeys là list (DynamoDB có thể lưu Set/List)
         if 'imageKeys' in processed_item and not isinstance(processed_item['imageKeys'], list):
             # Ép kiểu nếu cần (ví dụ, nếu lưu dưới dạng DynamoDB Set)
@@ -60,8 +76,7 @@ def lambda_handler(event, context):
         # ----------------------------------------------------------------------
         ## 🖼️ Logic Xử lý Presigned URLs
         # ----------------------------------------------------------------------
-        params = event.get("queryStringParameters") or {}
-        if params.get('presign') == '1':
+        if presign:
             
             # Ưu tiên xử lý mảng imageKeys (từ bài viết mới)
             image_keys_to_process = []
@@ -80,7 +95,7 @@ def lambda_handler(event, context):
                         presigned_url = s3_client.generate_presigned_url(
                             'get_object',
                             Params={'Bucket': BUCKET_NAME, 'Key': key},
-                            ExpiresIn=3600
+                            ExpiresIn=PRESIGN_EXPIRES
                         )
                         image_urls.append(presigned_url)
                     except Exception as e:
@@ -92,7 +107,7 @@ def lambda_handler(event, context):
                     # Trả về imageUrl cho tương thích ngược (ảnh cover)
                     processed_item['imageUrl'] = image_urls[0]
 
-        return _response(200, processed_item)
+        return compress_response(_response(200, processed_item, etag), event)
 
     except Exception as e:
         print(f"Error in get_article: {e}")
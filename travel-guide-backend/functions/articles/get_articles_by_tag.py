@@ -1,81 +1,81 @@
 """
-Get photos by tag - Query directly from GalleryPhotosTable
+Get photos by tag - newest first from the tag -> photo index
+(GalleryTagPhotosTable, gallery_tag_index.py)
 Returns photo data with image_url for display
 """
-import os
-import json
-import boto3
-from decimal import Decimal
 from cors import ok, error, options
+from gallery_tag_index import tag_photos_table
+from paginator import paginate, parse_limit, InvalidCursor
 
-dynamodb = boto3.resource("dynamodb")
+MAX_LIMIT = 100
 
-GALLERY_PHOTOS_TABLE = os.environ.get("GALLERY_PHOTOS_TABLE", "")
 
-photos_table = dynamodb.Table(GALLERY_PHOTOS_TABLE) if GALLERY_PHOTOS_TABLE else None
-
-
-def decimal_to_native(obj):
-    """Convert Decimal to native Python types"""
-    if isinstance(obj, Decimal):
-        return int(obj) if obj % 1 == 0 else float(obj)
-    elif isinstance(obj, dict):
-        return {k: decimal_to_native(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [decimal_to_native(i) for i in obj]
-    return obj
+def to_photo(entry):
+    # Note: tags field contains all tags (both user and auto-detected)
+    return {
+        'photo_id': entry.get('photo_id'),
+        'image_url': entry.get('image_url'),  # S3 key
+        'tags': entry.get('tags', []),
+        'autoTags': [],  # Empty to avoid duplicate with tags
+        'status': entry.get('status', 'public'),
+        'created_at': entry.get('created_at'),
+        'createdAt': entry.get('created_at'),  # Alias for frontend
+    }
 
 
 def lambda_handler(event, context):
+    """
+    GET /gallery/articles?tag=<tag>&limit=<1..100>&nextToken=<token>
+
+    One key-range Query on the tag's partition, newest first; nextToken
+    continues from the last photo returned.
+    """
     method = event.get("httpMethod") or event.get("requestContext", {}).get("http", {}).get("method")
     if method == "OPTIONS":
         return options()
 
     try:
-        if not photos_table:
-            return error(500, "Gallery Photos table not configured")
-        
+        if not tag_photos_table:
+            return error(500, "Gallery tag index table not configured")
+
         params = event.get("queryStringParameters") or {}
         tag = (params.get("tag") or "").strip().lower()
-        limit = int(params.get("limit", 50))
-        
+        limit = parse_limit(params.get("limit"), 50, MAX_LIMIT)
+
         if not tag:
             return error(400, "tag parameter is required")
-        
-        print(f"🔍 Searching for photos with tag: {tag}")
-        
-        # Scan GalleryPhotosTable to find photos with this tag
-        matching_photos = []
-        scan_kwargs = {}
-        
-        while len(matching_photos) < limit:
-            response = photos_table.scan(**scan_kwargs)
-            
-            for item in response.get('Items', []):
-                photo_tags = [t.lower() for t in (item.get('tags') or [])]
-                if tag in photo_tags:
-                    # Build photo object with image_url for frontend
-                    # Note: tags field contains all tags (both user and auto-detected)
-                    photo = {
-                        'photo_id': item.get('photo_id'),
-                        'image_url': item.get('image_url'),  # S3 key
-                        'tags': item.get('tags', []),
-                        'autoTags': [],  # Empty to avoid duplicate with tags
-                        'status': item.get('status', 'public'),
-                        'created_at': item.get('created_at'),
-                        'createdAt': item.get('created_at'),  # Alias for frontend
-                    }
-                    matching_photos.append(decimal_to_native(photo))
-                    print(f"  ✅ Found photo: {item.get('photo_id')[:30]}... with image: {item.get('image_url', 'N/A')[:50]}...")
-            
-            if 'LastEvaluatedKey' not in response:
-                break
-            scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
-        
-        print(f"📦 Found {len(matching_photos)} photos with tag '{tag}'")
-        
-        return ok(200, {'items': matching_photos[:limit]})
-        
+
+        print(f"🔍 Querying photos with tag: {tag}")
+
+        def read_page(start_key, page_size):
+            query_params = {
+                'KeyConditionExpression': '#tag = :tag',
+                'ExpressionAttributeNames': {'#tag': 'tag'},
+                'ExpressionAttributeValues': {':tag': tag},
+                'ScanIndexForward': False,  # Newest first
+                'Limit': page_size,
+            }
+            if start_key:
+                query_params['ExclusiveStartKey'] = start_key
+            return tag_photos_table.query(**query_params)
+
+        page = paginate(
+            read_page, limit, params.get("nextToken"),
+            key_attrs=('sortKey',),
+            fixed_key={'tag': tag},
+            scope=f"gallery-tag:{tag}",
+        )
+        photos = [to_photo(entry) for entry in page['items']]
+
+        print(f"📦 Found {len(photos)} photos with tag '{tag}' ({page['readCalls']} reads)")
+
+        result = {'items': photos}
+        if page['nextToken']:
+            result['nextToken'] = page['nextToken']
+        return ok(200, result, event)
+
+    except InvalidCursor as e:
+        return error(400, str(e))
     except Exception as e:
         print(f"Error getting photos by tag: {e}")
         import traceback
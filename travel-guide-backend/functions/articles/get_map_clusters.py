@@ -0,0 +1,73 @@
+from cors import ok, error, options
+from feed_store import is_feed_visible
+from geo import parse_bbox, InvalidBBox
+from geo_index import query_bbox
+from map_clusters import query_clusters, LEAF_ZOOM, MAX_ZOOM
+
+# Zoom lá: trả về từng bài (marker thumbnail) thay vì cluster
+MAX_LEAF_ITEMS = 500
+
+
+def _parse_zoom(value):
+    try:
+        zoom = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("zoom is required and must be an integer")
+    if not 0 <= zoom <= MAX_ZOOM:
+        raise ValueError(f"zoom must be 0..{MAX_ZOOM}")
+    return zoom
+
+
+def lambda_handler(event, context):
+    """
+    Map markers of the approved public articles in a bbox
+    GET /map/clusters?bbox=minLng,minLat,maxLng,maxLat&zoom=<0..22>
+
+    Returns:
+    - zoom < LEAF_ZOOM: clusters - {cell, count, lat, lng (centroid),
+      articleId, thumbnailKey (newest article)}, biggest first, from the
+      precomputed cluster tree (map_clusters.py); precision = geohash
+      length of the cluster cells
+    - zoom >= LEAF_ZOOM: items - the articles themselves (card fields);
+      truncated when the box held more than MAX_LEAF_ITEMS
+    """
+    method = (event.get("httpMethod") or event.get("requestContext", {}).get("http", {}).get("method"))
+    if method == "OPTIONS":
+        return options()
+
+    if method != "GET":
+        return error(405, "Method not allowed")
+
+    try:
+        params = event.get("queryStringParameters") or {}
+        try:
+            zoom = _parse_zoom(params.get("zoom"))
+        except ValueError as e:
+            return error(400, str(e))
+        bbox = parse_bbox(params.get("bbox"))
+
+        if zoom >= LEAF_ZOOM:
+            result = query_bbox(bbox, MAX_LEAF_ITEMS)
+            items = [item for item in result["items"] if is_feed_visible(item)]
+            print(f"🗺️ Map leaf z{zoom}: {len(items)} items, {len(result['cells'])} cells, "
+                  f"{result['readCalls']} reads{' (truncated)' if result['truncated'] else ''}")
+            body = {"zoom": zoom, "leaf": True, "items": items}
+            if result["truncated"]:
+                body["truncated"] = True
+            return ok(200, body, event)
+
+        result = query_clusters(bbox, zoom)
+        print(f"🗺️ Map clusters z{zoom}: {len(result['clusters'])} clusters at precision "
+              f"{result['precision']}, {result['readCalls']} reads")
+        return ok(200, {
+            "zoom": zoom,
+            "leaf": False,
+            "precision": result["precision"],
+            "clusters": result["clusters"],
+        }, event)
+
+    except InvalidBBox as e:
+        return error(400, str(e))
+    except Exception as e:
+        print(f"Error in get_map_clusters: {e}")
+        return error(500, f"internal error: {e}")
@@ -0,0 +1,50 @@
+from cors import ok, error, options
+from feed_store import feed_table, query_feed_since
+
+# Poll endpoint for the "new posts" banner: count + IDs only.
+# No article bodies, no profile enrichment, no presigned URLs.
+MAX_NEW_POSTS = 100
+
+
+def lambda_handler(event, context):
+    """
+    Count approved public posts newer than the newest post the client has seen
+    GET /articles/new?since=<createdAt>
+
+    Returns:
+    - count: number of newer posts (capped at MAX_NEW_POSTS)
+    - articleIds: their IDs, newest first
+    - latestCreatedAt: createdAt of the newest one (or since)
+    - hasMore: True if there are more than MAX_NEW_POSTS
+    """
+    method = (event.get("httpMethod") or event.get("requestContext", {}).get("http", {}).get("method"))
+    if method == "OPTIONS":
+        return options()
+
+    try:
+        params = event.get("queryStringParameters") or {}
+        since = (params.get("since") or "").strip()
+        if not since:
+            return error(400, "since is required")
+
+        if not feed_table:
+            return error(500, "feed table not configured")
+
+        response = query_feed_since(since, MAX_NEW_POSTS)
+        sort_keys = [item["sortKey"] for item in response.get("Items", [])]
+
+        # sortKey = "<createdAt>#<articleId>"
+        entries = [key.split("#", 1) for key in sort_keys]
+        result = {
+            "count": len(entries),
+            "articleIds": [article_id for _, article_id in entries],
+            "latestCreatedAt": entries[0][0] if entries else since,
+            "hasMore": response["hasMore"],
+        }
+
+        print(f"🆕 {result['count']} new posts since {since}")
+        return ok(200, result, event)
+
+    except Exception as e:
+        print(f"Error in get_new_posts: {e}")
+        return error(500, f"internal error: {e}")
@@ -1,74 +1,69 @@
 """
 Get trending tags from GalleryTrendsTable
-Simple scan and sort by count
+One read (trending_board.py):
+- window=all: the top-K leaderboard item kept by update_trending_tags
+- window=24h / 7d: one BatchGetItem of the window's hourly / daily buckets
 """
-import os
-import json
-import boto3
-from decimal import Decimal
 from cors import ok, error, options
+from dynamo_batch import batch_get_items
+from paginator import parse_limit
+from trending_board import (
+    GALLERY_TRENDS_TABLE, trends_table, read_board, window_keys, merge_buckets, BOARD_SIZE, WINDOWS, ALL_TIME,
+)
 
-dynamodb = boto3.resource("dynamodb")
-GALLERY_TRENDS_TABLE = os.environ.get("GALLERY_TRENDS_TABLE", "")
-table = dynamodb.Table(GALLERY_TRENDS_TABLE) if GALLERY_TRENDS_TABLE else None
+MAX_LIMIT = BOARD_SIZE
 
 
-def decimal_to_native(obj):
-    """Convert Decimal to native Python types"""
-    if isinstance(obj, Decimal):
-        return int(obj) if obj % 1 == 0 else float(obj)
-    elif isinstance(obj, dict):
-        return {k: decimal_to_native(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [decimal_to_native(i) for i in obj]
-    return obj
+def read_window(window):
+    """(entries biggest first, number of tags) of a 24h / 7d window"""
+    buckets = batch_get_items(GALLERY_TRENDS_TABLE, [{'tag_name': key} for key in window_keys(window)])
+    entries = merge_buckets(buckets)
+    return entries, len(entries)
 
 
 def lambda_handler(event, context):
+    """
+    GET /gallery/trending?limit=<1..50>&window=24h|7d|all (default: all)
+    """
     method = event.get("httpMethod") or event.get("requestContext", {}).get("http", {}).get("method")
     if method == "OPTIONS":
         return options()
 
     try:
-        if not table:
+        if not trends_table:
             return error(500, "Gallery Trends table not configured")
-        
+
         params = event.get("queryStringParameters") or {}
-        limit = int(params.get("limit", 20))
-        
-        # Scan all tags
-        scan_kwargs = {}
-        all_tags = []
-        
-        while True:
-            response = table.scan(**scan_kwargs)
-            all_tags.extend(response.get('Items', []))
-            
-            if 'LastEvaluatedKey' not in response:
-                break
-            scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
-        
-        # Sort by count (descending)
-        all_tags.sort(key=lambda x: x.get('count', 0), reverse=True)
-        
-        # Get top N
-        top_tags = all_tags[:limit]
-        
-        # Format response
+        limit = parse_limit(params.get("limit"), 20, MAX_LIMIT)
+        window = params.get("window") or ALL_TIME
+        if window != ALL_TIME and window not in WINDOWS:
+            return error(400, f"window must be one of: {', '.join([*WINDOWS, ALL_TIME])}")
+
+        if window == ALL_TIME:
+            board = read_board()
+            if board is None:
+                print("⚠️ No trending leaderboard yet: run backfill_gallery_trends")
+                board = {}
+            entries, total_tags = board.get('entries', []), board.get('tagCount', 0)
+        else:
+            entries, total_tags = read_window(window)
+
+        # Format response (entries are already biggest first)
         trending_tags = []
-        for tag in top_tags:
+        for tag in entries[:limit]:
             trending_tags.append({
                 'tag_name': tag.get('tag_name', '').title(),
-                'count': decimal_to_native(tag.get('count', 0)),
+                'count': tag.get('count', 0),
                 'cover_image': tag.get('cover_image'),
                 'last_updated': tag.get('last_updated', '')
             })
-        
+
         return ok(200, {
             'items': trending_tags,
-            'total_tags': len(all_tags)
-        })
-        
+            'total_tags': total_tags,
+            'window': window
+        }, event)
+
     except Exception as e:
         print(f"Error getting trending tags: {e}")
         import traceback
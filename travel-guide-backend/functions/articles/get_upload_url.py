@@ -1,5 +1,6 @@
 import os
 import json
+import base64
 import uuid
 import boto3
 from cors import ok, error, options
@@ -28,7 +29,12 @@ def lambda_handler(event, context):
         owner_id = claims.get("sub")  # UUID của user
         user_email = claims.get("email")  # Email của user
         
-        body = json.loads(event.get("body") or "{}")
+        # API declares BinaryMediaTypes */* (compressed responses), so
+        # request bodies may arrive base64-encoded
+        body_str = event.get("body") or "{}"
+        if event.get("isBase64Encoded"):
+            body_str = base64.b64decode(body_str).decode("utf-8")
+        body = json.loads(body_str)
         filename = (body.get("filename") or "").strip()
         content_type = (body.get("contentType") or "").strip()
 
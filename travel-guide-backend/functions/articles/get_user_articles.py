@@ -1,103 +1,17 @@
 import os
-import json
 import boto3
-from decimal import Decimal
 from cors import ok, error, options
+from feed_store import APPROVED_OWNER_ATTR, APPROVED_OWNER_INDEX
+from paginator import paginate, parse_limit, InvalidCursor
+from projections import parse_fields, load_full_items, InvalidFields
+from profile_enricher import get_profiles, get_cognito_profile, attach_owner_profile
 
 dynamodb = boto3.resource("dynamodb")
-cognito = boto3.client("cognito-idp")
 
 TABLE_NAME = os.environ["TABLE_NAME"]
-PROFILES_TABLE_NAME = os.environ.get("PROFILES_TABLE_NAME")
-USER_POOL_ID = os.environ.get("USER_POOL_ID")
+MAX_LIMIT = 50
 
 table = dynamodb.Table(TABLE_NAME)
-profiles_table = dynamodb.Table(PROFILES_TABLE_NAME) if PROFILES_TABLE_NAME else None
-
-def _convert_decimal(obj):
-    """Recursively convert Decimal to float/int"""
-    if isinstance(obj, Decimal):
-        return int(obj) if obj % 1 == 0 else float(obj)
-    elif isinstance(obj, dict):
-        return {k: _convert_decimal(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [_convert_decimal(item) for item in obj]
-    return obj
-
-
-def _get_user_profile(user_id):
-    """Get user profile information from UserProfilesTable or Cognito"""
-    try:
-        # Try to get from UserProfilesTable first
-        if profiles_table:
-            response = profiles_table.get_item(Key={'userId': user_id})
-            if 'Item' in response:
-                profile = response['Item']
-                
-                # Generate presigned URLs for avatar and cover if they exist
-                avatar_url = None
-                cover_url = None
-                
-                if profile.get('avatarKey'):
-                    try:
-                        import boto3
-                        s3_client = boto3.client('s3')
-                        bucket_name = os.environ.get('BUCKET_NAME', '')
-                        if bucket_name:
-                            avatar_url = s3_client.generate_presigned_url(
-                                'get_object',
-                                Params={'Bucket': bucket_name, 'Key': profile['avatarKey']},
-                                ExpiresIn=3600
-                            )
-                    except Exception as e:
-                        print(f"Error generating avatar URL for {user_id}: {e}")
-                
-                if profile.get('coverImageKey'):
-                    try:
-                        import boto3
-                        s3_client = boto3.client('s3')
-                        bucket_name = os.environ.get('BUCKET_NAME', '')
-                        if bucket_name:
-                            cover_url = s3_client.generate_presigned_url(
-                                'get_object',
-                                Params={'Bucket': bucket_name, 'Key': profile['coverImageKey']},
-                                ExpiresIn=3600
-                            )
-                    except Exception as e:
-                        print(f"Error generating cover URL for {user_id}: {e}")
-                
-                return {
-                    'displayName': profile.get('username'),  # Use username as displayName
-                    'username': profile.get('username'),
-                    'avatarUrl': avatar_url,
-                    'coverImageUrl': cover_url,
-                    'bio': profile.get('bio')
-                }
-        
-        # Fallback to Cognito
-        if USER_POOL_ID:
-            try:
-                response = cognito.admin_get_user(
-                    UserPoolId=USER_POOL_ID,
-                    Username=user_id
-                )
-                
-                # Extract attributes
-                attributes = {attr['Name']: attr['Value'] for attr in response.get('UserAttributes', [])}
-                
-                return {
-                    'displayName': attributes.get('name') or attributes.get('preferred_username'),
-                    'username': response.get('Username'),
-                    'email': attributes.get('email')
-                }
-            except Exception as e:
-                print(f"Error getting user from Cognito: {e}")
-        
-        return None
-    except Exception as e:
-        print(f"Error getting user profile: {e}")
-        return None
-
 
 def lambda_handler(event, context):
     """
@@ -107,8 +21,11 @@ def lambda_handler(event, context):
     Query params:
     - limit: number of items (default 20)
     - nextToken: pagination token
+    - fields: card (default) | full
     
-    Returns only public + approved articles
+    Returns only public + approved articles (sparse index gsi_approved_owner_createdAt).
+    The index projects exactly the card fields; fields=full fetches the
+    whole items with one BatchGetItem per page.
     """
     method = (event.get("httpMethod") or event.get("requestContext", {}).get("http", {}).get("method"))
     if method == "OPTIONS":
@@ -124,57 +41,60 @@ def lambda_handler(event, context):
 
         # Get query parameters
         params = event.get("queryStringParameters") or {}
-        limit = int(params.get("limit", 20))
+        limit = parse_limit(params.get("limit"), 20, MAX_LIMIT)
         next_token = params.get("nextToken")
+        fields_mode = parse_fields(params.get("fields"))
 
         print(f"🔍 get_user_articles:")
         print(f"  target_user_id: {target_user_id}")
         print(f"  limit: {limit}")
 
-        # Query articles by ownerId
-        query_params = {
-            'IndexName': 'gsi_owner_createdAt',
-            'KeyConditionExpression': 'ownerId = :owner_id',
-            'ExpressionAttributeNames': {
-                '#status': 'status',
-                '#visibility': 'visibility'
-            },
-            'ExpressionAttributeValues': {
-                ':owner_id': target_user_id,
-                ':visibility': 'public',
-                ':status': 'approved'
-            },
-            # Filter: Only public + approved articles
-            'FilterExpression': '#visibility = :visibility AND (#status = :status OR attribute_not_exists(#status))',
-            'ScanIndexForward': False,  # Newest first
-            'Limit': limit
-        }
-
-        if next_token:
-            query_params['ExclusiveStartKey'] = json.loads(next_token)
-
-        response = table.query(**query_params)
-
-        items = response['Items']
-        next_key = response.get('LastEvaluatedKey')
-
-        # Get user profile information
-        user_profile = _get_user_profile(target_user_id)
+        # Query the sparse approved-owner index: it only holds approved +
+        # public articles, so every item read is returned (no FilterExpression)
+        def read_page(start_key, page_size):
+            query_params = {
+                'IndexName': APPROVED_OWNER_INDEX,
+                'KeyConditionExpression': '#approvedOwner = :owner_id',
+                'ExpressionAttributeNames': {
+                    '#approvedOwner': APPROVED_OWNER_ATTR
+                },
+                'ExpressionAttributeValues': {
+                    ':owner_id': target_user_id
+                },
+                'ScanIndexForward': False,  # Newest first
+                'Limit': page_size
+            }
+            if start_key:
+                query_params['ExclusiveStartKey'] = start_key
+            return table.query(**query_params)
+
+        page = paginate(
+            read_page, limit, next_token,
+            key_attrs=('articleId', 'createdAt'),
+            fixed_key={APPROVED_OWNER_ATTR: target_user_id},
+            scope=f"user:{target_user_id}"
+        )
+        items = page['items']
+        if fields_mode == "full":
+            items = load_full_items(items)
+        print(f"  read calls: {page['readCalls']}, scanned: {page['scannedCount']}")
+
+        # Get user profile information (UserProfilesTable, Cognito fallback)
+        user_profile = get_profiles([target_user_id]).get(target_user_id)
+        if not user_profile:
+            user_profile = get_cognito_profile(target_user_id)
         
-        # Convert Decimal to float/int
+        # Decimal -> int/float happens in the encoder (single pass, no copy)
         processed_items = []
-        for item in items:
-            processed_item = _convert_decimal(item)
+        for processed_item in items:
+            processed_item.pop(APPROVED_OWNER_ATTR, None)
             
             # Backward compatibility: treat articles without status as approved
             if 'status' not in processed_item:
                 processed_item['status'] = 'approved'
             
             # Add user profile info to each item
-            if user_profile:
-                processed_item['ownerDisplayName'] = user_profile.get('displayName')
-                processed_item['ownerUsername'] = user_profile.get('username')
-                processed_item['ownerAvatarUrl'] = user_profile.get('avatarUrl')
+            attach_owner_profile(processed_item, user_profile)
             
             processed_items.append(processed_item)
 
@@ -184,13 +104,15 @@ def lambda_handler(event, context):
             'userProfile': user_profile  # Include user profile in response
         }
         
-        if next_key:
-            result['nextToken'] = json.dumps(next_key)
+        if page['nextToken']:
+            result['nextToken'] = page['nextToken']
 
         print(f"✅ Found {len(processed_items)} public articles for user {target_user_id}")
         print(f"📝 User profile: {user_profile}")
-        return ok(200, result)
+        return ok(200, result, event)
 
+    except (InvalidCursor, InvalidFields) as e:
+        return error(400, str(e))
     except Exception as e:
         print(f"❌ Error in get_user_articles: {e}")
         import traceback
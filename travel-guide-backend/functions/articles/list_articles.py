@@ -1,18 +1,46 @@
 import os
 import json
 import boto3
-from decimal import Decimal
-from cors import ok, error, options
+from cors import ok, error, options, version_etag, if_none_match, not_modified
+from feed_store import query_feed_page, FEED_SHARDS, APPROVED_OWNER_ATTR
+from paginator import paginate, parse_limit, encode_cursor, decode_cursor, InvalidCursor
+from projections import parse_fields, apply_projection, load_full_items, InvalidFields
+from profile_enricher import (
+    enrich_with_owner_profiles, profile_cache_stats, profile_versions, url_etag_window
+)
 
 dynamodb = boto3.resource("dynamodb")
-s3_client = boto3.client('s3')
 
 TABLE_NAME = os.environ["TABLE_NAME"]
-PROFILES_TABLE_NAME = os.environ.get("PROFILES_TABLE_NAME")
-BUCKET_NAME = os.environ.get("BUCKET_NAME", "")
+MAX_LIMIT = 50
 
 table = dynamodb.Table(TABLE_NAME)
-profiles_table = dynamodb.Table(PROFILES_TABLE_NAME) if PROFILES_TABLE_NAME else None
+
+PUBLIC_CURSOR_SCOPE = "list:public"
+
+
+def _feed_page_fingerprint(items):
+    """
+    What the public feed page shows, minus favoriteCount: a favorite click
+    must not invalidate every client's cached feed (the count catches up
+    with the next real change on the page, or on the article page)
+    """
+    return json.dumps(
+        [{k: v for k, v in item.items() if k != 'favoriteCount'} for item in items],
+        sort_keys=True, default=str
+    )
+
+
+def _decode_feed_cursor(next_token):
+    """(before, exhausted) for a public feed nextToken; (None, 0) on the first page"""
+    if not next_token:
+        return None, 0
+    values = decode_cursor(next_token, PUBLIC_CURSOR_SCOPE)
+    # Tokens minted under another shard count can't be resumed
+    if len(values) != 3 or values[0] != FEED_SHARDS:
+        raise InvalidCursor("stale nextToken, reload the feed")
+    return values[1], values[2]
+
 
 def _get_user_id(event):
     headers = event.get("headers") or {}
@@ -52,73 +80,53 @@ def _get_user_id(event):
     return None
 
 
-def _convert_decimal(obj):
-    """Recursively convert Decimal to float/int"""
-    if isinstance(obj, Decimal):
-        return int(obj) if obj % 1 == 0 else float(obj)
-    elif isinstance(obj, dict):
-        return {k: _convert_decimal(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [_convert_decimal(item) for item in obj]
-    return obj
-
-
-def _get_user_profile(user_id, profile_cache):
-    """Get user profile information from cache or UserProfilesTable"""
-    # Check cache first
-    if user_id in profile_cache:
-        return profile_cache[user_id]
-    
+def _get_own_unapproved(user_id, lower=None, upper=None, fields_mode="card"):
+    """Owner's pending/rejected public posts with lower <= createdAt < upper"""
+    key_condition = 'ownerId = :owner_id'
+    values = {
+        ':owner_id': user_id,
+        ':visibility': 'public',
+        ':approved': 'approved'
+    }
+    if lower and upper:
+        key_condition += ' AND createdAt BETWEEN :lower AND :upper'
+        values[':lower'] = lower
+        values[':upper'] = upper
+    elif upper:
+        key_condition += ' AND createdAt < :upper'
+        values[':upper'] = upper
+    elif lower:
+        key_condition += ' AND createdAt >= :lower'
+        values[':lower'] = lower
+
+    query_params = {
+        'IndexName': 'gsi_owner_createdAt',
+        'KeyConditionExpression': key_condition,
+        'FilterExpression': '#visibility = :visibility AND attribute_exists(#status) AND #status <> :approved',
+        'ExpressionAttributeNames': {
+            '#status': 'status',
+            '#visibility': 'visibility'
+        },
+        'ExpressionAttributeValues': values,
+        'ScanIndexForward': False
+    }
+    apply_projection(query_params, fields_mode)
+
+    own_items = []
     try:
-        if profiles_table:
-            response = profiles_table.get_item(Key={'userId': user_id})
-            if 'Item' in response:
-                profile = response['Item']
-                
-                # Generate presigned URLs for avatar and cover if they exist
-                avatar_url = None
-                cover_url = None
-                
-                if profile.get('avatarKey') and BUCKET_NAME:
-                    try:
-                        avatar_url = s3_client.generate_presigned_url(
-                            'get_object',
-                            Params={'Bucket': BUCKET_NAME, 'Key': profile['avatarKey']},
-                            ExpiresIn=3600
-                        )
-                    except Exception as e:
-                        print(f"Error generating avatar URL for {user_id}: {e}")
-                
-                if profile.get('coverImageKey') and BUCKET_NAME:
-                    try:
-                        cover_url = s3_client.generate_presigned_url(
-                            'get_object',
-                            Params={'Bucket': BUCKET_NAME, 'Key': profile['coverImageKey']},
-                            ExpiresIn=3600
-                        )
-                    except Exception as e:
-                        print(f"Error generating cover URL for {user_id}: {e}")
-                
-                result = {
-                    'displayName': profile.get('username'),  # Use username as displayName
-                    'username': profile.get('username'),
-                    'avatarUrl': avatar_url,
-                    'coverImageUrl': cover_url,
-                    'bio': profile.get('bio')
-                }
-                
-                # Cache the result
-                profile_cache[user_id] = result
-                return result
-        
-        # Return None if no profile found
-        profile_cache[user_id] = None
-        return None
-        
+        while True:
+            response = table.query(**query_params)
+            own_items.extend(response.get('Items', []))
+            if 'LastEvaluatedKey' not in response:
+                break
+            query_params['ExclusiveStartKey'] = response['LastEvaluatedKey']
     except Exception as e:
-        print(f"Error getting user profile for {user_id}: {e}")
-        profile_cache[user_id] = None
-        return None
+        print(f"⚠️ Could not load own unapproved posts for {user_id}: {e}")
+
+    # BETWEEN is inclusive; the upper bound belongs to the previous page
+    if upper:
+        own_items = [it for it in own_items if it.get('createdAt', '') < upper]
+    return own_items
 
 
 def lambda_handler(event, context):
@@ -129,8 +137,9 @@ def lambda_handler(event, context):
     try:
         params = event.get("queryStringParameters") or {}
         scope = params.get("scope", "public")
-        limit = int(params.get("limit", 10))
+        limit = parse_limit(params.get("limit"), 10, MAX_LIMIT)
         next_token = params.get("nextToken")
+        fields_mode = parse_fields(params.get("fields"))
 
         user_id = _get_user_id(event)
         
@@ -138,94 +147,106 @@ def lambda_handler(event, context):
         print(f"🔍 list_articles DEBUG:")
         print(f"  scope: {scope}")
         print(f"  user_id: {user_id}")
+        print(f"  fields: {fields_mode}")
         print(f"  headers: {event.get('headers', {})}")
 
         # Query DynamoDB
+        etag = None  # content hash for the owner's own list
         if scope == "mine" and user_id:
             # Query theo ownerId nếu scope là mine (show all statuses for owner)
             # Owner can see their own articles regardless of status (pending/approved/rejected)
-            query_params = {
-                'IndexName': 'gsi_owner_createdAt',
-                'KeyConditionExpression': 'ownerId = :owner_id',
-                'ExpressionAttributeValues': {
-                    ':owner_id': user_id
-                },
-                'ScanIndexForward': False, # Mới nhất trước
-                'Limit': limit
-            }
+            def read_page(start_key, page_size):
+                query_params = {
+                    'IndexName': 'gsi_owner_createdAt',
+                    'KeyConditionExpression': 'ownerId = :owner_id',
+                    'ExpressionAttributeValues': {
+                        ':owner_id': user_id
+                    },
+                    'ScanIndexForward': False, # Mới nhất trước
+                    'Limit': page_size
+                }
+                if start_key:
+                    query_params['ExclusiveStartKey'] = start_key
+                apply_projection(query_params, fields_mode)
+                return table.query(**query_params)
+
             print(f"📝 Querying articles for owner: {user_id} (all statuses)")
+            page = paginate(
+                read_page, limit, next_token,
+                key_attrs=('articleId', 'createdAt'),
+                fixed_key={'ownerId': user_id},
+                scope=f"list:mine:{user_id}"
+            )
+            items = page['items']
         else:
-            # Public feed: Show approved posts + owner's own posts (any status)
-            # This allows users to see their pending/rejected posts in the public feed
-            query_params = {
-                'IndexName': 'gsi_visibility_createdAt',
-                'KeyConditionExpression': 'visibility = :visibility',
-                'ExpressionAttributeNames': {
-                    '#status': 'status',
-                    '#ownerId': 'ownerId'
-                },
-                'ExpressionAttributeValues': {
-                    ':visibility': 'public',
-                    ':status': 'approved'
-                },
-                'ScanIndexForward': False, # Mới nhất trước
-                'Limit': limit
-            }
-            
-            # Filter: Show approved posts from everyone + all posts from current user
+            # Public feed: parallel key-range reads on every shard of the
+            # materialized feed table, merged newest first (only approved
+            # public articles live there, so the page is always full)
+            before, exhausted = _decode_feed_cursor(next_token)
+            feed_page = query_feed_page(limit, before, exhausted)
+            items = feed_page['items']
+            page = {'nextToken': None}
+            if feed_page['hasMore']:
+                page['nextToken'] = encode_cursor(
+                    [FEED_SHARDS, feed_page['before'], feed_page['exhausted']], PUBLIC_CURSOR_SCOPE
+                )
+            print(f"📝 Feed: {FEED_SHARDS} shards, {feed_page['readCalls']} reads, {feed_page['scannedCount']} entries read")
+            # Feed entries are cards already; full items cost one BatchGetItem per page
+            if fields_mode == "full":
+                items = load_full_items(items)
+
+            # Overlay: current user's own pending/rejected posts in the same time window
             if user_id:
-                # Logged in: (approved OR no status) OR (my own post regardless of status)
-                # This means: show approved posts from others + all my posts
-                query_params['FilterExpression'] = '((#status = :status OR attribute_not_exists(#status)) OR #ownerId = :userId)'
-                query_params['ExpressionAttributeValues'][':userId'] = user_id
-                print(f"📝 Public feed for user {user_id}: approved posts from all + own posts (any status)")
+                upper = before.split('#', 1)[0] if before else None
+                lower = items[-1]['createdAt'] if (page['nextToken'] and items) else None
+                own_items = _get_own_unapproved(user_id, lower, upper, fields_mode)
+                if own_items:
+                    items = sorted(items + own_items, key=lambda x: x.get('createdAt', ''), reverse=True)
+                print(f"📝 Public feed for user {user_id}: {len(own_items)} own unapproved posts merged")
             else:
-                # Not logged in: show only approved posts
-                query_params['FilterExpression'] = '(#status = :status OR attribute_not_exists(#status))'
                 print(f"📝 Public feed for guest: approved posts only")
 
-        if next_token:
-            query_params['ExclusiveStartKey'] = json.loads(next_token)
-
-        response = table.query(**query_params)
-
-        items = response['Items']
-        next_key = response.get('LastEvaluatedKey')
-
-        # Cache for user profiles to avoid duplicate queries
-        profile_cache = {}
-
-        # Chuyển Decimal sang float/int cho frontend (recursive) + enrich profile info
+            # Validator from the page itself (no global feed version to hit on
+            # every write): the entries read, the versions of the page's
+            # owner profiles, or presigned URLs getting old. 304 skips the enrichment and the
+            # serialization.
+            etag = version_etag(
+                'feed', _feed_page_fingerprint(items), page['nextToken'],
+                profile_versions(item.get('ownerId') for item in items),
+                url_etag_window(), user_id, fields_mode
+            )
+            if if_none_match(event, etag):
+                print(f"📝 Public feed not modified ({etag})")
+                return not_modified(etag)
+
+        # Decimal -> int/float happens in the encoder (single pass, no copy)
         processed_items = []
-        for item in items:
-            processed_item = _convert_decimal(item)
+        for processed_item in items:
+            processed_item.pop('feedKey', None)
+            processed_item.pop('sortKey', None)
+            processed_item.pop(APPROVED_OWNER_ATTR, None)
             
             # Backward compatibility: treat articles without status as approved
             if 'status' not in processed_item:
                 processed_item['status'] = 'approved'
             
-            # Enrich with owner profile information
-            owner_id = processed_item.get('ownerId')
-            if owner_id:
-                owner_profile = _get_user_profile(owner_id, profile_cache)
-                if owner_profile:
-                    processed_item['ownerDisplayName'] = owner_profile.get('displayName')
-                    processed_item['ownerUsername'] = owner_profile.get('username')
-                    processed_item['ownerAvatarUrl'] = owner_profile.get('avatarUrl')
-                    processed_item['ownerCoverImageUrl'] = owner_profile.get('coverImageUrl')
-                    processed_item['ownerBio'] = owner_profile.get('bio')
-            
             processed_items.append(processed_item)
 
+        # Enrich with owner profile information (one batched lookup per page)
+        enrich_with_owner_profiles(processed_items)
+
         result = {
             'items': processed_items
         }
-        if next_key:
-            result['nextToken'] = json.dumps(next_key)
+        if page['nextToken']:
+            result['nextToken'] = page['nextToken']
 
         print(f"✅ Returned {len(processed_items)} articles with enriched profile info")
-        return ok(200, result)
+        print(f"📊 Profile cache: {profile_cache_stats()}")
+        return ok(200, result, event, etag)
 
+    except (InvalidCursor, InvalidFields) as e:
+        return error(400, str(e))
     except Exception as e:
         print(f"Error in list_articles: {e}")
         return error(500, f"internal error: {e}")
\ No newline at end of file
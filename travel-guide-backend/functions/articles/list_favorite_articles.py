@@ -1,10 +1,12 @@
 # functions/articles/list_favorite_articles.py
 import os
-import json
 import boto3
-from decimal import Decimal
 from boto3.dynamodb.conditions import Key
 from cors import ok, error, options
+from dynamo_batch import batch_get_items
+from paginator import paginate, parse_limit, InvalidCursor
+from projections import parse_fields, card_projection, InvalidFields
+from profile_enricher import enrich_with_owner_profiles
 
 dynamodb = boto3.resource("dynamodb")
 
@@ -14,6 +16,9 @@ FAVORITES_TABLE_NAME = os.environ["FAVORITES_TABLE_NAME"]
 articles_table = dynamodb.Table(ARTICLES_TABLE_NAME)
 favorites_table = dynamodb.Table(FAVORITES_TABLE_NAME)
 
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 200
+
 
 def _get_current_user_id(event):
     headers = event.get("headers") or {}
@@ -31,26 +36,6 @@ def _get_current_user_id(event):
     return None
 
 
-def _convert_decimal(obj):
-    """
-    Tiện ích nhỏ: chuyển Decimal sang float/int cho lat/lng và favoriteCount.
-    """
-    if isinstance(obj, list):
-        return [_convert_decimal(x) for x in obj]
-    if isinstance(obj, dict):
-        out = {}
-        for k, v in obj.items():
-            if isinstance(v, Decimal):
-                # Chuyển Decimal sang int nếu là số nguyên, ngược lại float
-                out[k] = int(v) if v % 1 == 0 else float(v)
-            elif isinstance(v, (dict, list)):
-                out[k] = _convert_decimal(v)
-            else:
-                out[k] = v
-        return out
-    return obj
-
-
 def lambda_handler(event, context):
     method = (event.get("httpMethod") or
               event.get("requestContext", {}).get("http", {}).get("method"))
@@ -65,46 +50,61 @@ def lambda_handler(event, context):
         if not user_id:
             return error(401, "Unauthorized: user not found")
 
-        # 1. Lấy danh sách favorite theo userId
-        fav_resp = favorites_table.query(
-            KeyConditionExpression=Key("userId").eq(user_id)
-        )
-
-        fav_items = fav_resp.get("Items", [])
-        article_ids = [item["articleId"] for item in fav_items]
-
-        if not article_ids:
-            return ok(200, {"items": [], "count": 0})
-
-        # 2. BatchGet sang ArticlesTable
-        #    (BatchGet tối đa 100 keys/1 lần; ở đây demo đơn giản)
-        keys = [{"articleId": aid} for aid in article_ids]
-
-        client = dynamodb.meta.client
-        batch_resp = client.batch_get_item(
-            RequestItems={
-                ARTICLES_TABLE_NAME: {
-                    "Keys": keys
-                }
+        params = event.get("queryStringParameters") or {}
+        limit = parse_limit(params.get("limit"), DEFAULT_LIMIT, MAX_LIMIT)
+        next_token = params.get("nextToken")
+        fields_mode = parse_fields(params.get("fields"))
+        projection, projection_names = card_projection() if fields_mode == "card" else (None, None)
+
+        # 1. Lấy danh sách favorite theo userId (từng trang)
+        def read_page(start_key, page_size):
+            query_params = {
+                "KeyConditionExpression": Key("userId").eq(user_id),
+                "Limit": page_size,
+            }
+            if start_key:
+                query_params["ExclusiveStartKey"] = start_key
+            return favorites_table.query(**query_params)
+
+        # 2. BatchGet sang ArticlesTable (chia lô 100 keys);
+        #    bài đã bị xoá sẽ bị bỏ qua nhưng vẫn giữ đúng vị trí cursor
+        def join_articles(fav_items):
+            keys = [{"articleId": fav["articleId"]} for fav in fav_items]
+            found = {
+                art["articleId"]: art
+                for art in batch_get_items(ARTICLES_TABLE_NAME, keys, projection, projection_names)
             }
+            return [found.get(fav["articleId"]) for fav in fav_items]
+
+        page = paginate(
+            read_page, limit, next_token,
+            key_attrs=("articleId",),
+            fixed_key={"userId": user_id},
+            scope=f"favorites:{user_id}",
+            transform=join_articles
         )
+        articles = page["items"]
 
-        articles = batch_resp["Responses"].get(ARTICLES_TABLE_NAME, [])
-
-        # 3. Convert Decimal và đảm bảo có username
+        # 3. Đảm bảo có username (Decimal được encoder chuyển khi serialize)
         processed = []
-        for art in articles:
-            obj = _convert_decimal(art)
+        for obj in articles:
             # Đảm bảo có username để hiển thị tên người đăng
             if "username" not in obj or not obj["username"]:
                 obj["username"] = "Người dùng ẩn danh"
             processed.append(obj)
 
-        return ok(200, {
+        enrich_with_owner_profiles(processed)
+
+        result = {
             "items": processed,
             "count": len(processed),
-        })
+        }
+        if page["nextToken"]:
+            result["nextToken"] = page["nextToken"]
+        return ok(200, result, event)
 
+    except (InvalidCursor, InvalidFields) as e:
+        return error(400, str(e))
     except Exception as e:
         print("Error in list_favorite_articles:", e)
         return error(500, "Internal server error")
@@ -0,0 +1,341 @@
+"""
+Map clusters - precomputed geohash cluster tree of the public articles
+
+MapClustersTable holds, for every geohash cell of precision 1..LEAF_PRECISION
+that contains at least one approved + public article, one aggregate item:
+
+    parent = cell[:-1] ("*" for precision 1)      cell = "<geohash prefix>"
+    count, latSum, lngSum                         (centroid = sums / count)
+    repId, repCreatedAt, repThumbnailKey          (newest article: thumbnail)
+
+so the children of any cell - the clusters one level finer - are one Query,
+and a map view at a given zoom is a few parallel Queries (query_clusters)
+whatever the number of articles under it. Zooms from LEAF_ZOOM on get the
+articles themselves (geo_index.query_bbox).
+
+The tree is maintained from the write paths, off the request path.
+feed_store.sync_sparse_attrs keeps the sparse article attribute
+    clusterPoint = {cell, lat, lng, createdAt, thumbnailKey}
+which exists exactly while the article is counted in the tree, and moves
+it with a conditional update; only the writer whose update succeeded
+queues the move (queue_map_move) on MAP_UPDATES_QUEUE_URL. delete_article
+queues the clusterPoint of the deleted item. Every move touches a cell at
+each precision 1..LEAF_PRECISION, so the coarse cells are shared by
+everything; the map worker (map_worker.py) applies the queued moves in
+batches (apply_cluster_moves), one write per cell the batch touched.
+
+Cells are rebuilt, not incremented: a dirty leaf is recomputed from
+gsi_geo_cell, with the articles of the batch taken from their current
+clusterPoint (current_points: the GSI may not show those writes yet), and
+every parent is then recomputed from its children, finest first. Applying
+a batch twice writes the same items, so a failed batch is simply
+redelivered by SQS, in any order, and the tree can't drift. Without a
+queue (backfill, local runs) moves are applied right away. Articles
+approved before the tree existed: backfill target "approved_index".
+Keep functions/rekognition/map_clusters.py in sync.
+"""
+import os
+import json
+import threading
+import boto3
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+from geo import (
+    GEOHASH_PRECISION, GEO_CELL_PRECISION, GEO_INDEX, is_geohash, cover_count, cover_cells, decode_bbox,
+)
+
+dynamodb = boto3.resource("dynamodb")
+sqs_client = boto3.client("sqs")
+
+MAP_CLUSTERS_TABLE_NAME = os.environ.get("MAP_CLUSTERS_TABLE_NAME", "")
+clusters_table = dynamodb.Table(MAP_CLUSTERS_TABLE_NAME) if MAP_CLUSTERS_TABLE_NAME else None
+TABLE_NAME = os.environ.get("TABLE_NAME", "")
+MAP_UPDATES_QUEUE_URL = os.environ.get("MAP_UPDATES_QUEUE_URL", "")
+
+CLUSTER_ATTR = "clusterPoint"
+ROOT_PARENT = "*"
+LEAF_PRECISION = 7  # ~150 m cells; finer zooms list articles
+LEAF_ZOOM = 16
+MAX_ZOOM = 22
+MAX_CLUSTER_QUERIES = 64  # parent cells queried per view (<= 32 children each), as geo.MAX_CELL_QUERIES
+
+_executor = None
+_local = threading.local()
+
+
+def _pool():
+    """Module-level pool: threads (and their tables) survive warm invocations"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="clusters")
+    return _executor
+
+
+def _table(table_name):
+    """boto3 resources are not thread-safe: one Table object per thread and table"""
+    tables = getattr(_local, "tables", None)
+    if tables is None:
+        tables = _local.tables = {}
+    if table_name not in tables:
+        tables[table_name] = boto3.session.Session().resource("dynamodb").Table(table_name)
+    return tables[table_name]
+
+
+def _parent(cell):
+    return cell[:-1] or ROOT_PARENT
+
+
+def _cluster_key(cell):
+    return {"parent": _parent(cell), "cell": cell}
+
+
+def cluster_point(item):
+    """clusterPoint value of an article (call for visible ones), None without a geohash"""
+    geohash = item.get("geohash")
+    if not is_geohash(geohash, GEOHASH_PRECISION) or item.get("lat") is None or item.get("lng") is None:
+        return None
+    point = {
+        "cell": geohash[:LEAF_PRECISION],
+        "lat": Decimal(str(item["lat"])),
+        "lng": Decimal(str(item["lng"])),
+        "createdAt": item.get("createdAt", ""),
+    }
+    thumbnail_key = item.get("thumbnailKey") or item.get("imageKey")
+    if thumbnail_key:
+        point["thumbnailKey"] = thumbnail_key
+    return point
+
+
+def _path(point):
+    return [point["cell"][:precision] for precision in range(1, len(point["cell"]) + 1)] if point else []
+
+
+# ---- Writes ----
+
+def _write_cell(cell, points_count, lat_sum, lng_sum, representative):
+    """Replace a cell's aggregate item (delete it once empty); representative: (id, createdAt, thumbnailKey)"""
+    table = _table(MAP_CLUSTERS_TABLE_NAME)
+    if points_count <= 0:
+        table.delete_item(Key=_cluster_key(cell))
+        return
+    rep_id, created_at, thumbnail_key = representative
+    item = {
+        **_cluster_key(cell),
+        "count": points_count, "latSum": lat_sum, "lngSum": lng_sum,
+        "repId": rep_id, "repCreatedAt": created_at,
+    }
+    if thumbnail_key:
+        item["repThumbnailKey"] = thumbnail_key
+    table.put_item(Item=item)
+
+
+def _read_leaf(cell):
+    """{articleId: clusterPoint} of the articles gsi_geo_cell holds in a leaf cell"""
+    query_params = {
+        "IndexName": GEO_INDEX,
+        "KeyConditionExpression": "geoCell = :cell AND begins_with(geohash, :prefix)",
+        "ExpressionAttributeValues": {":cell": cell[:GEO_CELL_PRECISION], ":prefix": cell},
+        "ProjectionExpression": "articleId, geohash, lat, lng, createdAt, thumbnailKey, imageKey",
+    }
+    points = {}
+    while True:
+        response = _table(TABLE_NAME).query(**query_params)
+        for item in response.get("Items", []):
+            point = cluster_point(item)
+            if point:
+                points[item["articleId"]] = point
+        if not response.get("LastEvaluatedKey"):
+            return points
+        query_params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def _rebuild_leaf(cell, current):
+    """Recompute a leaf from gsi_geo_cell, the articles of current ({articleId: clusterPoint}) on top"""
+    points = _read_leaf(cell)
+    for article_id, point in current.items():
+        points.pop(article_id, None)
+        if point and point["cell"] == cell:
+            points[article_id] = point
+    newest = max(points, key=lambda article_id: (points[article_id]["createdAt"], article_id), default=None)
+    _write_cell(
+        cell, len(points),
+        sum((point["lat"] for point in points.values()), Decimal(0)),
+        sum((point["lng"] for point in points.values()), Decimal(0)),
+        (newest, points[newest]["createdAt"], points[newest].get("thumbnailKey")) if newest else None,
+    )
+
+
+def _rebuild_parent(cell):
+    """Recompute a cell from its children (already rebuilt)"""
+    children, _ = _query_children(cell, consistent=True)
+    children = [child for child in children if int(child.get("count", 0)) > 0]
+    newest = max(children, key=lambda child: (child.get("repCreatedAt", ""), child.get("repId", "")), default=None)
+    _write_cell(
+        cell, sum(int(child["count"]) for child in children),
+        sum((child["latSum"] for child in children), Decimal(0)),
+        sum((child["lngSum"] for child in children), Decimal(0)),
+        (newest.get("repId"), newest.get("repCreatedAt", ""), newest.get("repThumbnailKey")) if newest else None,
+    )
+
+
+def current_points(article_ids):
+    """{articleId: current clusterPoint, None when not counted} (consistent reads, in parallel)"""
+    article_ids = sorted(set(article_ids))
+
+    def read(article_id):
+        response = _table(TABLE_NAME).get_item(
+            Key={"articleId": article_id},
+            ProjectionExpression="articleId, #point",
+            ExpressionAttributeNames={"#point": CLUSTER_ATTR},
+            ConsistentRead=True,
+        )
+        return response.get("Item", {}).get(CLUSTER_ATTR)
+
+    return dict(zip(article_ids, _pool().map(read, article_ids)))
+
+
+def apply_cluster_moves(moves, current):
+    """
+    Apply clusterPoint moves [(articleId, old point, new point)] (None: not
+    counted); current: current_points() of their articles. Rebuilds every
+    leaf a move left or entered, then their ancestors level by level.
+    Idempotent and order-free; raises on failure (the map worker has SQS
+    redeliver the batch).
+    """
+    if not clusters_table:
+        return
+    level = {
+        point["cell"]
+        for article_id, old_point, new_point in moves
+        for point in (old_point, new_point, current.get(article_id))
+        if point
+    }
+    list(_pool().map(lambda cell: _rebuild_leaf(cell, current), level))
+    while level:
+        level = {cell[:-1] for cell in level if len(cell) > 1}
+        list(_pool().map(_rebuild_parent, level))
+
+
+def move_in_clusters(article_id, old_point, new_point):
+    """
+    Apply one article's move right away; new_point is its current
+    clusterPoint. Returns True on success; never raises.
+    """
+    if not clusters_table or old_point == new_point:
+        return False
+    try:
+        apply_cluster_moves([(article_id, old_point, new_point)], {article_id: new_point})
+        return True
+    except Exception as e:
+        print(f"⚠️ Failed to update map clusters for {article_id}: {e}")
+        return False
+
+
+def _encode_point(point):
+    return {**point, "lat": str(point["lat"]), "lng": str(point["lng"])} if point else None
+
+
+def _decode_point(point):
+    return {**point, "lat": Decimal(point["lat"]), "lng": Decimal(point["lng"])} if point else None
+
+
+def decode_move(body):
+    """(articleId, old point, new point) of a queued move (queue_map_move)"""
+    move = json.loads(body)
+    return move["articleId"], _decode_point(move.get("old")), _decode_point(move.get("new"))
+
+
+def queue_map_move(article_id, old_point, new_point):
+    """
+    Hand an article's clusterPoint move to the map worker (map_worker.py)
+    instead of updating the tree (and the map tiles) on the request path.
+    Without a queue, or when the send fails, the move is applied to the
+    tree right away; its tiles catch up at the next rebuild of the tile or
+    the backfill. Returns True on success; never raises.
+    """
+    if not clusters_table or old_point == new_point:
+        return False
+    if MAP_UPDATES_QUEUE_URL:
+        try:
+            sqs_client.send_message(
+                QueueUrl=MAP_UPDATES_QUEUE_URL,
+                MessageBody=json.dumps({
+                    "articleId": article_id, "old": _encode_point(old_point), "new": _encode_point(new_point),
+                }),
+            )
+            return True
+        except Exception as e:
+            print(f"⚠️ Failed to queue map move for {article_id}, applying it now: {e}")
+    return move_in_clusters(article_id, old_point, new_point)
+
+
+# ---- Reads ----
+
+def cluster_precision(zoom):
+    """Cluster cells about 32-64 px wide on a 256 px tile map at this zoom"""
+    return max(1, min(LEAF_PRECISION, round((zoom + 2) * 2 / 5)))
+
+
+def _intersects(cell, bbox):
+    min_lat, min_lng, max_lat, max_lng = decode_bbox(cell)
+    return min_lat <= bbox[2] and max_lat >= bbox[0] and min_lng <= bbox[3] and max_lng >= bbox[1]
+
+
+def _query_children(parent, consistent=False):
+    table = _table(MAP_CLUSTERS_TABLE_NAME)
+    query_params = {
+        "KeyConditionExpression": "#parent = :parent",
+        "ExpressionAttributeNames": {"#parent": "parent"},  # reserved word
+        "ExpressionAttributeValues": {":parent": parent},
+        "ConsistentRead": consistent,
+    }
+    items, read_calls = [], 0
+    while True:
+        response = table.query(**query_params)
+        read_calls += 1
+        items.extend(response.get("Items", []))
+        if not response.get("LastEvaluatedKey"):
+            return items, read_calls
+        query_params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def to_cluster(item):
+    count = int(item["count"])
+    cluster = {
+        "cell": item["cell"],
+        "count": count,
+        "lat": round(float(item["latSum"]) / count, 6),
+        "lng": round(float(item["lngSum"]) / count, 6),
+        "articleId": item.get("repId"),
+    }
+    if item.get("repThumbnailKey"):
+        cluster["thumbnailKey"] = item["repThumbnailKey"]
+    return cluster
+
+
+def query_clusters(bbox, zoom):
+    """
+    Clusters of the cells at cluster_precision(zoom) that intersect bbox =
+    (min_lat, min_lng, max_lat, max_lng), biggest first. A box too large
+    for MAX_CLUSTER_QUERIES parents at that precision gets coarser cells.
+
+    Returns {'clusters', 'precision', 'readCalls'}.
+    """
+    precision = cluster_precision(zoom)
+    while precision > 1 and cover_count(bbox, precision - 1) > MAX_CLUSTER_QUERIES:
+        precision -= 1
+    parents = cover_cells(bbox, precision - 1) if precision > 1 else [ROOT_PARENT]
+    results = list(_pool().map(_query_children, parents)) if len(parents) > 1 else [_query_children(parents[0])]
+
+    clusters = [
+        to_cluster(item)
+        for items, _ in results
+        for item in items
+        if int(item.get("count", 0)) > 0 and _intersects(item["cell"], bbox)
+    ]
+    clusters.sort(key=lambda c: (-c["count"], c["cell"]))
+    return {
+        "clusters": clusters,
+        "precision": precision,
+        "readCalls": sum(calls for _, calls in results),
+    }
@@ -0,0 +1,239 @@
+"""
+Map tiles - static z/x/y tiles of the public article points in S3
+
+Map traffic is read-heavy and the same for everybody, so the points of the
+approved + public articles are precomputed into standard web-map tiles at
+TILE_ZOOM and written to MAP_TILES_BUCKET as compact JSON:
+
+    tiles/<z>/<x>/<y>.json
+    {"z": 12, "x": 3261, "y": 1916, "fields": ["id", "lat", "lng", "thumbnailKey"],
+     "points": [["a1b2...", 10.7769, 106.7009, "thumbnails/..._256.webp"], ...]}
+
+CloudFront serves them (path tiles/*) with a long edge TTL, so panning the
+map never reaches DynamoDB nor S3; the client fetches the few tiles covering its view (at TILE_ZOOM
+every tile is ~10 km wide).
+
+Tiles are regenerated only where something changed, and never on the
+request path: an article's clusterPoint move (feed_store.sync_sparse_attrs:
+approval / rejection, edits of a public article; delete_article) is queued
+(map_clusters.queue_map_move), and the map worker (map_worker.py) calls
+refresh_tiles() on each batch: the tiles of the old and new points are
+marked dirty and each dirty tile is rebuilt once, however many moves of the
+batch touched it. A tile is rebuilt from gsi_geo_cell (one prefix Query per
+cover cell) with the batch's articles at their current clusterPoint on
+top, since the GSI may not show those writes yet - so a rebuild can be
+repeated: refresh_tiles() raises on failure and the worker has SQS
+redeliver the batch. The worker runs one batch at a time (reserved
+concurrency 1), so two rebuilds of a tile never race on its put_object.
+The tiles rebuilt by a batch are then invalidated on the CloudFront
+distribution (MAP_TILES_DISTRIBUTION_ID) in one CreateInvalidation per
+batch, a single tiles/* wildcard past MAX_INVALIDATION_PATHS; without a
+distribution the tiles get a short max-age instead. A tile that becomes
+empty is written with no points rather than deleted (a missing key is
+answered with index.html by the distribution's error pages). Existing
+articles: backfill target "map_tiles" (run it while the queue is drained:
+it writes tiles directly). Keep functions/rekognition/map_tiles.py in sync.
+"""
+import os
+import json
+import math
+import time
+import threading
+import boto3
+from concurrent.futures import ThreadPoolExecutor
+from geo import GEO_CELL_PRECISION, GEO_INDEX, plan_cover
+
+s3 = boto3.client("s3")
+cloudfront = boto3.client("cloudfront")
+
+MAP_TILES_BUCKET = os.environ.get("MAP_TILES_BUCKET", "")
+MAP_TILES_DISTRIBUTION_ID = os.environ.get("MAP_TILES_DISTRIBUTION_ID", "")
+TABLE_NAME = os.environ.get("TABLE_NAME", "")
+
+TILE_ZOOM = int(os.environ.get("MAP_TILE_ZOOM", "12"))
+TILE_PREFIX = "tiles/"
+TILE_FIELDS = ["id", "lat", "lng", "thumbnailKey"]
+MAX_TILE_POINTS = 5000  # a denser tile is cut (truncated: true)
+CELL_QUERY_LIMIT = 500
+MAX_MERCATOR_LAT = 85.0511287798  # web-map tiles stop here
+# Edge caches keep a tile until it is invalidated; browsers re-check after a minute
+INVALIDATED_CACHE_CONTROL = "public, max-age=60, s-maxage=31536000"
+SHORT_CACHE_CONTROL = "public, max-age=60"
+MAX_INVALIDATION_PATHS = 100  # per batch; more: one tiles/* wildcard
+
+_executor = None
+_local = threading.local()
+
+
+def _pool():
+    """Module-level pool: threads (and their tables) survive warm invocations"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="tiles")
+    return _executor
+
+
+def _table():
+    """boto3 resources are not thread-safe: one Table object per thread"""
+    table = getattr(_local, "table", None)
+    if table is None:
+        table = _local.table = boto3.session.Session().resource("dynamodb").Table(TABLE_NAME)
+    return table
+
+
+# ---- Tile math (web mercator, the z/x/y scheme of OSM / Leaflet) ----
+
+def tile_xy(lat, lng, zoom=TILE_ZOOM):
+    """(x, y) of the tile holding a point"""
+    n = 1 << zoom
+    lat = max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, float(lat)))
+    x = int((float(lng) + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_bbox(zoom, x, y):
+    """(min_lat, min_lng, max_lat, max_lng) of a tile"""
+    n = 1 << zoom
+
+    def lat_of(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return lat_of(y + 1), x / n * 360.0 - 180.0, lat_of(y), (x + 1) / n * 360.0 - 180.0
+
+
+def tile_key(zoom, x, y):
+    return f"{TILE_PREFIX}{zoom}/{x}/{y}.json"
+
+
+def point_tile(point):
+    """Tile (TILE_ZOOM, x, y) of a clusterPoint"""
+    return (TILE_ZOOM,) + tile_xy(point["lat"], point["lng"])
+
+
+def _tile_point(article_id, lat, lng, thumbnail_key):
+    return [article_id, round(float(lat), 6), round(float(lng), 6), thumbnail_key]
+
+
+# ---- Build ----
+
+def _read_cell(cell, max_items):
+    query_params = {
+        "IndexName": GEO_INDEX,
+        "KeyConditionExpression": "geoCell = :cell AND begins_with(geohash, :prefix)",
+        "ExpressionAttributeValues": {":cell": cell[:GEO_CELL_PRECISION], ":prefix": cell},
+        "ProjectionExpression": "articleId, lat, lng, thumbnailKey, imageKey",
+        "Limit": min(CELL_QUERY_LIMIT, max_items),
+    }
+    items = []
+    while True:
+        response = _table().query(**query_params)
+        items.extend(response.get("Items", []))
+        start_key = response.get("LastEvaluatedKey")
+        if not start_key:
+            return items, False
+        if len(items) >= max_items:
+            return items, True
+        query_params["ExclusiveStartKey"] = start_key
+
+
+def build_tile(zoom, x, y, overrides=None):
+    """
+    Tile body from gsi_geo_cell. overrides: {articleId: current clusterPoint
+    (None: gone)} of the articles that triggered the rebuild, which override
+    whatever the GSI still returns for them.
+    """
+    cells = plan_cover(tile_bbox(zoom, x, y))
+    results = list(_pool().map(lambda cell: _read_cell(cell, MAX_TILE_POINTS), cells))
+    points = {}
+    for items, _ in results:
+        for item in items:
+            if item.get("lat") is None or item.get("lng") is None or tile_xy(item["lat"], item["lng"], zoom) != (x, y):
+                continue  # cover cells overhang the tile
+            points[item["articleId"]] = _tile_point(
+                item["articleId"], item["lat"], item["lng"], item.get("thumbnailKey") or item.get("imageKey"),
+            )
+    for article_id, point in (overrides or {}).items():
+        points.pop(article_id, None)
+        if point and tile_xy(point["lat"], point["lng"], zoom) == (x, y):
+            points[article_id] = _tile_point(article_id, point["lat"], point["lng"], point.get("thumbnailKey"))
+    truncated = any(cut for _, cut in results) or len(points) > MAX_TILE_POINTS
+    body = {
+        "z": zoom, "x": x, "y": y,
+        "fields": TILE_FIELDS,
+        "points": [points[key] for key in sorted(points)][:MAX_TILE_POINTS],
+    }
+    if truncated:
+        body["truncated"] = True
+    return body
+
+
+def write_tile(body):
+    s3.put_object(
+        Bucket=MAP_TILES_BUCKET,
+        Key=tile_key(body["z"], body["x"], body["y"]),
+        Body=json.dumps(body, separators=(",", ":")).encode("utf-8"),
+        ContentType="application/json",
+        CacheControl=INVALIDATED_CACHE_CONTROL if MAP_TILES_DISTRIBUTION_ID else SHORT_CACHE_CONTROL,
+    )
+
+
+def invalidate_tiles(tiles):
+    """Drop the tiles from the CloudFront edge caches in one invalidation (no-op without a distribution)"""
+    if not MAP_TILES_DISTRIBUTION_ID or not tiles:
+        return
+    paths = [f"/{tile_key(*tile)}" for tile in sorted(tiles)]
+    if len(paths) > MAX_INVALIDATION_PATHS:
+        paths = [f"/{TILE_PREFIX}*"]  # one wildcard path
+    cloudfront.create_invalidation(
+        DistributionId=MAP_TILES_DISTRIBUTION_ID,
+        InvalidationBatch={
+            "Paths": {"Quantity": len(paths), "Items": paths},
+            "CallerReference": f"tiles-{time.time_ns()}",
+        },
+    )
+
+
+def rebuild_tiles(tiles, overrides=None):
+    """Rebuild and write tiles, then invalidate them all at once; returns the bodies"""
+    tiles = sorted(set(tiles))
+    # One tile at a time: build_tile already reads its cells on the pool
+    bodies = [build_tile(*tile, overrides=overrides) for tile in tiles]
+    list(_pool().map(write_tile, bodies))
+    invalidate_tiles(tiles)
+    return bodies
+
+
+def refresh_tiles(moves, current):
+    """
+    Rebuild the tiles dirtied by clusterPoint moves [(articleId, old point,
+    new point)] (None: not shown), each once; current: the articles'
+    current clusterPoint (map_clusters.current_points), which overrides the
+    GSI. Returns the number of tiles rebuilt; raises on failure (the map
+    worker has SQS redeliver the batch).
+    """
+    if not MAP_TILES_BUCKET:
+        return 0
+    tiles = {
+        point_tile(point)
+        for article_id, old_point, new_point in moves
+        for point in (old_point, new_point, current.get(article_id))
+        if point
+    }
+    return len(rebuild_tiles(tiles, current))
+
+
+def list_tiles(zoom=TILE_ZOOM):
+    """Every tile already written at this zoom (for full rebuilds)"""
+    tiles, kwargs = set(), {"Bucket": MAP_TILES_BUCKET, "Prefix": f"{TILE_PREFIX}{zoom}/"}
+    while True:
+        response = s3.list_objects_v2(**kwargs)
+        for obj in response.get("Contents", []):
+            try:
+                z, x, y = obj["Key"][len(TILE_PREFIX):-len(".json")].split("/")
+                tiles.add((int(z), int(x), int(y)))
+            except ValueError:
+                continue
+        if not response.get("IsTruncated"):
+            return tiles
+        kwargs["ContinuationToken"] = response["NextContinuationToken"]
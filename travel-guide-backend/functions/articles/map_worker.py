@@ -0,0 +1,50 @@
+"""
+Map-Worker Lambda Function
+Applies the map moves queued by the article write paths
+(map_clusters.queue_map_move) off the request path
+
+Triggered by MapUpdatesQueue in batches: the cluster cells the batch
+touched are rebuilt once each (map_clusters.apply_cluster_moves), however
+many of its moves share them, and every static tile the batch dirtied is
+rebuilt once and invalidated in one CloudFront call (map_tiles.refresh_tiles).
+Runs one batch at a time (reserved concurrency 1): it is the only writer
+of the tiles. Batches collect up to a minute of moves, which bounds the
+invalidations to about one a minute.
+
+Both rebuilds are idempotent and read the articles' current clusterPoint,
+so a failed batch is handed back to SQS (ReportBatchItemFailures) and
+simply redelivered, in any order; after maxReceiveCount tries the moves
+land in MapUpdatesDLQ. Malformed messages go the same way.
+"""
+from map_clusters import apply_cluster_moves, current_points, decode_move
+from map_tiles import refresh_tiles
+
+
+def lambda_handler(event, context):
+    """
+    Lambda handler for the map worker
+    Triggered by SQS messages {articleId, old, new} (clusterPoint before/after)
+    Returns the messages to redeliver: {'batchItemFailures': [{'itemIdentifier'}]}
+    """
+    records = event.get('Records', [])
+    print(f"Map-Worker - Processing {len(records)} SQS messages")
+
+    moves, failed_ids = [], []
+    for record in records:
+        try:
+            moves.append(decode_move(record['body']))
+        except Exception as e:
+            print(f"⚠️ Malformed map move {record.get('messageId')}: {e}")
+            failed_ids.append(record['messageId'])
+
+    if moves:
+        try:
+            current = current_points(article_id for article_id, _, _ in moves)
+            apply_cluster_moves(moves, current)
+            tiles_rebuilt = refresh_tiles(moves, current)
+            print(f"✅ Applied {len(moves)} map moves, rebuilt {tiles_rebuilt} tiles")
+        except Exception as e:
+            print(f"⚠️ Map batch failed, {len(records)} messages back to the queue: {e}")
+            failed_ids = [record['messageId'] for record in records]
+
+    return {'batchItemFailures': [{'itemIdentifier': message_id} for message_id in failed_ids]}
@@ -0,0 +1,77 @@
+from cors import ok, error, options
+from feed_store import is_feed_visible
+from geo_index import query_nearby
+from paginator import parse_limit
+from projections import parse_fields, load_full_items, InvalidFields
+from profile_enricher import enrich_with_owner_profiles
+
+# "Bài viết gần tôi": k bài public gần nhất trong bán kính radius (km)
+DEFAULT_RADIUS_KM = 10
+MAX_RADIUS_KM = 100
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+
+
+def _parse_coordinate(value, name, bound):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} is required and must be a number")
+    if not -bound <= number <= bound:
+        raise ValueError(f"Invalid {'latitude' if name == 'lat' else 'longitude'}")
+    return number
+
+
+def lambda_handler(event, context):
+    """
+    Approved public articles nearest to a point
+    GET /nearby?lat=<lat>&lng=<lng>[&radius=<km>][&limit=<k>][&fields=card|full]
+
+    Returns:
+    - items: up to `limit` articles within `radius` km, nearest first, each
+      with distanceKm (great-circle distance)
+    - radiusKm: the radius actually used (clamped to MAX_RADIUS_KM)
+    - truncated: present when the geo index search hit its read limits
+    """
+    method = (event.get("httpMethod") or event.get("requestContext", {}).get("http", {}).get("method"))
+    if method == "OPTIONS":
+        return options()
+
+    if method != "GET":
+        return error(405, "Method not allowed")
+
+    try:
+        params = event.get("queryStringParameters") or {}
+        try:
+            lat = _parse_coordinate(params.get("lat"), "lat", 90)
+            lng = _parse_coordinate(params.get("lng"), "lng", 180)
+            radius_km = float(params.get("radius") or DEFAULT_RADIUS_KM)
+        except ValueError as e:
+            return error(400, str(e))
+        if not 0 < radius_km < float("inf"):
+            return error(400, "radius must be a positive number of km")
+        radius_km = min(radius_km, MAX_RADIUS_KM)
+        limit = parse_limit(params.get("limit"), DEFAULT_LIMIT, MAX_LIMIT)
+        fields_mode = parse_fields(params.get("fields"))
+
+        result = query_nearby(lat, lng, radius_km, limit)
+        items = [item for item in result["items"] if is_feed_visible(item)]
+        if fields_mode == "full":
+            distances = {item["articleId"]: item["distanceKm"] for item in items}
+            items = [{**item, "distanceKm": distances[item["articleId"]]} for item in load_full_items(items)]
+        enrich_with_owner_profiles(items)
+
+        print(f"📍 Nearby ({lat:.4f},{lng:.4f}) r={radius_km}km: {len(items)} items, "
+              f"precision {result['precision']}, {result['rings']} rings, {result['cellsRead']} cells, "
+              f"{result['readCalls']} reads, {result['scannedCount']} scanned"
+              f"{' (truncated)' if result['truncated'] else ''}")
+        body = {"items": items, "radiusKm": radius_km}
+        if result["truncated"]:
+            body["truncated"] = True
+        return ok(200, body, event)
+
+    except InvalidFields as e:
+        return error(400, str(e))
+    except Exception as e:
+        print(f"Error in nearby_articles: {e}")
+        return error(500, f"internal error: {e}")
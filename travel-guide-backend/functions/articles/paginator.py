@@ -0,0 +1,150 @@
+"""
+Fill-the-page pagination with compact signed cursors
+
+DynamoDB applies FilterExpression (and our own post-filters) after Limit,
+so a single filtered read often returns a short or empty page while there
+is still data left. paginate() keeps reading until the page is full (or a
+read budget is spent) and records the exact position of the last item it
+handed out - including a position in the middle of a DynamoDB page, so
+nothing is skipped or repeated when a page is only partially consumed.
+
+nextToken format (URL-safe, no padding):
+    base64(json([version, *key values])) "." base64(hmac_sha256[:12])
+
+Only the varying key attributes are stored; constant parts of the key
+(partition values such as ownerId or feedKey) are passed back in by the
+handler via fixed_key. The signature covers the handler's scope string,
+so a token can't be edited or replayed against another endpoint/user.
+The HMAC key comes from CURSOR_SECRET (required; importing fails without it).
+"""
+import os
+import hmac
+import json
+import base64
+import hashlib
+
+CURSOR_VERSION = 1
+CURSOR_SECRET = os.environ.get("CURSOR_SECRET", "").encode()
+if not CURSOR_SECRET:
+    # Fail closed: a known fallback key would let anyone forge a cursor
+    raise RuntimeError("CURSOR_SECRET is not set (CursorSecret stack parameter)")
+SIGNATURE_BYTES = 12
+
+DEFAULT_READ_BUDGET = 5  # DynamoDB calls per request before returning a short page
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(scope, payload):
+    return hmac.new(CURSOR_SECRET, scope.encode() + b"|" + payload, hashlib.sha256).digest()[:SIGNATURE_BYTES]
+
+
+def encode_cursor(values, scope=""):
+    """Signed token for a list of (string) key values"""
+    payload = json.dumps([CURSOR_VERSION, *values], separators=(",", ":")).encode()
+    return f"{_b64encode(payload)}.{_b64encode(_sign(scope, payload))}"
+
+
+def decode_cursor(token, scope=""):
+    """Key values stored in token; raises InvalidCursor if forged, stale or malformed"""
+    try:
+        payload_part, signature_part = token.split(".")
+        payload = _b64decode(payload_part)
+        signature = _b64decode(signature_part)
+    except (ValueError, AttributeError):
+        raise InvalidCursor("malformed nextToken")
+
+    if not hmac.compare_digest(signature, _sign(scope, payload)):
+        raise InvalidCursor("invalid nextToken")
+
+    data = json.loads(payload)
+    if not isinstance(data, list) or not data or data[0] != CURSOR_VERSION:
+        raise InvalidCursor("unsupported nextToken version")
+    return data[1:]
+
+
+def cursor_to_key(token, key_attrs, fixed_key=None, scope=""):
+    """ExclusiveStartKey for a nextToken (None when there is no token)"""
+    if not token:
+        return None
+    values = decode_cursor(token, scope)
+    if len(values) != len(key_attrs):
+        raise InvalidCursor("invalid nextToken")
+    key = dict(fixed_key or {})
+    key.update(zip(key_attrs, values))
+    return key
+
+
+def key_to_cursor(key, key_attrs, scope=""):
+    return encode_cursor([key[attr] for attr in key_attrs], scope)
+
+
+def parse_limit(value, default, maximum):
+    """Page size from a query string value, clamped to 1..maximum"""
+    try:
+        limit = int(value) if value not in (None, "") else default
+    except (TypeError, ValueError):
+        limit = default
+    return max(1, min(limit, maximum))
+
+
+def paginate(read_page, limit, next_token=None, key_attrs=("articleId",), fixed_key=None,
+             scope="", transform=None, page_size=None, read_budget=DEFAULT_READ_BUDGET):
+    """
+    Read pages until `limit` items are collected.
+
+    read_page(start_key, page_size) -> raw DynamoDB query/scan response
+    transform(raw_items) -> list aligned with raw_items; None drops an item
+        (post-filters, BatchGet joins). Defaults to keeping every item.
+    key_attrs: varying attributes of the read's ExclusiveStartKey, in cursor order
+    fixed_key: constant attributes of the ExclusiveStartKey (e.g. the partition value)
+
+    Returns {'items', 'nextToken', 'startKey', 'readCalls', 'scannedCount'}.
+    Raises InvalidCursor for a bad next_token.
+    """
+    start_key = cursor_to_key(next_token, key_attrs, fixed_key, scope)
+    result = {
+        'items': [],
+        'nextToken': None,
+        'startKey': start_key,
+        'readCalls': 0,
+        'scannedCount': 0
+    }
+    items = result['items']
+    position = start_key
+
+    while result['readCalls'] < read_budget:
+        response = read_page(position, page_size or limit)
+        result['readCalls'] += 1
+        raw_items = response.get('Items', [])
+        result['scannedCount'] += response.get('ScannedCount', len(raw_items))
+        last_key = response.get('LastEvaluatedKey')
+
+        kept = transform(raw_items) if transform else raw_items
+        for i, (raw, item) in enumerate(zip(raw_items, kept)):
+            if item is None:
+                continue
+            items.append(item)
+            if len(items) == limit:
+                if i < len(raw_items) - 1:
+                    # Page only partly consumed: resume right after this item
+                    last_key = {**(fixed_key or {}), **{a: raw[a] for a in key_attrs}}
+                break
+
+        position = last_key
+        if not position or len(items) >= limit:
+            break
+
+    if position:
+        result['nextToken'] = key_to_cursor(position, key_attrs, scope)
+    return result
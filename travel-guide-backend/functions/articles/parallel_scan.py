@@ -0,0 +1,161 @@
+"""
+Parallel segmented Scan for the full-table operations left
+
+A ParallelScan splits the table into TotalSegments and scans every Segment
+on its own thread; pages go through a bounded queue (at most
+max_buffered_pages held at once) and come out of a plain generator, so a
+caller iterating it streams the table in constant memory whatever its size.
+
+Time budget: pass the Lambda context (stops reserve_ms before the timeout)
+and/or time_budget_ms, and/or a max_pages read budget. When it runs out,
+iteration ends early with truncated = True; checkpoint() then tells where
+every segment stopped and can be passed back as start_keys (next invoke,
+next page of a search) to continue without reading anything twice.
+"""
+import queue
+import threading
+import time
+import boto3
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_SEGMENTS = 8
+MAX_SEGMENTS = 16
+DEFAULT_RESERVE_MS = 15000  # left to the caller to write results / report
+_PUT_WAIT = 0.1  # seconds a worker waits on a full queue before rechecking stop
+
+_executor = None
+_local = threading.local()
+
+
+def _pool():
+    """Module-level pool: threads (and their tables) survive warm invocations"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_SEGMENTS, thread_name_prefix="scan")
+    return _executor
+
+
+def _table(table_name):
+    """boto3 resources are not thread-safe: one Table object per thread and table"""
+    tables = getattr(_local, "tables", None)
+    if tables is None:
+        tables = _local.tables = {}
+    if table_name not in tables:
+        tables[table_name] = boto3.session.Session().resource("dynamodb").Table(table_name)
+    return tables[table_name]
+
+
+class ParallelScan:
+    """
+    Iterate every item of table_name (scan_kwargs: FilterExpression,
+    ProjectionExpression, Limit, ...), segments interleaved - no order.
+
+    start_keys: a previous checkpoint() - one entry per segment, None for a
+    finished segment, {} for one not started, else its ExclusiveStartKey.
+    key_attrs: the table's primary key attributes (must be in the items).
+    """
+
+    def __init__(self, table_name, total_segments=DEFAULT_SEGMENTS, key_attrs=("articleId",),
+                 start_keys=None, context=None, reserve_ms=DEFAULT_RESERVE_MS, time_budget_ms=None,
+                 max_pages=None, max_buffered_pages=None, **scan_kwargs):
+        if start_keys is not None:
+            total_segments = len(start_keys)
+        if not 1 <= total_segments <= MAX_SEGMENTS:
+            raise ValueError(f"total_segments must be 1..{MAX_SEGMENTS}")
+        self.table_name = table_name
+        self.total_segments = total_segments
+        self.key_attrs = tuple(key_attrs)
+        self.scan_kwargs = scan_kwargs
+        self.max_pages = max_pages
+        self.max_buffered_pages = max_buffered_pages or 2 * total_segments
+
+        budgets = []
+        if context is not None:
+            budgets.append(context.get_remaining_time_in_millis() - reserve_ms)
+        if time_budget_ms is not None:
+            budgets.append(time_budget_ms)
+        self.deadline = time.monotonic() + min(budgets) / 1000 if budgets else None
+
+        starts = start_keys if start_keys is not None else [{}] * total_segments
+        # Last key fully handed to the caller, per segment (None: segment finished)
+        self._positions = [dict(key) if key is not None else None for key in starts]
+        self.read_calls = 0
+        self.scanned_count = 0
+        self.item_count = 0  # items handed to the caller
+        self.truncated = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def checkpoint(self):
+        """Per-segment resume keys (see start_keys); None once everything was read"""
+        if all(position is None for position in self._positions):
+            return None
+        return [dict(position) if position is not None else None for position in self._positions]
+
+    def close(self):
+        """Stop the segment threads (iteration abandoned before the end)"""
+        self._stop.set()
+
+    def _out_of_budget(self):
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return True
+        with self._lock:
+            if self.max_pages is not None and self.read_calls >= self.max_pages:
+                return True
+            self.read_calls += 1
+        return False
+
+    def _put(self, pages, message):
+        while not self._stop.is_set():
+            try:
+                pages.put(message, timeout=_PUT_WAIT)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _scan_segment(self, segment, pages):
+        try:
+            start_key = self._positions[segment]
+            while not self._stop.is_set():
+                if self._out_of_budget():
+                    self._put(pages, (segment, "stopped", None))
+                    return
+                params = dict(self.scan_kwargs, Segment=segment, TotalSegments=self.total_segments)
+                if start_key:
+                    params["ExclusiveStartKey"] = start_key
+                response = _table(self.table_name).scan(**params)
+                start_key = response.get("LastEvaluatedKey")
+                with self._lock:
+                    self.scanned_count += response.get("ScannedCount", len(response.get("Items", [])))
+                if not self._put(pages, (segment, response.get("Items", []), start_key)) or not start_key:
+                    return
+        except Exception as e:
+            self._put(pages, (segment, "failed", e))
+
+    def __iter__(self):
+        pages = queue.Queue(maxsize=self.max_buffered_pages)
+        active = [segment for segment, position in enumerate(self._positions) if position is not None]
+        for segment in active:
+            _pool().submit(self._scan_segment, segment, pages)
+        remaining = len(active)
+        try:
+            while remaining:
+                segment, items, last_key = pages.get()
+                if items == "failed":
+                    raise last_key
+                if items == "stopped":
+                    self.truncated = True
+                    remaining -= 1
+                    continue
+                for item in items:
+                    # Recorded before the yield: the caller may stop right after this item
+                    self._positions[segment] = {attr: item[attr] for attr in self.key_attrs}
+                    self.item_count += 1
+                    yield item
+                # The page's own LastEvaluatedKey also skips its filtered-out tail
+                self._positions[segment] = last_key
+                if not last_key:
+                    remaining -= 1
+        finally:
+            self._stop.set()
@@ -0,0 +1,207 @@
+"""
+Owner profile enrichment for article cards
+
+Collects the distinct ownerIds of a page of articles, loads their profiles
+from UserProfilesTable with chunked BatchGetItem (retrying UnprocessedKeys),
+signs avatar/cover URLs once per owner and attaches the owner fields to every
+item in one pass. Used by every endpoint that returns article cards.
+
+Profiles are cached across invocations (LRU + TTL, negative entries for
+users without a profile), each with the profileVersion update_profile ADDs
+on the user's own item. An entry is trusted for
+PROFILE_VERSION_CHECK_SECONDS; after that the stale owners of a page are
+revalidated with one BatchGetItem of their versions only (VERSION_FIELDS),
+and only the users whose version moved (or whose signed URLs got old) are
+re-read in full and rebuilt, so a changed username/avatar shows up within
+that window without reloading or touching the other users' entries.
+"""
+import os
+import time
+import boto3
+from dynamo_batch import batch_get_items
+from ttl_cache import TTLCache, MISSING
+
+dynamodb = boto3.resource("dynamodb")
+s3_client = boto3.client("s3")
+
+PROFILES_TABLE_NAME = os.environ.get("PROFILES_TABLE_NAME", "")
+BUCKET_NAME = os.environ.get("BUCKET_NAME", "")
+USER_POOL_ID = os.environ.get("USER_POOL_ID", "")
+
+PRESIGN_EXPIRES = 3600
+# Presigned URLs inside a cached (304) response must still be valid: version
+# ETags include the current window so clients refetch well before expiry
+URL_ETAG_WINDOW = PRESIGN_EXPIRES // 2
+
+PROFILE_FIELDS = ("userId", "username", "avatarKey", "coverImageKey", "bio", "profileVersion", "updatedAt")
+VERSION_FIELDS = ("userId", "profileVersion", "updatedAt")  # enough for _profile_version
+
+PROFILE_CACHE_SIZE = int(os.environ.get("PROFILE_CACHE_SIZE", "2000"))
+PROFILE_CACHE_TTL = int(os.environ.get("PROFILE_CACHE_TTL", "300"))
+PROFILE_NEGATIVE_CACHE_TTL = int(os.environ.get("PROFILE_NEGATIVE_CACHE_TTL", "60"))
+PROFILE_VERSION_CHECK_SECONDS = float(os.environ.get("PROFILE_VERSION_CHECK_SECONDS", "10"))
+
+profiles_table = dynamodb.Table(PROFILES_TABLE_NAME) if PROFILES_TABLE_NAME else None
+
+# Module level: survives across invocations of a warm container.
+# userId -> {'profile', 'version', 'checkedAt', 'signedAt'}, or None (no profile)
+_profile_cache = TTLCache(maxsize=PROFILE_CACHE_SIZE, ttl=PROFILE_CACHE_TTL)
+
+
+def _presign(key, user_id, kind):
+    if not key or not BUCKET_NAME:
+        return None
+    try:
+        return s3_client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': BUCKET_NAME, 'Key': key},
+            ExpiresIn=PRESIGN_EXPIRES
+        )
+    except Exception as e:
+        print(f"Error generating {kind} URL for {user_id}: {e}")
+        return None
+
+
+def _to_profile(item):
+    """Public profile view of a UserProfilesTable item"""
+    user_id = item.get('userId')
+    return {
+        'displayName': item.get('username'),  # Use username as displayName
+        'username': item.get('username'),
+        'avatarUrl': _presign(item.get('avatarKey'), user_id, 'avatar'),
+        'coverImageUrl': _presign(item.get('coverImageKey'), user_id, 'cover'),
+        'bio': item.get('bio')
+    }
+
+
+def batch_get_profile_items(user_ids, fields=PROFILE_FIELDS):
+    """Raw profile items (fields only) for user_ids: {userId: item}; users without a profile are absent"""
+    user_ids = [uid for uid in dict.fromkeys(user_ids) if uid]
+    if not PROFILES_TABLE_NAME or not user_ids:
+        return {}
+    items = batch_get_items(
+        PROFILES_TABLE_NAME,
+        [{'userId': uid} for uid in user_ids],
+        projection=', '.join(fields)
+    )
+    return {item['userId']: item for item in items}
+
+
+def _profile_version(item):
+    """profileVersion (ADDed on every update_profile); updatedAt for items written before it"""
+    return item.get('profileVersion', item.get('updatedAt'))
+
+
+def _is_current(old, version_item):
+    """Whether a cached entry still matches the stored version and its URLs are fresh enough"""
+    return old['version'] == _profile_version(version_item) and time.time() - old['signedAt'] < URL_ETAG_WINDOW
+
+
+def _profile_entry(item, old):
+    """Cache entry of a loaded item; reuses old's profile if the version didn't move"""
+    version = _profile_version(item)
+    if old and old['version'] == version and time.time() - old['signedAt'] < URL_ETAG_WINDOW:
+        profile, signed_at = old['profile'], old['signedAt']
+    else:
+        profile, signed_at = _to_profile(item), time.time()
+    return {'profile': profile, 'version': version, 'checkedAt': time.monotonic(), 'signedAt': signed_at}
+
+
+def _get_profile_entries(user_ids):
+    """Cache entries for user_ids: {userId: entry or None}, loading / revalidating as needed"""
+    user_ids = [uid for uid in dict.fromkeys(user_ids) if uid]
+    now = time.monotonic()
+
+    entries = {}
+    stale = {}
+    for uid in user_ids:
+        cached = _profile_cache.get(uid)
+        if cached is MISSING:
+            stale[uid] = None
+        elif cached is not None and now - cached['checkedAt'] >= PROFILE_VERSION_CHECK_SECONDS:
+            stale[uid] = cached
+        else:
+            entries[uid] = cached
+
+    if stale:
+        try:
+            # Cached users: versions only; full items for the ones that moved and the unknown
+            cached = [uid for uid, old in stale.items() if old]
+            versions = batch_get_profile_items(cached, fields=VERSION_FIELDS)
+            for uid in cached:
+                if uid in versions and _is_current(stale[uid], versions[uid]):
+                    entries[uid] = {**stale.pop(uid), 'checkedAt': now}
+                    _profile_cache.set(uid, entries[uid])
+            items = batch_get_profile_items([uid for uid in stale if stale[uid] is None or uid in versions])
+        except Exception as e:
+            print(f"Error batch loading profiles: {e}")
+            # Don't cache anything on failure; serve what we had
+            entries.update(stale)
+            return entries
+
+        for uid, old in stale.items():
+            if uid in items:
+                entries[uid] = _profile_entry(items[uid], old)
+                _profile_cache.set(uid, entries[uid])
+            else:
+                entries[uid] = None
+                _profile_cache.set(uid, None, ttl=PROFILE_NEGATIVE_CACHE_TTL)
+    return entries
+
+
+def get_profiles(user_ids):
+    """Public profiles for user_ids: {userId: profile or None}"""
+    entries = _get_profile_entries(user_ids)
+    return {uid: entry['profile'] if entry else None for uid, entry in entries.items()}
+
+
+def profile_versions(user_ids):
+    """[(userId, profile version)] of user_ids, sorted (for version ETags of enriched responses)"""
+    entries = _get_profile_entries(user_ids)
+    return sorted((uid, entry['version'] if entry else None) for uid, entry in entries.items())
+
+
+def url_etag_window():
+    return int(time.time() // URL_ETAG_WINDOW)
+
+
+def profile_cache_stats():
+    """Hit/miss counters of the cross-invocation profile cache"""
+    return _profile_cache.stats()
+
+
+def get_cognito_profile(user_id):
+    """Fallback profile from Cognito for users without a UserProfilesTable item"""
+    if not USER_POOL_ID:
+        return None
+    try:
+        cognito = boto3.client("cognito-idp")
+        response = cognito.admin_get_user(UserPoolId=USER_POOL_ID, Username=user_id)
+        attributes = {attr['Name']: attr['Value'] for attr in response.get('UserAttributes', [])}
+        return {
+            'displayName': attributes.get('name') or attributes.get('preferred_username'),
+            'username': response.get('Username'),
+            'email': attributes.get('email')
+        }
+    except Exception as e:
+        print(f"Error getting user from Cognito: {e}")
+        return None
+
+
+def attach_owner_profile(item, profile):
+    if not profile:
+        return item
+    item['ownerDisplayName'] = profile.get('displayName')
+    item['ownerUsername'] = profile.get('username')
+    item['ownerAvatarUrl'] = profile.get('avatarUrl')
+    item['ownerCoverImageUrl'] = profile.get('coverImageUrl')
+    item['ownerBio'] = profile.get('bio')
+    return item
+
+
+def enrich_with_owner_profiles(items):
+    """Attach owner profile fields to every item in place; returns the profiles map"""
+    profiles = get_profiles(item.get('ownerId') for item in items)
+    for item in items:
+        attach_owner_profile(item, profiles.get(item.get('ownerId')))
+    return profiles
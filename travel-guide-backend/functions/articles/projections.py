@@ -0,0 +1,70 @@
+"""
+Field projections for article list endpoints (?fields=card|full)
+
+A feed card renders about fifteen fields; a full article item also carries
+the search helpers (titleLower, contentLower, locationNameLower), Rekognition
+output (labelDetails, imageMetadata), moderation/validation details, geohash
+keys... List, search, user and favorite endpoints default to fields=card and
+ask DynamoDB for the card attributes only (ProjectionExpression), so less is
+transferred, deserialized, enriched and sent. fields=full returns whole items;
+get_article always does.
+
+CARD_FIELDS is the same list as feed_store.FEED_FIELDS: the public feed
+entries and the sparse index gsi_approved_owner_createdAt (INCLUDE) hold
+exactly these attributes, so a card read from any of them looks the same.
+"""
+import os
+from dynamo_batch import batch_get_items
+from feed_store import FEED_FIELDS
+
+TABLE_NAME = os.environ.get("TABLE_NAME", "")
+
+CARD_FIELDS = FEED_FIELDS
+FIELD_MODES = ("card", "full")
+DEFAULT_FIELD_MODE = "card"
+
+
+class InvalidFields(ValueError):
+    """Unknown ?fields= value"""
+
+
+def parse_fields(value):
+    """'card' (default) or 'full'"""
+    mode = (value or DEFAULT_FIELD_MODE).strip().lower()
+    if mode not in FIELD_MODES:
+        raise InvalidFields(f"fields must be one of: {', '.join(FIELD_MODES)}")
+    return mode
+
+
+def card_projection(fields=CARD_FIELDS):
+    """(ProjectionExpression, ExpressionAttributeNames) for the card fields"""
+    # Every name goes through a placeholder: status, location... are reserved words
+    names = {f"#f_{field}": field for field in fields}
+    return ", ".join(names), names
+
+
+def apply_projection(params, mode, fields=CARD_FIELDS):
+    """
+    Add the card ProjectionExpression to query/scan params (in place) when
+    mode is 'card'. Existing ExpressionAttributeNames are kept; a
+    FilterExpression may still reference attributes outside the projection.
+    """
+    if mode != "card":
+        return params
+    projection, names = card_projection(fields)
+    params["ProjectionExpression"] = projection
+    params["ExpressionAttributeNames"] = {**params.get("ExpressionAttributeNames", {}), **names}
+    return params
+
+
+def load_full_items(items):
+    """
+    Replace card items (feed entries, sparse-index items) by the full article
+    items, one BatchGetItem per page, keeping order. Articles that vanished
+    meanwhile keep their card.
+    """
+    if not items:
+        return items
+    keys = [{"articleId": aid} for aid in dict.fromkeys(it["articleId"] for it in items)]
+    found = {art["articleId"]: art for art in batch_get_items(TABLE_NAME, keys)}
+    return [found.get(it["articleId"], it) for it in items]
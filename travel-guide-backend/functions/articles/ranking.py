@@ -0,0 +1,163 @@
+"""
+BM25 relevance ranking for public text search (/search?sort=relevance)
+
+Candidates: the postings of every query term are read newest first together
+with their tf/dl (search_index.py), all terms in parallel, up to
+MAX_RANK_POSTINGS per term and within RANK_TIME_BUDGET_MS, then intersected
+in memory (tags: all of them, or their union for tagMode=any). When a list
+is cut short, only candidates at least as new as the oldest posting read
+from every cut list are ranked, so the candidate set is complete for that
+time window and the response says truncated.
+
+Score: BM25F - per field, tf is weighted by the field boost and
+length-normalised against the field's average length, the fields are
+summed, and the sum is saturated once per term:
+
+    x(t, d) = sum_f boost_f * tf_f / (1 - b + b * dl_f / avgdl_f)
+    score   = sum_t idf(t) * x / (K1 + x)
+    idf(t)  = ln(1 + (N - df + 0.5) / (df + 0.5))
+
+N, avgdl and df come from the counters search_index maintains. Scores are
+computed column by column over the candidate set: the per-field weights of
+every candidate once, then one pass per term - a few thousand candidates
+take a few milliseconds.
+"""
+import math
+import time
+from dynamo_batch import batch_get_items
+from search_index import (
+    SEARCH_INDEX_TABLE_NAME, INDEXED_FIELDS, DF_PREFIX, DF_SORT_KEY, STATS_KEY, stats_keys,
+    tag_term, document_stats, article_terms, _pool, _thread_table,
+)
+
+FIELD_BOOSTS = (3.0, 2.0, 1.0)  # title > locationName > content (INDEXED_FIELDS order)
+FIELD_B = (0.75, 0.75, 0.75)
+K1 = 1.2
+MAX_RANK_POSTINGS = 5000  # per term / tag, newest first
+RANK_POSTINGS_BATCH = 1000
+RANK_TIME_BUDGET_MS = 800  # postings reads; scoring itself is a few ms
+_LEGACY_TF = (0, 0, 1)  # postings written before tf/dl existed: one content hit
+
+
+def _read_postings(term, with_stats, deadline):
+    """
+    Newest-first postings of one term: ({sortKey: (tf, dl) or None}, complete).
+    Stops at MAX_RANK_POSTINGS or the deadline.
+    """
+    query_params = {
+        "KeyConditionExpression": "#term = :term",
+        "ExpressionAttributeNames": {"#term": "term"},
+        "ExpressionAttributeValues": {":term": term},
+        "ProjectionExpression": "sortKey",
+        "ScanIndexForward": False,
+        "Limit": RANK_POSTINGS_BATCH,
+    }
+    if with_stats:
+        query_params["ProjectionExpression"] = "sortKey, #tf, #dl"
+        query_params["ExpressionAttributeNames"].update({"#tf": "tf", "#dl": "dl"})
+    postings, read_calls = {}, 0
+    while True:
+        response = _thread_table().query(**query_params)
+        read_calls += 1
+        for item in response.get("Items", []):
+            postings[item["sortKey"]] = (item.get("tf"), item.get("dl")) if with_stats else None
+        start_key = response.get("LastEvaluatedKey")
+        if not start_key:
+            return postings, True, read_calls
+        if len(postings) >= MAX_RANK_POSTINGS or time.monotonic() >= deadline:
+            return postings, False, read_calls
+        query_params["ExclusiveStartKey"] = start_key
+
+
+def load_collection_stats(terms):
+    """(N, [avg length per field], {term: df}) from the counters (stats: sum of the shards)"""
+    keys = stats_keys() + [{"term": f"{DF_PREFIX}{t}", "sortKey": DF_SORT_KEY} for t in terms]
+    items = batch_get_items(SEARCH_INDEX_TABLE_NAME, keys)
+    shards = [item for item in items if item["term"] == STATS_KEY["term"]]
+    found = {item["term"]: item for item in items if item["term"] != STATS_KEY["term"]}
+    n = sum(int(shard.get("docCount", 0)) for shard in shards)
+    lengths = [sum(int(shard.get(f"{field}Length", 0)) for shard in shards) for field in INDEXED_FIELDS]
+    avgdl = [max(length / n, 1.0) if n else 1.0 for length in lengths]
+    df = {t: int(found.get(f"{DF_PREFIX}{t}", {}).get("df", 0)) for t in terms}
+    return n, avgdl, df
+
+
+def idf(df, n):
+    return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+
+def bm25f_scores(tf_columns, dls, idfs, avgdl):
+    """
+    tf_columns[t][i]: [tf per field] of term t in candidate i
+    dls[i]: [length per field] of candidate i
+    idfs[t]: idf of term t
+    """
+    weights = [
+        [boost / (1 - b + b * dl[f] / avgdl[f]) for f, (boost, b) in enumerate(zip(FIELD_BOOSTS, FIELD_B))]
+        for dl in dls
+    ]
+    scores = [0.0] * len(dls)
+    for term_idf, column in zip(idfs, tf_columns):
+        for i, (tf, w) in enumerate(zip(column, weights)):
+            x = tf[0] * w[0] + tf[1] * w[1] + tf[2] * w[2]
+            scores[i] += term_idf * x / (K1 + x)
+    return scores
+
+
+def _idfs(terms, df, n, observed=None):
+    # Counters lag a backfill: never below what was just read
+    dfs = [max(df.get(t, 0), (observed or {}).get(t, 0), 1) for t in terms]
+    n = max(n, *dfs)
+    return [idf(d, n) for d in dfs], n
+
+
+def rank_postings(terms, tags=(), tag_mode="any"):
+    """
+    Candidates matching every term (and the tags), best first.
+
+    Returns {'ranked': [(score, sortKey)], 'candidates', 'readCalls', 'truncated'}
+    """
+    deadline = time.monotonic() + RANK_TIME_BUDGET_MS / 1000
+    lists = [(term, True) for term in terms] + [(tag_term(tag), False) for tag in tags]
+    results = list(_pool().map(lambda spec: _read_postings(spec[0], spec[1], deadline), lists))
+    read_calls = sum(calls for _, _, calls in results)
+
+    term_postings = [postings for postings, _, _ in results[:len(terms)]]
+    tag_postings = [postings for postings, _, _ in results[len(terms):]]
+    # Window where every list is complete: newer than the oldest key read from any cut list
+    cut = [min(postings) for postings, complete, _ in results if not complete and postings]
+    cutoff = max(cut) if cut else ""
+
+    candidates = set.intersection(*(set(p) for p in term_postings))
+    if tag_postings:
+        tag_sets = [set(p) for p in tag_postings]
+        candidates &= set.intersection(*tag_sets) if tag_mode == "all" else set.union(*tag_sets)
+    candidates = sorted(c for c in candidates if c >= cutoff)
+
+    n, avgdl, df = load_collection_stats(terms)
+    idfs, n = _idfs(terms, df, n, {t: len(p) for t, p in zip(terms, term_postings)})
+    dls = []
+    for sort_key in candidates:
+        dl = term_postings[0][sort_key][1]
+        dls.append([int(v) for v in dl] if dl else avgdl)
+    tf_columns = [
+        [[int(v) for v in postings[c][0]] if postings[c][0] else _LEGACY_TF for c in candidates]
+        for postings in term_postings
+    ]
+    scores = bm25f_scores(tf_columns, dls, idfs, avgdl)
+    ranked = sorted(zip(scores, candidates), key=lambda pair: (-pair[0], pair[1]))
+    return {
+        "ranked": ranked,
+        "candidates": len(candidates),
+        "readCalls": read_calls,
+        "truncated": bool(cut),
+    }
+
+
+def score_items(items, terms):
+    """BM25F scores of already-loaded articles (title/locationName/content needed)"""
+    n, avgdl, df = load_collection_stats(terms)
+    idfs, n = _idfs(terms, df, n)
+    stats = [document_stats(item, article_terms(item)) for item in items]
+    tf_columns = [[tf.get(t, (0, 0, 0)) for tf, _ in stats] for t in terms]
+    return bm25f_scores(tf_columns, [dl for _, dl in stats], idfs, avgdl)
@@ -1,14 +1,34 @@
 import os
-import json
 import boto3
 from decimal import Decimal
+from itertools import islice
 from cors import ok, error, options
+from dynamo_batch import batch_get_items
+from feed_store import is_feed_visible
+from paginator import paginate, parse_limit, encode_cursor, decode_cursor, InvalidCursor
+from projections import parse_fields, apply_projection, card_projection, load_full_items, InvalidFields
+from search_index import (
+    search_table, query_terms, query_tags, article_terms, normalize_tag, PostingsIntersection, TAG_MODES,
+)
+from geo import parse_bbox, InvalidBBox
+from geo_index import query_bbox
+from ranking import rank_postings, score_items
+from parallel_scan import ParallelScan
+from search_cache import cache_key, get_cached, put_cached, cache_stats
+from fuzzy import correct_terms, FUZZY_MIN_RESULTS
+from profile_enricher import enrich_with_owner_profiles
 
 dynamodb = boto3.resource("dynamodb")
 
 TABLE_NAME = os.environ["TABLE_NAME"]
 table = dynamodb.Table(TABLE_NAME)
 
+MAX_LIMIT = 50
+SCAN_PAGE_FACTOR = 10  # scan pages are filtered heavily, read more per call
+SORT_MODES = ("recent", "relevance")
+SEARCH_SCAN_SEGMENTS = 4  # public Scan fallback, segments read in parallel
+SEARCH_SCAN_READ_BUDGET = 16  # Scan calls per request (all segments together)
+
 
 def _get_current_user_id(event):
     """
@@ -31,24 +51,239 @@ def _get_current_user_id(event):
     return None
 
 
-def _convert_decimal(obj):
+def _matches_tags(item, tag_list, tag_mode="any"):
+    """True if ANY (or ALL, tag_mode "all") search tags equal one of the item's tags/autoTags (folded)"""
+    item_tags = [normalize_tag(t) for t in (item.get('tags') or [])]
+    item_auto_tags = [normalize_tag(t) for t in (item.get('autoTags') or [])]
+    all_item_tags = item_tags + item_auto_tags
+    match = all if tag_mode == "all" else any
+    return match(search_tag in all_item_tags for search_tag in tag_list)
+
+
+def _search_index(terms, tag_list, tag_mode, limit, next_token, fields_mode):
     """
-    Chuyển Decimal sang kiểu bình thường cho FE.
+    Public search on the inverted index (search_index.py): intersect the
+    postings of every term and the exact tag postings (all tags, or the
+    union of them for tagMode=any) newest first, then load just the
+    matching articles (BatchGetItem). Postings of articles that stopped
+    being public/approved are skipped without breaking pagination: the
+    cursor is the position in the postings list.
+    Returns (items, nextToken).
     """
-    if isinstance(obj, list):
-        return [_convert_decimal(x) for x in obj]
-    if isinstance(obj, dict):
-        out = {}
-        for k, v in obj.items():
-            if isinstance(v, Decimal):
-                # Chuyển Decimal sang int nếu là số nguyên, ngược lại float
-                out[k] = int(v) if v % 1 == 0 else float(v)
-            elif isinstance(v, (dict, list)):
-                out[k] = _convert_decimal(v)
-            else:
-                out[k] = v
-        return out
-    return obj
+    cursor_scope = f"search:index:{' '.join(terms)}|{tag_mode}:{','.join(tag_list)}"
+    bound, inclusive = None, False
+    if next_token:
+        values = decode_cursor(next_token, cursor_scope)
+        if len(values) != 2:
+            raise InvalidCursor("invalid nextToken")
+        bound, inclusive = values[0], bool(values[1])
+
+    matches = PostingsIntersection(terms, bound, inclusive, tags=tag_list, tag_mode=tag_mode)
+    match_iter = iter(matches)
+    projection, projection_names = card_projection() if fields_mode == "card" else (None, None)
+
+    items = []
+    position = None
+    while len(items) < limit:
+        sort_keys = list(islice(match_iter, limit - len(items)))
+        if not sort_keys:
+            # Read budget spent: resume where the intersection stopped
+            position = matches.frontier if matches.truncated else None
+            break
+        # sortKey = "<createdAt>#<articleId>"
+        article_ids = [sort_key.split("#", 1)[1] for sort_key in sort_keys]
+        found = {
+            art["articleId"]: art
+            for art in batch_get_items(
+                TABLE_NAME, [{"articleId": aid} for aid in article_ids], projection, projection_names
+            )
+        }
+        for article_id in article_ids:
+            article = found.get(article_id)
+            if article and is_feed_visible(article):
+                items.append(article)
+        position = (sort_keys[-1], False)
+    if position and len(items) >= limit and next(match_iter, None) is None:
+        # Full page that used up the intersection: peeked, nothing left (no empty last page)
+        position = matches.frontier if matches.truncated else None
+
+    print(f"📇 Index search {terms} tags({tag_mode})={tag_list}: {len(items)} items, {matches.read_calls} postings reads"
+          f"{' (budget spent)' if matches.truncated else ''}")
+    token = encode_cursor([position[0], int(position[1])], cursor_scope) if position else None
+    return items, token
+
+
+def _search_ranked(terms, tag_list, tag_mode, limit, next_token, fields_mode):
+    """
+    Public text search ordered by BM25 relevance (ranking.py): the
+    candidates are ranked once per request from the postings' tf/dl, then
+    only the requested page is loaded. The cursor is the offset in the
+    ranking; articles no longer public/approved are skipped like in
+    _search_index.
+    Returns (items, nextToken, truncated).
+    """
+    cursor_scope = f"search:rank:{' '.join(terms)}|{tag_mode}:{','.join(tag_list)}"
+    offset = 0
+    if next_token:
+        values = decode_cursor(next_token, cursor_scope)
+        if len(values) != 1 or not isinstance(values[0], int) or values[0] < 0:
+            raise InvalidCursor("invalid nextToken")
+        offset = values[0]
+
+    ranking = rank_postings(terms, tag_list, tag_mode)
+    page = ranking["ranked"][offset:offset + limit]
+    projection, projection_names = card_projection() if fields_mode == "card" else (None, None)
+    article_ids = [sort_key.split("#", 1)[1] for _, sort_key in page]
+    found = {
+        art["articleId"]: art
+        for art in batch_get_items(
+            TABLE_NAME, [{"articleId": aid} for aid in article_ids], projection, projection_names
+        )
+    }
+    items = []
+    for (score, _), article_id in zip(page, article_ids):
+        article = found.get(article_id)
+        if article and is_feed_visible(article):
+            article["score"] = round(score, 4)
+            items.append(article)
+
+    print(f"🏅 Ranked search {terms} tags({tag_mode})={tag_list}: {ranking['candidates']} candidates, "
+          f"{ranking['readCalls']} postings reads{' (truncated)' if ranking['truncated'] else ''}")
+    more = offset + limit < len(ranking["ranked"])
+    token = encode_cursor([offset + limit], cursor_scope) if more else None
+    return items, token, ranking["truncated"]
+
+
+def _search_bbox(bbox, terms, tag_list, tag_mode, limit, next_token, fields_mode, sort="recent"):
+    """
+    Public search inside a bounding box on the geo index (geo_index.py):
+    parallel prefix queries over a cell cover, exact lat/lng filter, then
+    the text terms / tags checked on the card fields (same tokenizer as the
+    inverted index). Matches are returned newest first - or by BM25 score
+    for sort=relevance; the cursor is the last "<createdAt>#<articleId>"
+    returned, or the offset in the ranking.
+    Returns (items, nextToken, truncated).
+    """
+    ranked = sort == "relevance" and bool(terms)
+    cursor_scope = (f"search:bbox:{','.join(map(str, bbox))}|{' '.join(terms)}|{tag_mode}:{','.join(tag_list)}"
+                    f"{'|relevance' if ranked else ''}")
+    before, offset = None, 0
+    if next_token:
+        values = decode_cursor(next_token, cursor_scope)
+        if len(values) != 1:
+            raise InvalidCursor("invalid nextToken")
+        if ranked:
+            if not isinstance(values[0], int) or values[0] < 0:
+                raise InvalidCursor("invalid nextToken")
+            offset = values[0]
+        else:
+            before = values[0]
+
+    result = query_bbox(bbox)
+    wanted = set(terms)
+    matches = []
+    for item in result["items"]:
+        if not is_feed_visible(item):
+            continue
+        if wanted and not wanted <= set(article_terms(item)):
+            continue
+        if tag_list and not _matches_tags(item, tag_list, tag_mode):
+            continue
+        sort_key = f"{item['createdAt']}#{item['articleId']}"
+        if before is None or sort_key < before:
+            matches.append((sort_key, item))
+    matches.sort(key=lambda pair: pair[0], reverse=True)
+    if ranked and matches:
+        scores = score_items([item for _, item in matches], terms)
+        for score, (_, item) in zip(scores, matches):
+            item["score"] = round(score, 4)
+        matches.sort(key=lambda pair: -pair[1]["score"])  # stable: newest first on ties
+
+    page = matches[offset:offset + limit]
+    items = [item for _, item in page]
+    if fields_mode == "full":
+        items = load_full_items(items)
+    print(f"🗺️ BBox search {bbox}: {len(result['cells'])} cells, {result['readCalls']} reads, "
+          f"{result['scannedCount']} scanned, {len(matches)} matches"
+          f"{' (truncated)' if result['truncated'] else ''}")
+    if ranked:
+        token = encode_cursor([offset + limit], cursor_scope) if len(matches) > offset + limit else None
+    else:
+        token = encode_cursor([page[-1][0]], cursor_scope) if len(matches) > limit else None
+    return items, token, result["truncated"]
+
+
+def _public_search(terms, tag_list, tag_mode, bbox, sort, limit, next_token, fields_mode):
+    """
+    Result body of a public search served by an index: the geo index for a
+    bbox, BM25 ranking for sort=relevance, else the inverted index.
+    None when only the Scan fallback can answer.
+    """
+    truncated = False
+    # Public search in a map viewport: geo index, text/tags checked per item
+    if bbox:
+        items, result_token, truncated = _search_bbox(
+            bbox, terms, tag_list, tag_mode, limit, next_token, fields_mode, sort
+        )
+    # Public text search by relevance: BM25 over the postings' tf/dl
+    elif sort == "relevance" and terms and search_table:
+        items, result_token, truncated = _search_ranked(
+            terms, tag_list, tag_mode, limit, next_token, fields_mode
+        )
+    # Public text/tag search: inverted index instead of a full-table Scan
+    elif (terms or tag_list) and search_table:
+        items, result_token = _search_index(terms, tag_list, tag_mode, limit, next_token, fields_mode)
+    else:
+        return None
+
+    enrich_with_owner_profiles(items)
+    result = {"items": items}
+    if result_token:
+        result["nextToken"] = result_token
+    if truncated:
+        result["truncated"] = True
+    return result
+
+
+def _scan_page(scan_params, limit, next_token, scope, transform=None):
+    """
+    One page of the public Scan fallback on a ParallelScan (parallel_scan.py):
+    items pass through transform like in paginate(); the cursor holds the
+    position of every segment (articleId, "" not started, null finished).
+    Returns {'items', 'nextToken', 'readCalls', 'scannedCount'}.
+    """
+    start_keys = None
+    if next_token:
+        values = decode_cursor(next_token, scope)
+        if len(values) != SEARCH_SCAN_SEGMENTS or not all(v is None or isinstance(v, str) for v in values):
+            raise InvalidCursor("invalid nextToken")
+        start_keys = [None if v is None else ({"articleId": v} if v else {}) for v in values]
+
+    scan = ParallelScan(
+        TABLE_NAME, SEARCH_SCAN_SEGMENTS, start_keys=start_keys,
+        max_pages=SEARCH_SCAN_READ_BUDGET, max_buffered_pages=SEARCH_SCAN_SEGMENTS, **scan_params
+    )
+    items = []
+    try:
+        for raw in scan:
+            item = transform([raw])[0] if transform else raw
+            if item is not None:
+                items.append(item)
+                if len(items) == limit:
+                    break
+    finally:
+        scan.close()
+
+    positions = scan.checkpoint()
+    token = None
+    if positions:
+        token = encode_cursor([p.get("articleId", "") if p is not None else None for p in positions], scope)
+    return {
+        'items': items,
+        'nextToken': token,
+        'readCalls': scan.read_calls,
+        'scannedCount': scan.scanned_count,
+    }
 
 
 def _has_image(item):
@@ -72,13 +307,50 @@ def lambda_handler(event, context):
     try:
         params = event.get("queryStringParameters") or {}
         q = (params.get("q") or "").strip()
-        bbox = params.get("bbox")  # hiện tại chưa dùng, có thể mở rộng sau
+        bbox = parse_bbox(params["bbox"]) if params.get("bbox") else None
         tags = (params.get("tags") or "").strip()
         scope = params.get("scope", "public")
-        limit = int(params.get("limit", 10))
+        limit = parse_limit(params.get("limit"), 10, MAX_LIMIT)
         next_token = params.get("nextToken")
+        fields_mode = parse_fields(params.get("fields"))
 
         user_id = _get_current_user_id(event)
+        tag_list = query_tags(tags)
+        tag_mode = (params.get("tagMode") or "any").strip().lower()
+        if tag_mode not in TAG_MODES:
+            return error(400, f"tagMode must be one of: {', '.join(TAG_MODES)}")
+
+        terms = query_terms(q) if q else []
+        # sort=relevance ranks text matches (BM25); without words, recent
+        sort = (params.get("sort") or "recent").strip().lower()
+        if sort not in SORT_MODES:
+            return error(400, f"sort must be one of: {', '.join(SORT_MODES)}")
+
+        # Public searches: same normalized request -> same page for everybody
+        result_key = None
+        if not (scope == "mine" and user_id):
+            result_key = cache_key(terms, tag_list, tag_mode, bbox, sort, limit, fields_mode, next_token)
+            cached = get_cached(result_key)
+            print(f"📊 Search cache {'hit' if cached is not None else 'miss'}: {cache_stats()}")
+            if cached is not None:
+                return ok(200, cached, event)
+
+        # Public search: geo index, BM25 ranking or inverted index. Too few
+        # results for the words typed: retry with misspelled words corrected
+        if not (scope == "mine" and user_id):
+            search_args = (tag_list, tag_mode, bbox, sort, limit, next_token, fields_mode)
+            result = _public_search(terms, *search_args)
+            if result is not None:
+                if terms and not next_token and len(result["items"]) < FUZZY_MIN_RESULTS and search_table:
+                    corrected = correct_terms(terms)
+                    if corrected:
+                        fuzzy_result = _public_search(corrected, *search_args)
+                        print(f"🔤 Fuzzy {terms} -> {corrected}: {len(fuzzy_result['items'])} items")
+                        if len(fuzzy_result["items"]) > len(result["items"]):
+                            # Next pages: the client sends q=correctedQuery
+                            result = dict(fuzzy_result, correctedQuery=" ".join(corrected))
+                put_cached(result_key, result)
+                return ok(200, result, event)
 
         # ------------------------------
         # 1) Chuẩn bị phần KEY query
@@ -104,81 +376,30 @@ def lambda_handler(event, context):
         # ------------------------------
         filter_parts = []
 
-        # NEW: Filter by status for public searches (not for "mine" scope)
-        # TEMPORARILY DISABLED - Allow all posts to be searchable for testing
-        # TODO: Re-enable after content moderation is working
-        # if scope != "mine" or not user_id:
-        #     expression_attribute_names["#status"] = "status"
-        #     expression_attribute_values[":approved"] = "approved"
-        #     # Use OR to include legacy articles without status field
-        #     filter_parts.append(
-        #         "(#status = :approved OR attribute_not_exists(#status))"
-        #     )
-
-        # Tìm theo text: title / content / locationName (case-insensitive)
-        # Support both old (title/content/locationName) and new (*Lower) fields
-        if q:
-            q_lower = q.lower()
-            
-            # New fields (lowercase) - preferred for performance
-            expression_attribute_names["#titleLower"] = "titleLower"
-            expression_attribute_names["#contentLower"] = "contentLower"
-            expression_attribute_names["#locationNameLower"] = "locationNameLower"
-            
-            expression_attribute_values[":q"] = q_lower
-
-            # Search in lowercase fields (will work for new articles)
-            # Note: Old articles without *Lower fields won't match here
-            # Run migrate_lowercase_fields.py to fix old articles
+        # Public searches only see approved + public articles (same rule as
+        # the search index and the feed); these results are also cached and
+        # shared between users
+        if scope != "mine" or not user_id:
+            expression_attribute_names["#status"] = "status"
+            expression_attribute_names["#visibility"] = "visibility"
+            expression_attribute_values[":approved"] = "approved"
+            expression_attribute_values[":public"] = "public"
+            # Use OR to include legacy articles without status field
             filter_parts.append(
-                "("
-                "(attribute_exists(#titleLower) AND contains(#titleLower, :q)) OR "
-                "(attribute_exists(#contentLower) AND contains(#contentLower, :q)) OR "
-                "(attribute_exists(#locationNameLower) AND contains(#locationNameLower, :q))"
-                ")"
+                "#visibility = :public AND (#status = :approved OR attribute_not_exists(#status))"
             )
 
-        # Tìm theo tags (search in both 'tags' and 'autoTags' fields)
-        # IMPORTANT: DynamoDB's contains() does substring matching, not exact matching
-        # So "food" will match both "food" and "seafood"
-        # We need to ensure tags are stored in normalized form (lowercase, trimmed)
-        # and accept that contains() will do substring matching
-        if tags:
-            tag_list = [t.strip().lower() for t in tags.split(",") if t.strip()]
-            print(f"🔍 Searching for tags: {tag_list}")
-            
-            if tag_list:
-                tag_conditions = []
-                
-                for i, tag in enumerate(tag_list):
-                    tag_value = tag.lower()  # Ensure lowercase for comparison
-                    
-                    # Create unique attribute names for each tag check
-                    tags_attr = f"#tags{i}"
-                    auto_tags_attr = f"#autoTags{i}"
-                    tag_val_attr = f":tag{i}"
-                    
-                    expression_attribute_names[tags_attr] = "tags"
-                    expression_attribute_names[auto_tags_attr] = "autoTags"
-                    expression_attribute_values[tag_val_attr] = tag_value
-                    
-                    # Use contains() for LIST attributes
-                    # Note: This does substring matching, so "food" matches "seafood"
-                    # To avoid this, we need to ensure tags don't have overlapping names
-                    # or implement post-filtering in application code
-                    tag_conditions.append(
-                        f"(contains({tags_attr}, {tag_val_attr}) OR "
-                        f"(attribute_exists({auto_tags_attr}) AND contains({auto_tags_attr}, {tag_val_attr})))"
-                    )
-
-                if tag_conditions:
-                    # Use OR to match any of the requested tags
-                    if len(tag_conditions) == 1:
-                        # Single tag: no need for extra parentheses
-                        filter_parts.append(tag_conditions[0])
-                    else:
-                        # Multiple tags: wrap in parentheses
-                        filter_parts.append("(" + " OR ".join(tag_conditions) + ")")
+        # Tìm theo text / tags: kiểm tra trong Lambda (transform bên dưới), không
+        # dùng contains(): nó phân biệt dấu ("hoi an" != "Hội An") và so khớp
+        # chuỗi con ("food" khớp "seafood")
+
+        # Bounding box (bài của chính user): lọc theo lat/lng
+        if bbox:
+            expression_attribute_names["#lat"] = "lat"
+            expression_attribute_names["#lng"] = "lng"
+            for name, value in zip(("minLat", "minLng", "maxLat", "maxLng"), bbox):
+                expression_attribute_values[f":{name}"] = Decimal(str(value))
+            filter_parts.append("#lat BETWEEN :minLat AND :maxLat AND #lng BETWEEN :minLng AND :maxLng")
 
         # Combine filters với AND
         filter_expression = None
@@ -193,73 +414,95 @@ def lambda_handler(event, context):
         # ------------------------------
         if index_name and key_condition:
             # Path 1: Query with GSI for personal searches
-            query_params = {
-                "IndexName": index_name,
-                "KeyConditionExpression": key_condition,
-                "ExpressionAttributeValues": expression_attribute_values,
-                "ScanIndexForward": False,  # mới nhất trước
-                "Limit": limit,
-            }
-
-            if expression_attribute_names:
-                query_params["ExpressionAttributeNames"] = expression_attribute_names
-            if filter_expression:
-                query_params["FilterExpression"] = filter_expression
-            if next_token:
-                query_params["ExclusiveStartKey"] = json.loads(next_token)
+            def read_page(start_key, page_size):
+                query_params = {
+                    "IndexName": index_name,
+                    "KeyConditionExpression": key_condition,
+                    "ExpressionAttributeValues": expression_attribute_values,
+                    "ScanIndexForward": False,  # mới nhất trước
+                    "Limit": page_size,
+                }
+                if expression_attribute_names:
+                    query_params["ExpressionAttributeNames"] = expression_attribute_names
+                if filter_expression:
+                    query_params["FilterExpression"] = filter_expression
+                if start_key:
+                    query_params["ExclusiveStartKey"] = start_key
+                apply_projection(query_params, fields_mode)
+                return table.query(**query_params)
 
             # Debug logging for query
             print(f"📊 Query operation:")
-            print(f"  - IndexName: {query_params.get('IndexName')}")
-            print(f"  - KeyCondition: {query_params.get('KeyConditionExpression')}")
-            if filter_expression:
-                print(f"  - FilterExpression: {filter_expression}")
-            print(f"  - AttributeNames: {expression_attribute_names}")
-            print(f"  - AttributeValues: {expression_attribute_values}")
-            
-            resp = table.query(**query_params)
+            print(f"  - IndexName: {index_name}")
+            print(f"  - KeyCondition: {key_condition}")
+            page_size = limit * SCAN_PAGE_FACTOR if (terms or tag_list) else limit
+            key_attrs = ("articleId", "createdAt")
+            fixed_key = {"ownerId": user_id}
         else:
             # Path 2: Scan for public searches
             # IMPORTANT: DynamoDB applies FilterExpression AFTER scanning Limit items
-            # So we need to scan MORE items to get enough results after filtering
-            # Use a larger scan limit and then trim results to requested limit
-            scan_limit = limit * 10  # Scan 10x more items to account for filtering
-            
-            scan_params = {
-                "Limit": scan_limit,
-            }
-
+            # So each scan call reads more items than requested; _scan_page() keeps
+            # scanning (SEARCH_SCAN_SEGMENTS segments in parallel) until the page
+            # is full and resumes mid-page next time
+            read_page = None
+            scan_params = {}
             if expression_attribute_names:
                 scan_params["ExpressionAttributeNames"] = expression_attribute_names
             if expression_attribute_values:
                 scan_params["ExpressionAttributeValues"] = expression_attribute_values
             if filter_expression:
                 scan_params["FilterExpression"] = filter_expression
-            if next_token:
-                scan_params["ExclusiveStartKey"] = json.loads(next_token)
+            # Filter runs on the whole item; only the card fields come back
+            apply_projection(scan_params, fields_mode)
+
+            page_size = max(limit, limit * SCAN_PAGE_FACTOR // SEARCH_SCAN_SEGMENTS)  # per segment
 
             # Debug logging for scan
-            print(f"📊 Scan operation:")
-            print(f"  - Scan Limit: {scan_params.get('Limit')} (requested: {limit})")
-            if filter_expression:
-                print(f"  - FilterExpression: {filter_expression}")
-            print(f"  - AttributeNames: {expression_attribute_names}")
-            print(f"  - AttributeValues: {expression_attribute_values}")
-            
-            resp = table.scan(**scan_params)
-            
-            # Trim results to requested limit
-            items_before_trim = resp.get("Items", [])
-            if len(items_before_trim) > limit:
-                print(f"  - Trimming {len(items_before_trim)} items to {limit}")
-                resp["Items"] = items_before_trim[:limit]
-                # Keep LastEvaluatedKey for pagination
-
-        items = resp.get("Items", [])
-        last_key = resp.get("LastEvaluatedKey")
-        
+            print(f"📊 Parallel scan operation ({SEARCH_SCAN_SEGMENTS} segments):")
+            print(f"  - Scan Limit: {page_size} per segment (requested: {limit})")
+
+        if filter_expression:
+            print(f"  - FilterExpression: {filter_expression}")
+        print(f"  - AttributeNames: {expression_attribute_names}")
+        print(f"  - AttributeValues: {expression_attribute_values}")
+
+        # Same matching as the inverted index: every folded query term among
+        # the article's terms, tags compared exactly after folding. Dropped
+        # items don't break pagination: the cursor records the last item
+        # actually returned.
+        wanted_terms = set(terms)
+
+        def match_terms_and_tags(raw_items):
+            kept = []
+            for item in raw_items:
+                if wanted_terms and not wanted_terms <= set(article_terms(item)):
+                    kept.append(None)
+                elif tag_list and not _matches_tags(item, tag_list, tag_mode):
+                    kept.append(None)
+                else:
+                    kept.append(item)
+            return kept
+
+        transform = match_terms_and_tags if (wanted_terms or tag_list) else None
+        if read_page:
+            page = paginate(
+                read_page, limit, next_token,
+                key_attrs=key_attrs,
+                fixed_key=fixed_key,
+                scope=f"search:{scope}:{user_id if fixed_key else ''}:{tag_mode}",
+                transform=transform,
+                page_size=page_size
+            )
+        else:
+            page = _scan_page(
+                dict(scan_params, Limit=page_size), limit, next_token,
+                scope=f"search:{scope}::{tag_mode}:segments",
+                transform=transform,
+            )
+        items = page["items"]
+
         # Debug: Log returned items with their tags
-        print(f"📦 Found {len(items)} items from DynamoDB")
+        print(f"📦 Found {len(items)} items ({page['readCalls']} reads, {page['scannedCount']} scanned)")
         for item in items[:3]:  # Log first 3 items
             article_id = item.get('articleId', 'unknown')
             user_tags = item.get('tags', [])
@@ -268,45 +511,18 @@ def lambda_handler(event, context):
             print(f"    tags: {user_tags}")
             print(f"    autoTags: {auto_tags}")
 
-
-        if tags:
-            tag_list = [t.strip().lower() for t in tags.split(",") if t.strip()]
-            filtered_items = []
-            
-            for item in items:
-                item_tags = [str(t).lower() for t in (item.get('tags') or [])]
-                item_auto_tags = [str(t).lower() for t in (item.get('autoTags') or [])]
-                all_item_tags = item_tags + item_auto_tags
-                
-                # Debug each item
-                print(f"  🔎 Checking article {item.get('articleId', 'unknown')[:8]}...")
-                print(f"     Search tags: {tag_list}")
-                print(f"     Item tags: {all_item_tags}")
-                
-                # Check if ANY of the search tags matches EXACTLY with item tags
-                if any(search_tag in all_item_tags for search_tag in tag_list):
-                    print(f"     ✅ MATCH!")
-                    filtered_items.append(item)
-                else:
-                    print(f"     ❌ NO MATCH")
-            
-            print(f"✅ After exact match filter: {len(filtered_items)} items (from {len(items)} items)")
-            items = filtered_items
-            
-            # IMPORTANT: Clear last_key if we filtered items
-            # Because pagination token is no longer valid after filtering
-            if len(filtered_items) < len(resp.get("Items", [])):
-                last_key = None
-                print(f"⚠️ Cleared pagination token due to post-filtering")
-
-        processed_items = [_convert_decimal(it) for it in items]
+        processed_items = items  # Decimals are converted by the encoder
+        enrich_with_owner_profiles(processed_items)
 
         result = {"items": processed_items}
-        if last_key:
-            result["nextToken"] = json.dumps(last_key)
+        if page["nextToken"]:
+            result["nextToken"] = page["nextToken"]
 
-        return ok(200, result)
+        put_cached(result_key, result)
+        return ok(200, result, event)
 
+    except (InvalidCursor, InvalidFields, InvalidBBox) as e:
+        return error(400, str(e))
     except Exception as e:
         print("Error in search_articles:", e)
         return error(500, f"internal error: {e}")
@@ -0,0 +1,140 @@
+"""
+Result cache for public searches (/search)
+
+Popular searches ("beach", "đà nẵng") return the same page to everybody.
+A result page is cached under a key built from the normalized request
+(folded query terms, tags, tagMode, bbox, sort, limit, fields, nextToken),
+so "Đà Nẵng" and "da nang" share an entry. Personal searches (scope=mine)
+are never cached.
+
+Two tiers:
+- in-container: TTLCache (LRU + TTL), module level, survives warm invokes
+- shared (optional): SEARCH_CACHE_TABLE_NAME, one item per key with a
+  DynamoDB TTL attribute, so a page computed by one container serves all
+
+Invalidation: an article leaving the index (rejected, made private,
+deleted) bumps the search generation (search_index.bump_search_generation).
+Containers poll it at most every SEARCH_GENERATION_CHECK_SECONDS; entries
+of an older generation are never served, so a removed article disappears
+within that window - and within SEARCH_CACHE_TTL at worst if the poll
+fails. New posts and edits don't flush anything: pages catch up when their
+entries expire (SEARCH_CACHE_TTL), so a stream of creates doesn't empty
+every cache.
+
+Hit-rate metrics: cache_stats() (per tier), logged by the handler.
+"""
+import os
+import json
+import time
+import hashlib
+import boto3
+from json_encoder import dumps
+from search_index import search_table, GENERATION_KEY
+from ttl_cache import TTLCache, MISSING
+
+dynamodb = boto3.resource("dynamodb")
+
+SEARCH_CACHE_TABLE_NAME = os.environ.get("SEARCH_CACHE_TABLE_NAME", "")
+SEARCH_CACHE_SIZE = int(os.environ.get("SEARCH_CACHE_SIZE", "500"))
+SEARCH_CACHE_TTL = int(os.environ.get("SEARCH_CACHE_TTL", "60"))
+SEARCH_GENERATION_CHECK_SECONDS = float(os.environ.get("SEARCH_GENERATION_CHECK_SECONDS", "5"))
+MAX_SHARED_ENTRY_BYTES = 350 * 1024  # DynamoDB item limit is 400 KB
+
+cache_table = dynamodb.Table(SEARCH_CACHE_TABLE_NAME) if SEARCH_CACHE_TABLE_NAME else None
+
+# Module level: survives across invocations of a warm container
+_local_cache = TTLCache(maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+_generation = {"value": None, "checked_at": float("-inf")}
+_shared_stats = {"hits": 0, "misses": 0, "errors": 0}
+
+
+def cache_key(terms, tags, tag_mode, bbox, sort, limit, fields_mode, next_token):
+    """Key of a normalized public search request (terms/tags already folded)"""
+    raw = json.dumps(
+        [terms, sorted(tags), tag_mode, list(bbox) if bbox else None, sort, limit, fields_mode, next_token],
+        separators=(",", ":"), ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _check_generation():
+    """Current search generation; drops the local tier when it moved"""
+    now = time.monotonic()
+    if not search_table or now - _generation["checked_at"] < SEARCH_GENERATION_CHECK_SECONDS:
+        return _generation["value"]
+    _generation["checked_at"] = now
+    try:
+        response = search_table.get_item(Key=GENERATION_KEY, ProjectionExpression="generation")
+        value = int(response.get("Item", {}).get("generation", 0))
+    except Exception as e:
+        print(f"⚠️ Could not read search generation: {e}")
+        return _generation["value"]
+    if _generation["value"] is not None and value != _generation["value"]:
+        print(f"♻️ Search generation {_generation['value']} -> {value}, clearing search cache")
+        _local_cache.clear()
+    _generation["value"] = value
+    return value
+
+
+def get_cached(key):
+    """Cached result body for key, or None"""
+    generation = _check_generation()
+    result = _local_cache.get(key)
+    if result is not MISSING:
+        return result
+    if not cache_table:
+        return None
+    try:
+        item = cache_table.get_item(Key={"cacheKey": key}).get("Item")
+    except Exception as e:
+        _shared_stats["errors"] += 1
+        print(f"⚠️ Search cache read failed: {e}")
+        return None
+    # TTL deletion lags expiry by up to days: check both ttl and generation
+    if (not item or int(item.get("ttl", 0)) <= time.time()
+            or int(item.get("generation", -1)) != (generation or 0)):
+        _shared_stats["misses"] += 1
+        return None
+    _shared_stats["hits"] += 1
+    result = json.loads(item["result"])
+    _local_cache.set(key, result, ttl=max(1, int(item["ttl"]) - int(time.time())))
+    return result
+
+
+def put_cached(key, result):
+    """Store a result body in both tiers; never raises"""
+    if key is None:
+        return
+    _local_cache.set(key, result)
+    if not cache_table:
+        return
+    try:
+        payload = dumps(result)
+        if len(payload.encode("utf-8")) > MAX_SHARED_ENTRY_BYTES:
+            return
+        cache_table.put_item(Item={
+            "cacheKey": key,
+            "result": payload,
+            "generation": _generation["value"] or 0,
+            "ttl": int(time.time()) + SEARCH_CACHE_TTL,
+        })
+    except Exception as e:
+        _shared_stats["errors"] += 1
+        print(f"⚠️ Search cache write failed: {e}")
+
+
+def cache_stats():
+    """Hit/miss counters of both tiers since the container started"""
+    shared_lookups = _shared_stats["hits"] + _shared_stats["misses"]
+    local = _local_cache.stats()
+    local_lookups = local["hits"] + local["negativeHits"] + local["misses"]
+    served = local["hits"] + local["negativeHits"] + _shared_stats["hits"]
+    return {
+        "generation": _generation["value"],
+        "local": local,
+        "shared": {
+            **_shared_stats,
+            "hitRate": round(_shared_stats["hits"] / shared_lookups, 3) if shared_lookups else 0.0,
+        } if cache_table else None,
+        "hitRate": round(served / local_lookups, 3) if local_lookups else 0.0,
+    }
@@ -0,0 +1,66 @@
+from cors import ok, error, options
+from paginator import parse_limit
+from search_index import (
+    search_table, suggest_phrase, SUGGEST_PREFIX, SUGGEST_PARTITION_CHARS, SUGGEST_KINDS,
+)
+
+# Type-ahead for the search box: gọi ở mỗi lần gõ phím.
+# One Query (begins_with on a single partition), small items, no enrichment.
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+SUGGEST_READ_LIMIT = 100  # candidates read per request, ranked in memory
+
+
+def lambda_handler(event, context):
+    """
+    Suggestions (place names, tags, titles) starting with the typed prefix
+    GET /search/suggest?q=<prefix>[&limit=8]
+
+    The prefix is folded like every search term ("hoi a" finds "Hội An").
+    Returns:
+    - suggestions: [{text, kind, count}], most used first
+    """
+    method = (event.get("httpMethod") or event.get("requestContext", {}).get("http", {}).get("method"))
+    if method == "OPTIONS":
+        return options()
+
+    try:
+        params = event.get("queryStringParameters") or {}
+        prefix = suggest_phrase(params.get("q") or "")
+        if (params.get("q") or "").endswith(" ") and prefix:
+            prefix += " "  # "hoi " must not match "hoian"
+        limit = parse_limit(params.get("limit"), DEFAULT_LIMIT, MAX_LIMIT)
+
+        if len(prefix) < SUGGEST_PARTITION_CHARS or not search_table:
+            return ok(200, {"suggestions": []}, event)
+
+        response = search_table.query(
+            KeyConditionExpression="#term = :term AND begins_with(sortKey, :prefix)",
+            ExpressionAttributeNames={"#term": "term", "#text": "text", "#count": "count"},
+            ExpressionAttributeValues={
+                ":term": f"{SUGGEST_PREFIX}{prefix[:SUGGEST_PARTITION_CHARS]}",
+                ":prefix": prefix,
+            },
+            ProjectionExpression="sortKey, #text, kind, #count",
+            Limit=SUGGEST_READ_LIMIT,
+        )
+
+        # One entry per phrase: a place and a title with the same words
+        # count once, under the higher-ranked kind
+        best = {}
+        for item in response.get("Items", []):
+            phrase, kind = item["sortKey"].rsplit("#", 1)
+            entry = best.setdefault(phrase, {"text": item.get("text", phrase), "kind": kind, "count": 0})
+            entry["count"] += int(item.get("count", 0))
+            if SUGGEST_KINDS.index(kind) < SUGGEST_KINDS.index(entry["kind"]):
+                entry.update(text=item.get("text", phrase), kind=kind)
+
+        suggestions = sorted(
+            (entry for entry in best.values() if entry["count"] > 0),
+            key=lambda e: (-e["count"], SUGGEST_KINDS.index(e["kind"]), len(e["text"]), e["text"]),
+        )[:limit]
+        return ok(200, {"suggestions": suggestions}, event)
+
+    except Exception as e:
+        print(f"Error in search_suggest: {e}")
+        return error(500, f"internal error: {e}")
@@ -0,0 +1,53 @@
+"""
+Search-Worker Lambda Function
+Keeps the search index in step with the articles queued by the write paths
+(search_index.queue_search_sync / queue_search_removal), off the request path
+
+Triggered by SearchIndexQueue in batches of {articleId}: each article is
+read once (consistent) however many messages the batch holds for it, then
+indexed from its current state (search_index.index_article), or unindexed
+when it is gone. A sync diffs the stored doc against that state, so it can
+be repeated and applied in any order: an article whose sync fails
+(DocLocked while the backfill holds its doc, throttling) is handed back to
+SQS (ReportBatchItemFailures) and retried; after maxReceiveCount tries its
+messages land in SearchIndexDLQ.
+"""
+import os
+import json
+import boto3
+from search_index import index_article, unindex_article
+
+dynamodb = boto3.resource('dynamodb')
+
+TABLE_NAME = os.environ.get('TABLE_NAME', '')
+table = dynamodb.Table(TABLE_NAME) if TABLE_NAME else None
+
+
+def lambda_handler(event, context):
+    """
+    Lambda handler for the search worker
+    Triggered by SQS messages {articleId}
+    Returns the messages to redeliver: {'batchItemFailures': [{'itemIdentifier'}]}
+    """
+    records = event.get('Records', [])
+    print(f"Search-Worker - Processing {len(records)} SQS messages")
+
+    message_ids, failed_ids = {}, []
+    for record in records:
+        try:
+            article_id = json.loads(record['body'])['articleId']
+            message_ids.setdefault(article_id, []).append(record['messageId'])
+        except Exception as e:
+            print(f"⚠️ Malformed search sync {record.get('messageId')}: {e}")
+            failed_ids.append(record['messageId'])
+
+    for article_id, ids in message_ids.items():
+        try:
+            item = table.get_item(Key={'articleId': article_id}, ConsistentRead=True).get('Item')
+            added, removed = index_article(item) if item else (0, unindex_article(article_id))
+            print(f"✓ Synced {article_id}: +{added} / -{removed} postings")
+        except Exception as e:
+            print(f"⚠️ Search sync of {article_id} failed, back to the queue: {e}")
+            failed_ids.extend(ids)
+
+    return {'batchItemFailures': [{'itemIdentifier': message_id} for message_id in failed_ids]}
@@ -3,6 +3,7 @@ import os
 import json
 import boto3
 from cors import ok, error, options
+from feed_store import update_feed_favorite_count
 
 dynamodb = boto3.resource("dynamodb")
 
@@ -57,7 +58,7 @@ def lambda_handler(event, context):
 
         # Giảm favoriteCount trong articles table (không cho âm)
         articles_table = dynamodb.Table(ARTICLES_TABLE_NAME)
-        articles_table.update_item(
+        updated = articles_table.update_item(
             Key={"articleId": article_id},
             UpdateExpression="SET favoriteCount = if_not_exists(favoriteCount, :zero) - :dec",
             ExpressionAttributeValues={
@@ -65,9 +66,13 @@ def lambda_handler(event, context):
                 ":dec": 1
             },
             # Đảm bảo không âm
-            ConditionExpression="favoriteCount > :zero OR attribute_not_exists(favoriteCount)"
+            ConditionExpression="favoriteCount > :zero OR attribute_not_exists(favoriteCount)",
+            ReturnValues="ALL_NEW"
         )
 
+        # Keep the public feed card's count in step
+        update_feed_favorite_count(updated.get("Attributes", {}))
+
         return ok(200, {
             "message": "Article unfavorited",
             "userId": user_id,
@@ -7,6 +7,9 @@ import urllib.request
 import urllib.parse
 from decimal import Decimal
 from cors import ok, error, options  # Giả định các hàm này đã được định nghĩa
+from feed_store import sync_feed_entry
+from search_index import queue_search_sync
+from geo import encode as geohash_encode, GH5_PRECISION
 
 # --- INITIALIZATION ---
 dynamodb = boto3.resource("dynamodb")
@@ -242,11 +245,12 @@ def lambda_handler(event, context):
             set_parts.append("#geohash = :geohash")
             set_parts.append("#gh5 = :gh5")
 
+            geohash = geohash_encode(lat_f, lng_f)
             expression_attribute_names["#geohash"] = "geohash"
-            expression_attribute_values[":geohash"] = f"{lat_f:.6f},{lng_f:.6f}"
+            expression_attribute_values[":geohash"] = geohash
 
             expression_attribute_names["#gh5"] = "gh5"
-            expression_attribute_values[":gh5"] = f"{lat_f:.2f},{lng_f:.2f}"
+            expression_attribute_values[":gh5"] = geohash[:GH5_PRECISION]
 
         # Kiểm tra xem có gì để update/remove không
         if not set_parts and not remove_fields:
@@ -278,21 +282,14 @@ def lambda_handler(event, context):
         print("DEBUG update_item result =", response)
 
         item = response["Attributes"]
-        
-        # Recursive function to convert Decimal
-        def convert_decimal(obj):
-            if isinstance(obj, Decimal):
-                return float(obj) if obj % 1 != 0 else int(obj)
-            elif isinstance(obj, dict):
-                return {k: convert_decimal(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [convert_decimal(i) for i in obj]
-            return obj
-        
-        processed_item = convert_decimal(item)
+
+        # Keep the public feed entry and the search postings in step
+        # (visibility / title / content / location changes)
+        sync_feed_entry(item)
+        queue_search_sync(item)
         
         print("✅ Article updated successfully:", article_id)
-        return ok(200, processed_item)
+        return ok(200, item)  # Decimals are converted by the encoder
 
     except json.JSONDecodeError as e:
         print(f"❌ JSON decode error: {e}")
@@ -4,8 +4,10 @@ Tạo presigned URL để upload avatar
 """
 import os
 import json
+import base64
 import uuid
 import boto3
+from compression import compress_response
 
 s3_client = boto3.client('s3')
 
@@ -20,12 +22,14 @@ def cors_headers():
     }
 
 
-def response(status, body):
-    return {
+def response(status, body, event=None):
+    """JSON response; pass `event` to compress per Accept-Encoding"""
+    resp = {
         "statusCode": status,
         "headers": cors_headers(),
         "body": json.dumps(body, ensure_ascii=False)
     }
+    return compress_response(resp, event) if event else resp
 
 
 def get_user_id(event):
@@ -47,7 +51,12 @@ def lambda_handler(event, context):
             return response(401, {"error": "Unauthorized"})
         
         # Parse body
-        body = json.loads(event.get("body", "{}"))
+        # API declares BinaryMediaTypes */* (compressed responses), so
+        # request bodies may arrive base64-encoded
+        body_str = event.get("body") or "{}"
+        if event.get("isBase64Encoded"):
+            body_str = base64.b64decode(body_str).decode("utf-8")
+        body = json.loads(body_str)
         filename = body.get("filename", "").strip()
         content_type = body.get("contentType", "").strip()
         
@@ -85,7 +94,7 @@ def lambda_handler(event, context):
             "uploadUrl": upload_url,
             "avatarKey": avatar_key,
             "expiresIn": 900
-        })
+        }, event)
     
     except json.JSONDecodeError:
         return response(400, {"error": "Invalid JSON"})
@@ -3,9 +3,9 @@ Get User Profile
 Lấy thông tin profile của user hiện tại
 """
 import os
-import json
+import time
 import boto3
-from decimal import Decimal
+from cors import ok, error, options, version_etag, if_none_match, not_modified
 
 dynamodb = boto3.resource('dynamodb')
 s3_client = boto3.client('s3')
@@ -15,21 +15,22 @@ BUCKET_NAME = os.environ.get('BUCKET_NAME', '')
 
 profiles_table = dynamodb.Table(PROFILES_TABLE_NAME) if PROFILES_TABLE_NAME else None
 
+PRESIGN_EXPIRES = 3600
 
-def cors_headers():
-    return {
-        "Access-Control-Allow-Origin": "*",
-        "Access-Control-Allow-Headers": "Content-Type,Authorization,X-User-Id",
-        "Access-Control-Allow-Methods": "OPTIONS,GET,POST,PATCH,DELETE",
-    }
 
-
-def response(status, body):
-    return {
-        "statusCode": status,
-        "headers": cors_headers(),
-        "body": json.dumps(body, ensure_ascii=False, default=str)
-    }
+def profile_etag(user_id, profile):
+    """
+    Version ETag: profileVersion/updatedAt change on every update_profile,
+    the time window keeps cached presigned avatar/cover URLs from expiring
+    """
+    return version_etag(
+        'profile',
+        user_id,
+        profile.get("profileVersion"),
+        profile.get("updatedAt"),
+        profile.get("createdAt"),
+        int(time.time() // (PRESIGN_EXPIRES // 2)),
+    )
 
 
 def get_user_id(event):
@@ -43,19 +44,19 @@ def get_user_id(event):
 def lambda_handler(event, context):
     method = event.get("httpMethod", "")
     if method == "OPTIONS":
-        return {"statusCode": 204, "headers": cors_headers(), "body": ""}
+        return options()
     
     try:
         user_id = get_user_id(event)
         if not user_id:
-            return response(401, {"error": "Unauthorized"})
+            return error(401, "Unauthorized")
         
         # Lấy profile từ DynamoDB
         result = profiles_table.get_item(Key={"userId": user_id})
         
         if "Item" not in result:
             # Nếu chưa có profile, trả về profile mặc định
-            return response(200, {
+            return ok(200, {
                 "userId": user_id,
                 "username": None,
                 "avatarKey": None,
@@ -67,6 +68,11 @@ def lambda_handler(event, context):
             })
         
         profile = result["Item"]
+
+        # Nothing changed since the client's copy: skip URL signing + serialization
+        etag = profile_etag(user_id, profile)
+        if if_none_match(event, etag):
+            return not_modified(etag)
         
         # Tạo presigned URL cho avatar nếu có
         if profile.get("avatarKey"):
@@ -74,7 +80,7 @@ def lambda_handler(event, context):
                 avatar_url = s3_client.generate_presigned_url(
                     'get_object',
                     Params={'Bucket': BUCKET_NAME, 'Key': profile["avatarKey"]},
-                    ExpiresIn=3600
+                    ExpiresIn=PRESIGN_EXPIRES
                 )
                 profile["avatarUrl"] = avatar_url
             except Exception as e:
@@ -86,21 +92,16 @@ def lambda_handler(event, context):
                 cover_url = s3_client.generate_presigned_url(
                     'get_object',
                     Params={'Bucket': BUCKET_NAME, 'Key': profile["coverImageKey"]},
-                    ExpiresIn=3600
+                    ExpiresIn=PRESIGN_EXPIRES
                 )
                 profile["coverImageUrl"] = cover_url
             except Exception as e:
                 print(f"Error generating cover image URL: {e}")
         
-        # Convert Decimal to float
-        for key, value in profile.items():
-            if isinstance(value, Decimal):
-                profile[key] = float(value)
-        
-        return response(200, profile)
+        return ok(200, profile, event, etag)
     
     except Exception as e:
         print(f"Error in get_profile: {e}")
         import traceback
         traceback.print_exc()
-        return response(500, {"error": "Internal server error"})
+        return error(500, "Internal server error")
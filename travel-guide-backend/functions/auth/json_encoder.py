@@ -0,0 +1,37 @@
+"""
+Single-pass JSON serialization for DynamoDB items
+
+boto3 returns numbers as Decimal and string/number sets as Python sets.
+Instead of copying every item with a recursive _convert_decimal() and then
+letting json.dumps walk the copy again, dumps() converts those values while
+encoding (via `default`), so each response is walked exactly once.
+
+Uses orjson when it is installed (several times faster, UTF-8 output like
+ensure_ascii=False), the standard library otherwise.
+Copy of functions/articles/json_encoder.py - keep in sync.
+"""
+import json
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def to_native(obj):
+    """JSON-compatible value for types the encoders don't know"""
+    if isinstance(obj, Decimal):
+        # Integral Decimals (counts, timestamps) stay ints for the frontend
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson:
+    def dumps(obj):
+        return orjson.dumps(obj, default=to_native, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+else:
+    def dumps(obj):
+        return json.dumps(obj, ensure_ascii=False, default=to_native)
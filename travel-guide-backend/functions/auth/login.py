@@ -1,12 +1,18 @@
 import boto3
 import json
+import base64
 import os
 
 client = boto3.client('cognito-idp')
 
 def lambda_handler(event, context):
     try:
-        body = json.loads(event['body'])
+        # API declares BinaryMediaTypes */* (compressed responses), so
+        # request bodies may arrive base64-encoded
+        body_str = event.get("body") or "{}"
+        if event.get("isBase64Encoded"):
+            body_str = base64.b64decode(body_str).decode("utf-8")
+        body = json.loads(body_str)
         username = body['username']
         password = body['password']
 
@@ -4,7 +4,10 @@ Cập nhật thông tin profile (username, bio, avatar)
 """
 import os
 import json
+import base64
 import boto3
+from compression import compress_response
+from json_encoder import dumps
 from datetime import datetime, timezone
 
 dynamodb = boto3.resource('dynamodb')
@@ -15,7 +18,6 @@ USER_POOL_ID = os.environ.get('USER_POOL_ID', '')
 
 profiles_table = dynamodb.Table(PROFILES_TABLE_NAME) if PROFILES_TABLE_NAME else None
 
-
 def cors_headers():
     return {
         "Access-Control-Allow-Origin": "*",
@@ -24,12 +26,14 @@ def cors_headers():
     }
 
 
-def response(status, body):
-    return {
+def response(status, body, event=None):
+    """JSON response; pass `event` to compress per Accept-Encoding"""
+    resp = {
         "statusCode": status,
         "headers": cors_headers(),
-        "body": json.dumps(body, ensure_ascii=False, default=str)
+        "body": dumps(body)
     }
+    return compress_response(resp, event) if event else resp
 
 
 def get_user_id(event):
@@ -51,7 +55,12 @@ def lambda_handler(event, context):
             return response(401, {"error": "Unauthorized"})
         
         # Parse body
-        body = json.loads(event.get("body", "{}"))
+        # API declares BinaryMediaTypes */* (compressed responses), so
+        # request bodies may arrive base64-encoded
+        body_str = event.get("body") or "{}"
+        if event.get("isBase64Encoded"):
+            body_str = base64.b64decode(body_str).decode("utf-8")
+        body = json.loads(body_str)
         
         # Các trường được phép update
         allowed_fields = ["username", "bio", "avatarKey", "coverImageKey"]
@@ -114,6 +123,11 @@ def lambda_handler(event, context):
             expression_names["#createdAt"] = "createdAt"
             update_expression = "SET " + ", ".join(update_parts)
         
+        # Per-profile version, bumped on every change (revalidated by articles/profile_enricher.py)
+        update_expression += " ADD #profileVersion :one"
+        expression_names["#profileVersion"] = "profileVersion"
+        expression_values[":one"] = 1
+        
         # Update profile
         result = profiles_table.update_item(
             Key={"userId": user_id},
@@ -128,7 +142,7 @@ def lambda_handler(event, context):
         return response(200, {
             "message": "Profile updated successfully",
             "profile": updated_profile
-        })
+        }, event)
     
     except json.JSONDecodeError:
         return response(400, {"error": "Invalid JSON"})
@@ -11,6 +11,9 @@ from decimal import Decimal
 
 sys.path.insert(0, '/var/task/functions')
 
+from feed_store import sync_feed_entry
+from search_index import queue_search_sync
+
 rekognition = boto3.client('rekognition')
 s3_client = boto3.client('s3')
 dynamodb = boto3.resource('dynamodb')
@@ -230,9 +233,9 @@ def handle_moderation_failure(bucket, key, article_id, moderation_result):
             # Update article status in DynamoDB
             # Use REMOVE to completely delete image-related fields (avoids None validation error)
             if table and article_id:
-                table.update_item(
+                rejected = table.update_item(
                     Key={'articleId': article_id},
-                    UpdateExpression='SET moderationStatus = :status, #status = :status, moderationDetails = :details, userNotified = :notified REMOVE imageKey, thumbnailKey, imageKeys',
+                    UpdateExpression='SET moderationStatus = :status, #status = :status, moderationDetails = :details, userNotified = :notified REMOVE imageKey, thumbnailKey, imageKeys, approvedOwnerId',
                     ExpressionAttributeNames={
                         '#status': 'status'  # status is a reserved word in DynamoDB
                     },
@@ -246,8 +249,11 @@ def handle_moderation_failure(bucket, key, article_id, moderation_result):
                             'emailSent': email_sent
                         },
                         ':notified': email_sent
-                    }
+                    },
+                    ReturnValues='ALL_NEW'
                 )
+                sync_feed_entry(rejected.get('Attributes', {}))
+                queue_search_sync(rejected.get('Attributes', {}))
                 print(f"✓ Updated article status to rejected")
                 print(f"✓ Removed imageKey, thumbnailKey, and imageKeys fields from article")
             
@@ -712,7 +718,7 @@ def mark_article_as_approved(article_id):
         return
     
     try:
-        table.update_item(
+        response = table.update_item(
             Key={'articleId': article_id},
             UpdateExpression='SET moderationStatus = :modStatus, moderatedAt = :timestamp, #status = :status',
             ExpressionAttributeNames={
@@ -722,9 +728,15 @@ def mark_article_as_approved(article_id):
                 ':modStatus': 'approved',
                 ':status': 'approved',  # NEW: Set status to approved for public visibility
                 ':timestamp': datetime.now(timezone.utc).isoformat()
-            }
+            },
+            ReturnValues='ALL_NEW'
         )
         print(f"✓ Article {article_id} marked as approved (status=approved)")
+
+        # Publish to the public feed, approved-owner index and search index
+        # (no-op for private articles)
+        sync_feed_entry(response.get('Attributes', {}))
+        queue_search_sync(response.get('Attributes', {}))
     except Exception as e:
         print(f"Failed to update article status: {e}")
 
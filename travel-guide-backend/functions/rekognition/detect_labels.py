@@ -12,6 +12,9 @@ from datetime import datetime, timezone
 
 sys.path.insert(0, '/var/task/functions')
 
+from feed_store import sync_feed_entry
+from search_index import queue_search_sync
+
 # Initialize AWS clients
 rekognition = boto3.client('rekognition')
 dynamodb = boto3.resource('dynamodb')
@@ -313,7 +316,7 @@ def update_article_with_tags(article_id, labels_data):
         } for label in labels_data]
         
         # Update article
-        table.update_item(
+        response = table.update_item(
             Key={'articleId': article_id},
             UpdateExpression='SET autoTags = :tags, labelDetails = :details, lastAnalyzed = :timestamp',
             ExpressionAttributeValues={
@@ -321,10 +324,15 @@ def update_article_with_tags(article_id, labels_data):
                 ':details': label_details,
                 ':timestamp': datetime.now(timezone.utc).isoformat()
             },
-            ReturnValues='NONE'
+            ReturnValues='ALL_NEW'
         )
         
         print(f"✓ Updated article {article_id} with {len(tag_names)} prioritized tags")
+
+        # autoTags are on the feed card and in the exact tag postings
+        # (both no-ops until the article is approved + public)
+        sync_feed_entry(response.get('Attributes', {}))
+        queue_search_sync(response.get('Attributes', {}))
         return True
         
     except Exception as e:
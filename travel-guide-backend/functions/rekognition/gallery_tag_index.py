@@ -0,0 +1,75 @@
+"""
+Gallery tag index - tag -> photo entries, newest first
+
+GalleryPhotosTable is keyed by photo_id only, so finding the photos of a
+tag used to mean scanning the whole table. GalleryTagPhotosTable keeps one
+entry per (tag, photo), partitioned by the lowercased tag and sorted by
+creation time:
+
+    tag       sortKey                                photo_id, image_url, tags, status, created_at
+    "beach"   "2026-03-01T08:00:00+00:00#articles/x"  (copy of the photo fields the gallery shows)
+
+so a tag page is a single key-range Query (ScanIndexForward=False) with a
+real cursor, whatever the size of the table. save_photo_to_gallery() keeps
+the entries in step on every write (a reprocessed photo drops the entries
+of its previous version); existing photos: backfill_gallery_trends.py with
+{"tag_index": true}.
+Copy of functions/articles/gallery_tag_index.py - keep in sync.
+"""
+import os
+import boto3
+
+dynamodb = boto3.resource('dynamodb')
+
+GALLERY_TAG_PHOTOS_TABLE = os.environ.get('GALLERY_TAG_PHOTOS_TABLE', '')
+
+tag_photos_table = dynamodb.Table(GALLERY_TAG_PHOTOS_TABLE) if GALLERY_TAG_PHOTOS_TABLE else None
+
+ENTRY_FIELDS = ('photo_id', 'image_url', 'tags', 'status', 'created_at')
+
+
+def index_tags(tags):
+    """Lowercased, stripped, de-duplicated tags (same normalisation as GalleryTrendsTable)"""
+    return list(dict.fromkeys(t.strip().lower() for t in (tags or []) if isinstance(t, str) and t.strip()))
+
+
+def photo_sort_key(photo):
+    """created_at first so a tag partition reads newest first; photo_id keeps keys unique"""
+    return f"{photo.get('created_at') or ''}#{photo['photo_id']}"
+
+
+def index_entries(photo):
+    """Index items of a photo, one per tag"""
+    if not photo or not photo.get('photo_id'):
+        return []
+    fields = {field: photo[field] for field in ENTRY_FIELDS if photo.get(field) is not None}
+    sort_key = photo_sort_key(photo)
+    return [{'tag': tag, 'sortKey': sort_key, **fields} for tag in index_tags(photo.get('tags'))]
+
+
+def sync_photo_tags(old_photo, new_photo):
+    """
+    Replace the index entries of old_photo (previous version, None if new)
+    with those of new_photo (None: photo removed). Returns True on success;
+    never raises.
+    """
+    if not tag_photos_table:
+        return False
+    try:
+        new_entries = index_entries(new_photo)
+        new_keys = {(entry['tag'], entry['sortKey']) for entry in new_entries}
+        stale_keys = [
+            {'tag': entry['tag'], 'sortKey': entry['sortKey']}
+            for entry in index_entries(old_photo)
+            if (entry['tag'], entry['sortKey']) not in new_keys
+        ]
+        with tag_photos_table.batch_writer() as batch:
+            for key in stale_keys:
+                batch.delete_item(Key=key)
+            for entry in new_entries:
+                batch.put_item(Item=entry)
+        return True
+    except Exception as e:
+        photo_id = (new_photo or old_photo or {}).get('photo_id')
+        print(f"⚠️ Failed to sync gallery tag index for {photo_id}: {e}")
+        return False
@@ -1,9 +1,13 @@
 """
 Save photo metadata and update trending tags in Gallery tables
+(plus the tag -> photo index, gallery_tag_index.py, and the trending
+leaderboard, trending_board.py)
 """
 import os
 import boto3
 from datetime import datetime, timezone
+from gallery_tag_index import sync_photo_tags
+from trending_board import update_board, record_in_buckets
 
 dynamodb = boto3.resource('dynamodb')
 
@@ -25,7 +29,9 @@ def save_photo_to_gallery(photo_id, image_url, tags, status='public'):
             'status': status,
             'created_at': datetime.now(timezone.utc).isoformat()
         }
-        photos_table.put_item(Item=item)
+        # ALL_OLD: a reprocessed photo's previous tags / created_at, to drop its old index entries
+        response = photos_table.put_item(Item=item, ReturnValues='ALL_OLD')
+        sync_photo_tags(response.get('Attributes'), item)
         return True
     except Exception:
         return False
@@ -35,8 +41,9 @@ def update_trending_tags(tags, image_url):
     if not trends_table:
         return False
     try:
+        rows = []
         for tag in tags:
-            trends_table.update_item(
+            response = trends_table.update_item(
                 Key={'tag_name': tag.lower()},
                 UpdateExpression='ADD #count :inc SET cover_image = if_not_exists(cover_image, :img), last_updated = :ts',
                 ExpressionAttributeNames={'#count': 'count'},
@@ -44,8 +51,14 @@ def update_trending_tags(tags, image_url):
                     ':inc': 1,
                     ':img': image_url,
                     ':ts': datetime.now(timezone.utc).isoformat()
-                }
+                },
+                ReturnValues='ALL_NEW'
             )
+            rows.append(response['Attributes'])
+        # Keep the top-K leaderboard (and the tag counter) in step
+        update_board(rows, new_tags=sum(1 for row in rows if row.get('count') == 1))
+        # ... and the hourly / daily buckets of the 24h / 7d windows
+        record_in_buckets(tags, image_url)
         return True
     except Exception:
         return False
@@ -0,0 +1,820 @@
+"""
+Search index - inverted token postings for public text search
+
+SearchIndexTable holds, for every approved + public article (same rule as
+the public feed, feed_store.is_feed_visible):
+
+    posting:  term = "<token>"              sortKey = "<createdAt>#<articleId>"
+              tf = [title, place, content]  dl = [title, place, content] (tokens)
+    tag:      term = "#tag#<tag>"           sortKey = "<createdAt>#<articleId>"
+    doc:      term = "#doc#<articleId>"     sortKey = "doc"     terms = [...]
+                                                            suggestions = [...]
+                                                            vocabulary = [...]
+                                                            docVersion
+                                                            lockOwner, lockUntil
+    suggest:  term = "#ac#<2 chars>"        sortKey = "<phrase>#<kind>"
+              text, kind (place / tag / title), count (visible articles)
+    df:       term = "#df#<token>"          sortKey = "df"      df = articles with it
+    stats:    term = "#stats"               sortKey = "bm25#<n>"  docCount,
+              titleLength, locationNameLength, contentLength (sums; STATS_SHARDS
+              shards plus the legacy "bm25" item, readers add them up)
+    generation: term = "#generation"        sortKey = "search"  generation
+              (bumped when an article leaves the index; search_cache.py)
+    vocab:    term = "#vocab#<word>"        sortKey = "vocab"   text, count
+    trigram:  term = "#tri#<3 chars>"       sortKey = "<word>"  text
+
+All text goes through fold(): lowercase, Unicode NFD with the combining
+marks dropped, đ -> d - so "Hội An", "hoi an" and "HOI AN" are the same
+term, at index and at query time alike. Tokens come from title,
+locationName and content; tag postings from the user's tags and
+Rekognition autoTags, matched exactly after folding ("food" never matches
+"seafood"). A search for "hội an cổ" reads the postings of each token newest
+first and intersects them (leapfrog: every list skips forward to the
+smallest current head with a key-range query); tags join the intersection
+(tagMode=all) or as one union list (tagMode=any). A page costs a few small
+Query calls whatever the table size, and never touches articles that don't
+match.
+
+Suggestion items serve type-ahead (search_suggest.py): place names, tags
+and titles under the partition of their first two folded characters, so
+the suggestions for any prefix of 2+ characters are one begins_with
+key-range Query.
+
+Vocabulary items list the words of titles, place names and tags (and every
+multi-word place / tag glued into one word: "halong" -> "ha long"), each
+with the trigrams of "$word$" pointing back to it. They exist while at
+least one article uses the word: trigram items are written when its
+count goes 0 -> 1 and dropped at 1 -> 0, so edits cost one UpdateItem per
+word that appears or disappears. fuzzy.py corrects misspelled query words
+from them ("quok" -> "quoc").
+
+tf/dl on the postings plus the df counters and the collection stats are
+what BM25 ranking needs (ranking.py, sort=relevance). A new article costs
+one df UpdateItem per distinct text term; edits only touch the terms that
+appear or disappear. df, suggestion and vocabulary counters go out together
+as one parallel round. The collection stats are spread over STATS_SHARDS
+items (shard = hash of the articleId) so indexed writes don't all hit one
+key.
+
+Indexing stays off the request path: create, update, delete, content
+moderation (approve / reject) and detect_labels (autoTags) only queue the
+articleId (queue_search_sync / queue_search_removal) on
+SEARCH_INDEX_QUEUE_URL, and the search worker (search_worker.py) reads the
+article's current state and indexes it (index_article / unindex_article).
+A sync that fails goes back to the queue and is retried, then lands in
+SearchIndexDLQ. Without a queue, or when the send fails, the article is
+synced right away.
+
+The doc item records which terms and suggestions an article is indexed
+under (and a fingerprint of its tf/dl), so any writer can diff old vs new
+without the previous item: the search worker and the backfill Lambda. They
+can run at the same time for one article, and every counter above is a
+diff of the doc, so the doc item is also a lock: a writer takes it with a
+conditional UpdateItem (which returns the doc it guards), applies postings
+and counters, then replaces the doc with docVersion + 1 on condition it
+still holds the lock. A second writer waits with backoff and diffs from
+the doc the first one committed. The lock is a lease (SEARCH_LOCK_SECONDS,
+shorter than the whole backoff): a writer that dies halfway is taken over,
+and the counters it already touched need the search_index backfill. Copy of
+functions/articles/search_index.py - keep in sync.
+"""
+import os
+import re
+import json
+import time
+import uuid
+import hashlib
+import threading
+import unicodedata
+import boto3
+from concurrent.futures import ThreadPoolExecutor
+
+dynamodb = boto3.resource("dynamodb")
+sqs_client = boto3.client("sqs")
+
+SEARCH_INDEX_TABLE_NAME = os.environ.get("SEARCH_INDEX_TABLE_NAME", "")
+search_table = dynamodb.Table(SEARCH_INDEX_TABLE_NAME) if SEARCH_INDEX_TABLE_NAME else None
+SEARCH_INDEX_QUEUE_URL = os.environ.get("SEARCH_INDEX_QUEUE_URL", "")
+
+INDEXED_FIELDS = ("title", "locationName", "content")  # in priority order
+TAG_FIELDS = ("tags", "autoTags")
+TAG_PREFIX = "#tag#"
+TAG_MODES = ("any", "all")
+MAX_QUERY_TAGS = 10
+DOC_PREFIX = "#doc#"
+DOC_SORT_KEY = "doc"
+SUGGEST_PREFIX = "#ac#"
+SUGGEST_PARTITION_CHARS = 2  # also the minimum prefix length
+SUGGEST_KINDS = ("place", "tag", "title")  # ranking order on equal counts
+MAX_SUGGESTION_LENGTH = 80
+VOCAB_PREFIX = "#vocab#"
+VOCAB_SORT_KEY = "vocab"
+TRIGRAM_PREFIX = "#tri#"
+MIN_VOCAB_LENGTH = 3
+MAX_VOCAB_LENGTH = 32
+DF_PREFIX = "#df#"
+DF_SORT_KEY = "df"
+STATS_KEY = {"term": "#stats", "sortKey": "bm25"}  # legacy single item; shards "bm25#<n>"
+STATS_SHARDS = 16
+GENERATION_KEY = {"term": "#generation", "sortKey": "search"}  # read by search_cache.py
+SEARCH_LOCK_SECONDS = 10  # doc lock lease: a writer that dies holding it blocks the article this long
+MAX_LOCK_TRIES = 8
+LOCK_BACKOFF_SECONDS = 0.1  # doubles after every failed try but the last: ~12.7 s in total, > the lease
+MAX_TERMS_PER_ARTICLE = 256
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 8
+POSTINGS_BATCH = 100  # postings per Query (keys only, ~90 bytes each with tf/dl)
+DEFAULT_READ_BUDGET = 25  # postings Query calls per search request
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_executor = None
+_local = threading.local()
+
+
+class DocLocked(Exception):
+    pass
+
+
+def _pool():
+    """Module-level pool for the counter updates (one UpdateItem per term / word / suggestion)"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="search-index")
+    return _executor
+
+
+def _thread_table():
+    """boto3 resources are not thread-safe: one Table object per thread"""
+    table = getattr(_local, "table", None)
+    if table is None:
+        table = _local.table = boto3.session.Session().resource("dynamodb").Table(SEARCH_INDEX_TABLE_NAME)
+    return table
+
+
+def fold(text):
+    """Lowercase and strip diacritics (Vietnamese included): Đà Nẵng -> da nang"""
+    text = unicodedata.normalize("NFD", str(text).lower()).replace("đ", "d")
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    """Folded word tokens of text, in order (duplicates kept)"""
+    if not text:
+        return []
+    return [t for t in _TOKEN_RE.findall(fold(text)) if len(t) <= MAX_TERM_LENGTH and t.strip("_")]
+
+
+def suggest_phrase(text):
+    """Folded words of text joined by single spaces (the suggestion sort key)"""
+    return " ".join(tokenize(text))[:MAX_SUGGESTION_LENGTH].strip()
+
+
+def query_terms(q):
+    """Distinct search terms of a query string (at most MAX_QUERY_TERMS)"""
+    return list(dict.fromkeys(tokenize(q)))[:MAX_QUERY_TERMS]
+
+
+def normalize_tag(tag):
+    return " ".join(fold(tag).split())
+
+
+def tag_term(tag):
+    return f"{TAG_PREFIX}{normalize_tag(tag)}"
+
+
+def query_tags(tags):
+    """Distinct normalized tags of a comma-separated tags parameter"""
+    tag_list = [normalize_tag(t) for t in (tags or "").split(",")]
+    return list(dict.fromkeys(t for t in tag_list if t))[:MAX_QUERY_TAGS]
+
+
+def article_terms(item):
+    """Distinct terms an article is indexed under (tags, then title and location first)"""
+    terms = {}
+    for field in TAG_FIELDS:
+        for tag in item.get(field) or []:
+            if normalize_tag(tag) and len(normalize_tag(tag)) <= MAX_TERM_LENGTH:
+                terms.setdefault(tag_term(tag), None)
+    for field in INDEXED_FIELDS:
+        for term in tokenize(item.get(field)):
+            terms.setdefault(term, None)
+            if len(terms) >= MAX_TERMS_PER_ARTICLE:
+                return list(terms)
+    return list(terms)
+
+
+def article_suggestions(item):
+    """{sortKey: display text} of the phrases an article suggests"""
+    sources = []
+    location = item.get("locationName") or ""
+    # "Hội An, Quảng Nam": the full name and each part after a comma
+    parts = [p.strip() for p in str(location).split(",")]
+    sources += [("place", location)] + [("place", p) for p in parts[1:]]
+    for field in TAG_FIELDS:
+        sources += [("tag", tag) for tag in item.get(field) or []]
+    sources.append(("title", item.get("title") or ""))
+
+    suggestions = {}
+    for kind, text in sources:
+        phrase = suggest_phrase(text)
+        if len(phrase) >= SUGGEST_PARTITION_CHARS:
+            suggestions.setdefault(f"{phrase}#{kind}", " ".join(str(text).split())[:MAX_SUGGESTION_LENGTH])
+    return suggestions
+
+
+def trigrams(word):
+    """Distinct trigrams of "$word$" in order ("hue" -> $hu, hue, ue$)"""
+    padded = f"${word}$"
+    return list(dict.fromkeys(padded[i:i + 3] for i in range(len(padded) - 2)))
+
+
+def article_vocabulary(item):
+    """{word: folded text} fuzzy search can correct a query word to"""
+    location = str(item.get("locationName") or "")
+    tags = [str(tag) for field in TAG_FIELDS for tag in item.get(field) or []]
+    vocabulary = {}
+    for text in [item.get("title"), location] + tags:
+        for token in tokenize(text):
+            vocabulary.setdefault(token, token)
+    # Multi-word places and tags also as one word: "Ha Long" <- "halong"
+    for text in location.split(",") + tags:
+        phrase = suggest_phrase(text)
+        if " " in phrase:
+            vocabulary.setdefault(phrase.replace(" ", ""), phrase)
+    return {
+        word: text for word, text in vocabulary.items()
+        if MIN_VOCAB_LENGTH <= len(word) <= MAX_VOCAB_LENGTH and not word.isdigit()
+    }
+
+
+def _vocab_key(word):
+    return {"term": f"{VOCAB_PREFIX}{word}", "sortKey": VOCAB_SORT_KEY}
+
+
+def _suggest_key(sort_key):
+    return {"term": f"{SUGGEST_PREFIX}{sort_key[:SUGGEST_PARTITION_CHARS]}", "sortKey": sort_key}
+
+
+def _decrement(key):
+    """count -1 on a shared counter item, deleting it at 0; True if it was deleted"""
+    table = _thread_table()
+    conditional_failed = table.meta.client.exceptions.ConditionalCheckFailedException
+    try:
+        response = table.update_item(
+            Key=key,
+            UpdateExpression="ADD #count :minus_one",
+            ConditionExpression="attribute_exists(sortKey)",
+            ExpressionAttributeNames={"#count": "count"},
+            ExpressionAttributeValues={":minus_one": -1},
+            ReturnValues="UPDATED_NEW",
+        )
+        if response.get("Attributes", {}).get("count", 0) > 0:
+            return False
+        # Last article gone; a concurrent +1 fails the condition and keeps it
+        table.delete_item(
+            Key=key,
+            ConditionExpression="#count <= :zero",
+            ExpressionAttributeNames={"#count": "count"},
+            ExpressionAttributeValues={":zero": 0},
+        )
+        return True
+    except conditional_failed:
+        return False
+
+
+def _add_suggestion(sort_key, text):
+    _thread_table().update_item(
+        Key=_suggest_key(sort_key),
+        UpdateExpression="SET #text = if_not_exists(#text, :text), kind = :kind ADD #count :one",
+        ExpressionAttributeNames={"#text": "text", "#count": "count"},
+        ExpressionAttributeValues={":text": text, ":kind": sort_key.rsplit("#", 1)[1], ":one": 1},
+    )
+
+
+def _remove_suggestion(sort_key):
+    _decrement(_suggest_key(sort_key))
+
+
+def _add_word(word, text):
+    """count +1; returns the trigram change when the word appears (0 -> 1)"""
+    response = _thread_table().update_item(
+        Key=_vocab_key(word),
+        UpdateExpression="SET #text = if_not_exists(#text, :text) ADD #count :one",
+        ExpressionAttributeNames={"#text": "text", "#count": "count"},
+        ExpressionAttributeValues={":text": text, ":one": 1},
+        ReturnValues="UPDATED_NEW",
+    )
+    if response.get("Attributes", {}).get("count") == 1:
+        return word, text
+    return None
+
+
+def _remove_word(word):
+    """count -1; returns the trigram change when the word disappears (1 -> 0)"""
+    return (word, None) if _decrement(_vocab_key(word)) else None
+
+
+def _add_df(term, delta):
+    _thread_table().update_item(
+        Key={"term": f"{DF_PREFIX}{term}", "sortKey": DF_SORT_KEY},
+        UpdateExpression="ADD df :delta",
+        ExpressionAttributeValues={":delta": delta},
+    )
+
+
+def _counted(doc):
+    """Doc items written before the statistics existed (no "dl") never counted"""
+    return bool(doc and "dl" in doc)
+
+
+def _write_counters(old_doc, new_doc):
+    """
+    Count +1 / -1 on the suggestions, vocabulary words and df of the text
+    terms the article gains / loses, then write the trigrams of the words
+    that appear / disappear. DynamoDB can't ADD inside a BatchWriteItem, so
+    the counters go out as one parallel round of UpdateItems and the
+    trigrams as one batch.
+    """
+    old_suggestions = set(old_doc.get("suggestions") or []) if old_doc else set()
+    old_words = set(old_doc.get("vocabulary") or []) if old_doc else set()
+    old_text_terms = _text_terms(old_doc.get("terms") or []) if _counted(old_doc) else set()
+    new_suggestions = new_doc["suggestions"] if new_doc else {}
+    new_vocabulary = new_doc["vocabulary"] if new_doc else {}
+    new_text_terms = _text_terms(new_doc["terms"]) if new_doc else set()
+
+    tasks = [(_add_suggestion, key, new_suggestions[key]) for key in set(new_suggestions) - old_suggestions]
+    tasks += [(_remove_suggestion, key) for key in old_suggestions - set(new_suggestions)]
+    tasks += [(_add_word, word, text) for word, text in new_vocabulary.items() if word not in old_words]
+    tasks += [(_remove_word, word) for word in old_words - set(new_vocabulary)]
+    tasks += [(_add_df, term, 1) for term in new_text_terms - old_text_terms]
+    tasks += [(_add_df, term, -1) for term in old_text_terms - new_text_terms]
+    if not tasks:
+        return
+    word_changes = [change for change in _pool().map(lambda task: task[0](*task[1:]), tasks) if change]
+    if word_changes:
+        with search_table.batch_writer() as batch:
+            for word, text in word_changes:
+                for gram in trigrams(word):
+                    key = {"term": f"{TRIGRAM_PREFIX}{gram}", "sortKey": word}
+                    if text is None:
+                        batch.delete_item(Key=key)
+                    else:
+                        batch.put_item(Item={**key, "text": text})
+
+
+def _is_indexed(item):
+    if not item or item.get("visibility") != "public":
+        return False
+    return item.get("status", "approved") == "approved"
+
+
+def _sort_key(item):
+    return f"{item['createdAt']}#{item['articleId']}"
+
+
+def _doc_key(article_id):
+    return {"term": f"{DOC_PREFIX}{article_id}", "sortKey": DOC_SORT_KEY}
+
+
+def document_stats(item, terms):
+    """
+    BM25 statistics of the text fields: ({term: [tf title, tf place, tf
+    content]} for the indexed text terms, [length of each field in tokens])
+    """
+    indexed = {t for t in terms if not t.startswith(TAG_PREFIX)}
+    tf, dl = {}, []
+    for field_index, field in enumerate(INDEXED_FIELDS):
+        tokens = tokenize(item.get(field))
+        dl.append(len(tokens))
+        for token in tokens:
+            if token in indexed:
+                tf.setdefault(token, [0] * len(INDEXED_FIELDS))[field_index] += 1
+    return tf, dl
+
+
+def _fingerprint(tf, dl):
+    return hashlib.md5(repr((dl, sorted(tf.items()))).encode("utf-8")).hexdigest()[:16]
+
+
+def _text_terms(terms):
+    return {t for t in terms if not t.startswith(TAG_PREFIX)}
+
+
+def stats_keys():
+    """Every collection statistics item: the legacy single item plus the shards"""
+    return [STATS_KEY] + [{"term": STATS_KEY["term"], "sortKey": f"{STATS_KEY['sortKey']}#{i}"} for i in range(STATS_SHARDS)]
+
+
+def _stats_key(article_id):
+    """Statistics shard of an article: stable hash of its id, so its -1 lands where its +1 did"""
+    digest = hashlib.md5(article_id.encode("utf-8")).digest()
+    return {"term": STATS_KEY["term"], "sortKey": f"{STATS_KEY['sortKey']}#{int.from_bytes(digest[:4], 'big') % STATS_SHARDS}"}
+
+
+def _write_stats(old_doc, new_dl, article_id):
+    """
+    Keep the BM25 collection statistics in step: the document count and
+    field length sums, on the article's statistics shard (readers sum
+    stats_keys()).
+    """
+    counted = _counted(old_doc)
+    old_dl = [int(n) for n in old_doc["dl"]] if counted else [0] * len(INDEXED_FIELDS)
+    doc_delta = int(new_dl is not None) - int(counted)
+    length_deltas = [new - old for new, old in zip(new_dl or [0] * len(INDEXED_FIELDS), old_dl)]
+    if doc_delta or any(length_deltas):
+        values = {":docs": doc_delta}
+        values.update({f":len{i}": delta for i, delta in enumerate(length_deltas)})
+        search_table.update_item(
+            Key=_stats_key(article_id),
+            UpdateExpression="ADD docCount :docs, " + ", ".join(
+                f"{field}Length :len{i}" for i, field in enumerate(INDEXED_FIELDS)
+            ),
+            ExpressionAttributeValues=values,
+        )
+
+
+def _write_postings(old_doc, new_doc, article_id):
+    """
+    Apply the posting diff between the stored doc and new_doc = {terms,
+    sortKey, suggestions, vocabulary, tf, dl} (None: unindex); returns
+    (postings added, postings removed)
+    """
+    new_terms = new_doc["terms"] if new_doc else []
+    new_sort_key = new_doc["sortKey"] if new_doc else None
+    tf = new_doc["tf"] if new_doc else {}
+    dl = new_doc["dl"] if new_doc else None
+
+    old_terms = set(old_doc.get("terms") or []) if old_doc else set()
+    old_sort_key = old_doc.get("docSortKey") if old_doc else None
+    # Postings that already exist under the same sort key (and, for text
+    # terms, with the same tf/dl) are left alone
+    same_key = old_sort_key == new_sort_key
+    kept = old_terms & set(new_terms) if same_key else set()
+    unchanged = kept if same_key and old_doc.get("fp") == (new_doc or {}).get("fp") else kept - _text_terms(kept)
+
+    removed = [t for t in old_terms if t not in kept]  # kept ones are overwritten in place
+    added = [t for t in new_terms if t not in unchanged]
+    with search_table.batch_writer() as batch:
+        for term in removed:
+            batch.delete_item(Key={"term": term, "sortKey": old_sort_key})
+        for term in added:
+            posting = {"term": term, "sortKey": new_sort_key, "articleId": article_id}
+            if term in tf:
+                posting["tf"] = tf[term]
+                posting["dl"] = dl
+            batch.put_item(Item=posting)
+    return len(added), len(removed)
+
+
+def _lock_doc(article_id, owner):
+    """
+    Take the article's doc lock and return the doc item it guards (None if
+    the article is not indexed). Waits with exponential backoff while
+    another writer holds it; raises DocLocked after MAX_LOCK_TRIES.
+    """
+    conditional_failed = search_table.meta.client.exceptions.ConditionalCheckFailedException
+    for attempt in range(MAX_LOCK_TRIES):
+        now = int(time.time())
+        try:
+            response = search_table.update_item(
+                Key=_doc_key(article_id),
+                UpdateExpression="SET lockOwner = :owner, lockUntil = :until",
+                ConditionExpression="attribute_not_exists(lockUntil) OR lockUntil < :now",
+                ExpressionAttributeValues={":owner": owner, ":until": now + SEARCH_LOCK_SECONDS, ":now": now},
+                ReturnValues="ALL_OLD",
+            )
+        except conditional_failed:
+            if attempt < MAX_LOCK_TRIES - 1:
+                time.sleep(LOCK_BACKOFF_SECONDS * 2 ** attempt)
+            continue
+        old = response.get("Attributes") or {}
+        if "lockUntil" in old:
+            print(f"⚠️ Took over the expired search index lock of {article_id}: a writer stopped mid-sync, "
+                  f"its counter updates may be applied twice (backfill search_index to recount)")
+        return old if "terms" in old else None
+    raise DocLocked(f"search index doc of {article_id} still locked after {MAX_LOCK_TRIES} tries")
+
+
+def _commit_doc(article_id, owner, old_doc, new_doc):
+    """Replace the doc item with new_doc's (None: delete it), releasing the lock"""
+    condition = "lockOwner = :owner"
+    if new_doc:
+        search_table.put_item(
+            Item={
+                **_doc_key(article_id),
+                "terms": list(new_doc["terms"]),
+                "suggestions": list(new_doc["suggestions"]),
+                "vocabulary": list(new_doc["vocabulary"]),
+                "docSortKey": new_doc["sortKey"],
+                "dl": new_doc["dl"],
+                "fp": new_doc["fp"],
+                "docVersion": int((old_doc or {}).get("docVersion", 0)) + 1,
+            },
+            ConditionExpression=condition,
+            ExpressionAttributeValues={":owner": owner},
+        )
+    else:
+        search_table.delete_item(
+            Key=_doc_key(article_id),
+            ConditionExpression=condition,
+            ExpressionAttributeValues={":owner": owner},
+        )
+
+
+def _unlock_doc(article_id, owner, old_doc):
+    """Release the lock without changing the doc (the lock-only item of an unindexed article goes)"""
+    try:
+        if old_doc:
+            search_table.update_item(
+                Key=_doc_key(article_id),
+                UpdateExpression="REMOVE lockOwner, lockUntil",
+                ConditionExpression="lockOwner = :owner",
+                ExpressionAttributeValues={":owner": owner},
+            )
+        else:
+            search_table.delete_item(
+                Key=_doc_key(article_id),
+                ConditionExpression="lockOwner = :owner",
+                ExpressionAttributeValues={":owner": owner},
+            )
+    except Exception as e:
+        print(f"⚠️ Failed to release the search index lock of {article_id}: {e}")
+
+
+def _sync(article_id, new_doc):
+    """
+    Move the article's index from the stored doc to new_doc (None: unindex)
+    under its doc lock, so concurrent writers of the same article apply
+    their diffs one after the other, each from the doc the previous one
+    committed.
+    """
+    owner = uuid.uuid4().hex
+    old_doc = _lock_doc(article_id, owner)
+    try:
+        if not old_doc and not new_doc:
+            _unlock_doc(article_id, owner, old_doc)
+            return 0, 0
+        counts = _write_postings(old_doc, new_doc, article_id)
+        _write_counters(old_doc, new_doc)
+        _write_stats(old_doc, new_doc["dl"] if new_doc else None, article_id)
+        _commit_doc(article_id, owner, old_doc, new_doc)
+    except search_table.meta.client.exceptions.ConditionalCheckFailedException:
+        # Only _commit_doc is conditional here: held longer than SEARCH_LOCK_SECONDS
+        print(f"⚠️ Lost the search index lock of {article_id} before committing: backfill search_index to recount")
+        raise
+    except Exception:
+        _unlock_doc(article_id, owner, old_doc)
+        raise
+    if new_doc is None:
+        bump_search_generation()
+    return counts
+
+
+def bump_search_generation():
+    """
+    Invalidate every cached search result (search_cache.py): called when an
+    article leaves the index (rejected, made private, deleted), so a cached
+    page never keeps showing it. New and edited articles are not worth a
+    flush of every cache: they show up when the entries expire
+    (SEARCH_CACHE_TTL). Never raises.
+    """
+    if not search_table:
+        return
+    try:
+        search_table.update_item(
+            Key=GENERATION_KEY,
+            UpdateExpression="ADD generation :one",
+            ExpressionAttributeValues={":one": 1},
+        )
+    except Exception as e:
+        print(f"⚠️ Failed to bump search generation: {e}")
+
+
+def _is_stored(article_id):
+    """Whether the article has a doc item (cheap check before locking an unindexed article)"""
+    response = search_table.get_item(Key=_doc_key(article_id), ConsistentRead=True, ProjectionExpression="sortKey")
+    return "Item" in response
+
+
+def index_article(item, is_new=False):
+    """
+    Index or unindex an article so its postings match its current state.
+    is_new skips looking for the doc item of an article that isn't indexed.
+    Returns (postings added, postings removed); raises on failure
+    (DocLocked: another writer held the article's doc all along).
+    """
+    article_id = item["articleId"]
+    new_terms = article_terms(item) if _is_indexed(item) else []
+    new_doc = None
+    if new_terms:
+        tf, dl = document_stats(item, new_terms)
+        new_doc = {
+            "terms": new_terms, "sortKey": _sort_key(item),
+            "suggestions": article_suggestions(item), "vocabulary": article_vocabulary(item),
+            "tf": tf, "dl": dl, "fp": _fingerprint(tf, dl),
+        }
+    elif is_new or not _is_stored(article_id):
+        return 0, 0
+    return _sync(article_id, new_doc)
+
+
+def unindex_article(article_id):
+    """Drop every posting of a deleted article; returns the number removed, raises on failure"""
+    if not _is_stored(article_id):
+        return 0
+    return _sync(article_id, None)[1]
+
+
+def sync_search_index(item, is_new=False):
+    """index_article() right away (backfill, queue fallback); never raises"""
+    if not search_table or not item or not item.get("articleId"):
+        return 0, 0
+    try:
+        return index_article(item, is_new)
+    except Exception as e:
+        print(f"⚠️ Failed to sync search index for {item.get('articleId')}: {e}")
+        return 0, 0
+
+
+def remove_from_search_index(article_id):
+    """unindex_article() right away (queue fallback); never raises"""
+    if not search_table or not article_id:
+        return 0
+    try:
+        return unindex_article(article_id)
+    except Exception as e:
+        print(f"⚠️ Failed to remove {article_id} from search index: {e}")
+        return 0
+
+
+def _queue_sync(article_id):
+    """Hand the article to the search worker (search_worker.py); True when queued"""
+    if not SEARCH_INDEX_QUEUE_URL:
+        return False
+    try:
+        sqs_client.send_message(QueueUrl=SEARCH_INDEX_QUEUE_URL, MessageBody=json.dumps({"articleId": article_id}))
+        return True
+    except Exception as e:
+        print(f"⚠️ Failed to queue search sync for {article_id}, syncing it now: {e}")
+        return False
+
+
+def queue_search_sync(item, is_new=False):
+    """
+    Have the search worker bring the article's postings in line with its
+    state instead of indexing on the request path; without a queue, or when
+    the send fails, syncs right away (sync_search_index). Never raises.
+    """
+    if not search_table or not item or not item.get("articleId"):
+        return False
+    if _queue_sync(item["articleId"]):
+        return True
+    sync_search_index(item, is_new)
+    return False
+
+
+def queue_search_removal(article_id):
+    """queue_search_sync() for a deleted article (the worker finds it gone); never raises"""
+    if not search_table or not article_id:
+        return False
+    if _queue_sync(article_id):
+        return True
+    remove_from_search_index(article_id)
+    return False
+
+
+# ---- Reads: postings intersection ----
+
+class ReadBudgetExceeded(Exception):
+    pass
+
+
+class _PostingReader:
+    """Newest-first postings of one term, with key-range skipping"""
+
+    def __init__(self, term, budget):
+        self.term = term
+        self.budget = budget
+        self.buffer = []  # reversed: pop() = newest
+        self.start_key = None
+        self.more = True
+
+    def fetch(self, bound=None, inclusive=False):
+        """Next batch; with bound, restart at sortKey < bound (<= if inclusive)"""
+        if self.budget["calls"] >= self.budget["limit"]:
+            raise ReadBudgetExceeded()
+        self.budget["calls"] += 1
+        condition = "#term = :term"
+        values = {":term": self.term}
+        if bound is not None:
+            condition += " AND sortKey <= :bound" if inclusive else " AND sortKey < :bound"
+            values[":bound"] = bound
+        query_params = {
+            "KeyConditionExpression": condition,
+            "ExpressionAttributeNames": {"#term": "term"},
+            "ExpressionAttributeValues": values,
+            "ProjectionExpression": "sortKey",
+            "ScanIndexForward": False,
+            "Limit": POSTINGS_BATCH,
+        }
+        if self.start_key and bound is None:
+            query_params["ExclusiveStartKey"] = self.start_key
+        response = search_table.query(**query_params)
+        self.buffer = [item["sortKey"] for item in reversed(response.get("Items", []))]
+        self.start_key = response.get("LastEvaluatedKey")
+        self.more = bool(self.start_key)
+
+    def head(self):
+        if not self.buffer and self.more:
+            self.fetch()
+        return self.buffer[-1] if self.buffer else None
+
+    def advance(self):
+        self.buffer.pop()
+
+    def seek(self, upto):
+        """Skip to the first posting <= upto"""
+        while self.buffer and self.buffer[-1] > upto:
+            self.buffer.pop()
+        if not self.buffer and self.more:
+            self.fetch(upto, inclusive=True)
+
+
+class _UnionReader:
+    """Newest-first merge of several posting lists (tagMode=any), same interface"""
+
+    def __init__(self, readers):
+        self.readers = readers
+
+    def fetch(self, bound=None, inclusive=False):
+        for reader in self.readers:
+            reader.fetch(bound, inclusive)
+
+    def head(self):
+        heads = [h for h in (reader.head() for reader in self.readers) if h is not None]
+        return max(heads) if heads else None
+
+    def advance(self):
+        current = self.head()
+        for reader in self.readers:
+            if reader.head() == current:
+                reader.advance()
+
+    def seek(self, upto):
+        for reader in self.readers:
+            reader.seek(upto)
+
+
+class PostingsIntersection:
+    """
+    Iterate sortKeys present in the postings of every term (and of all tags
+for tag_mode "all", any tag for "any"), newest first.
+
+    Resume position is (bound, inclusive): only postings < bound (<= bound
+    when inclusive) are considered. After iteration stops early (read
+    budget), `frontier` is the position to resume from - every match above
+    it has already been produced.
+    """
+
+    def __init__(self, terms, bound=None, inclusive=False, read_budget=DEFAULT_READ_BUDGET,
+                 tags=(), tag_mode="any"):
+        self.budget = {"calls": 0, "limit": read_budget}
+        self.readers = [_PostingReader(term, self.budget) for term in terms]
+        tag_readers = [_PostingReader(tag_term(tag), self.budget) for tag in tags]
+        if tag_mode == "all" or len(tag_readers) == 1:
+            self.readers.extend(tag_readers)
+        elif tag_readers:
+            self.readers.append(_UnionReader(tag_readers))
+        self.frontier = (bound, inclusive)
+        self.truncated = False
+
+    @property
+    def read_calls(self):
+        return self.budget["calls"]
+
+    def __iter__(self):
+        bound, inclusive = self.frontier
+        try:
+            if bound is not None:
+                for reader in self.readers:
+                    reader.fetch(bound, inclusive)
+            while True:
+                heads = [reader.head() for reader in self.readers]
+                if None in heads:
+                    return
+                candidate = min(heads)
+                # Nothing above the smallest head can be in every list
+                self.frontier = (candidate, True)
+                for reader in self.readers:
+                    reader.seek(candidate)
+                heads = [reader.head() for reader in self.readers]
+                if None in heads:
+                    return
+                if all(head == candidate for head in heads):
+                    for reader in self.readers:
+                        reader.advance()
+                    self.frontier = (candidate, False)
+                    yield candidate
+        except ReadBudgetExceeded:
+            self.truncated = True
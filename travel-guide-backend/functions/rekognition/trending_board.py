@@ -0,0 +1,294 @@
+"""
+Trending leaderboard - the top tags, kept up to date on every increment
+
+GalleryTrendsTable holds one row per tag (tag_name, count, cover_image,
+last_updated). Instead of scanning every row to find the top 20, one extra
+item of the same table keeps the leaderboard:
+
+    tag_name = "#leaderboard"
+    entries  = [{tag_name, count, cover_image, last_updated}, ...]  top BOARD_SIZE, biggest first
+    version  = optimistic-lock counter of entries
+    tagCount = number of tag rows (ADD 1 whenever a row is created)
+    dirty    = set when a merge was given up (see below)
+
+Tag rows are lowercase label names, so the "#" key never collides with one.
+
+update_board() merges the rows just incremented (update_trending_tags,
+ReturnValues=ALL_NEW) into the board: a tag already on it gets its new count;
+any other tag replaces the smallest entry once its count beats it (entries
+only enter at an increment, so the board stays the exact top K). The board
+is read, merged and written back with a condition on version; a concurrent
+writer makes the condition fail and the merge is retried on a fresh read,
+after a jittered exponential backoff so contending writers spread out.
+A photo whose tags can't change the board costs the read only. A merge
+still losing after MAX_BOARD_RETRIES tries is not dropped silently: the
+board is marked dirty (and its version bumped, so a rebuild already
+running doesn't clear the mark), and backfill_gallery_trends
+{"board_only": true}, run on a schedule, rebuilds it from the tag rows -
+whose counts are plain ADDs and never lost.
+
+The trending endpoint is then one GetItem. backfill_gallery_trends rebuilds
+the board and tagCount along with the rows.
+
+Windows: all-time counts let old tags win forever, so every increment is
+also ADDed into time buckets - items of the same table, one per hour (for
+the 24h window) and one per day (7d):
+
+    tag_name = "#h#2026-10-18T09" / "#d#2026-10-18"
+    counts   = {tag: photos in that hour / day}
+    covers   = {tag: latest image}
+    ttl      = end of the last window the bucket can be part of
+
+A window is the sum of its WINDOWS buckets (the current one included), read
+with one BatchGetItem: a sliding window at bucket granularity, bounded by
+the number of buckets, not by the history. DynamoDB TTL deletes the expired
+buckets, so storage stays bounded too.
+Copy of functions/articles/trending_board.py - keep in sync.
+"""
+import os
+import time
+import random
+import boto3
+from datetime import datetime, timedelta, timezone
+
+dynamodb = boto3.resource('dynamodb')
+
+GALLERY_TRENDS_TABLE = os.environ.get('GALLERY_TRENDS_TABLE', '')
+
+trends_table = dynamodb.Table(GALLERY_TRENDS_TABLE) if GALLERY_TRENDS_TABLE else None
+
+LEADERBOARD_KEY = '#leaderboard'
+BOARD_SIZE = int(os.environ.get('TRENDING_BOARD_SIZE', '50'))
+MAX_BOARD_RETRIES = 8
+BOARD_BACKOFF_SECONDS = 0.02  # doubles on every try, full jitter: ~2.5 s at most in total
+
+# window -> (bucket prefix, key format, bucket length, buckets in the window)
+WINDOWS = {
+    '24h': ('#h#', '%Y-%m-%dT%H', timedelta(hours=1), 24),
+    '7d': ('#d#', '%Y-%m-%d', timedelta(days=1), 7),
+}
+ALL_TIME = 'all'
+
+
+def board_entry(row):
+    return {
+        'tag_name': row['tag_name'],
+        'count': row.get('count', 0),
+        'cover_image': row.get('cover_image') or '',
+        'last_updated': row.get('last_updated', ''),
+    }
+
+
+def rank(entries):
+    """Biggest count first; ties by name so the order is stable"""
+    return sorted(entries, key=lambda e: (-e['count'], e['tag_name']))
+
+
+def merge_into_board(entries, rows, size=BOARD_SIZE):
+    """
+    New board entries with the rows merged in (replace-min), or None when
+    none of the rows changes the board.
+    """
+    board = {entry['tag_name']: entry for entry in entries}
+    changed = False
+    for row in rows:
+        tag = row['tag_name']
+        if tag in board:
+            if row.get('count', 0) <= board[tag]['count']:
+                continue  # a stale row: a newer increment already got here
+        elif len(board) >= size:
+            smallest = min(board.values(), key=lambda e: (e['count'], e['tag_name']))
+            if row.get('count', 0) <= smallest['count']:
+                continue
+            del board[smallest['tag_name']]
+        board[tag] = board_entry(row)
+        changed = True
+    return rank(board.values()) if changed else None
+
+
+def read_board(consistent=False):
+    """The leaderboard item, or None before the first increment / backfill"""
+    response = trends_table.get_item(Key={'tag_name': LEADERBOARD_KEY}, ConsistentRead=consistent)
+    return response.get('Item')
+
+
+def mark_board_dirty():
+    """Flag the leaderboard for a rebuild from the tag rows; never raises"""
+    try:
+        trends_table.update_item(
+            Key={'tag_name': LEADERBOARD_KEY},
+            UpdateExpression='SET dirty = :true ADD #version :one',
+            ExpressionAttributeNames={'#version': 'version'},
+            ExpressionAttributeValues={':true': True, ':one': 1},
+        )
+    except Exception as e:
+        print(f"⚠️ Failed to mark trending leaderboard dirty: {e}")
+
+
+def update_board(rows, new_tags=0):
+    """
+    Merge incremented tag rows into the leaderboard; new_tags: how many of
+    them were created by this increment (tagCount). Returns True on
+    success; never raises (a merge given up marks the board dirty).
+    """
+    if not trends_table or not rows:
+        return False
+    conditional_failed = trends_table.meta.client.exceptions.ConditionalCheckFailedException
+    try:
+        if new_tags:
+            # tagCount is never part of the version check: a plain ADD
+            trends_table.update_item(
+                Key={'tag_name': LEADERBOARD_KEY},
+                UpdateExpression='ADD tagCount :n',
+                ExpressionAttributeValues={':n': new_tags},
+            )
+        for attempt in range(MAX_BOARD_RETRIES):
+            if attempt:
+                time.sleep(random.uniform(0, BOARD_BACKOFF_SECONDS * 2 ** attempt))
+            board = read_board(consistent=True) or {}
+            entries = merge_into_board(board.get('entries', []), rows)
+            if entries is None:
+                return True
+            version = int(board.get('version', 0))
+            try:
+                trends_table.update_item(
+                    Key={'tag_name': LEADERBOARD_KEY},
+                    UpdateExpression='SET entries = :entries, #version = :next',
+                    ConditionExpression='attribute_not_exists(#version) OR #version = :version',
+                    ExpressionAttributeNames={'#version': 'version'},
+                    ExpressionAttributeValues={':entries': entries, ':next': version + 1, ':version': version},
+                )
+                return True
+            except conditional_failed:
+                continue  # another writer got in first: merge again on its board
+        print(f"⚠️ Trending leaderboard still contended after {MAX_BOARD_RETRIES} tries: marked dirty")
+    except Exception as e:
+        print(f"⚠️ Failed to update trending leaderboard, marking it dirty: {e}")
+    mark_board_dirty()
+    return False
+
+
+def write_board(rows, tag_count=None, version=None):
+    """
+    Replace the leaderboard entries with the top of rows (full rebuild) and
+    clear dirty; tag_count: new tagCount (None: keep). With version, only
+    if the board is still at that version (raises ConditionalCheckFailed).
+    """
+    update_params = {
+        'Key': {'tag_name': LEADERBOARD_KEY},
+        # ADD, not a fixed version: a merge that read the old board must fail
+        'UpdateExpression': 'SET entries = :entries REMOVE dirty ADD #version :one',
+        'ExpressionAttributeNames': {'#version': 'version'},
+        'ExpressionAttributeValues': {':entries': rank(board_entry(row) for row in rows)[:BOARD_SIZE], ':one': 1},
+    }
+    if tag_count is not None:
+        update_params['UpdateExpression'] = 'SET entries = :entries, tagCount = :count REMOVE dirty ADD #version :one'
+        update_params['ExpressionAttributeValues'][':count'] = tag_count
+    if version is not None:
+        update_params['ConditionExpression'] = '#version = :version'
+        update_params['ExpressionAttributeValues'][':version'] = version
+    trends_table.update_item(**update_params)
+
+
+# ---- Time buckets ----
+
+def bucket_start(window, at):
+    """Start of the window's bucket holding `at` (aware UTC datetime)"""
+    _, _, length, _ = WINDOWS[window]
+    at = at.astimezone(timezone.utc)
+    if length >= timedelta(days=1):
+        return at.replace(hour=0, minute=0, second=0, microsecond=0)
+    return at.replace(minute=0, second=0, microsecond=0)
+
+
+def bucket_key(window, at):
+    prefix, key_format, _, _ = WINDOWS[window]
+    return f"{prefix}{bucket_start(window, at).strftime(key_format)}"
+
+
+def bucket_ttl(window, at):
+    """Epoch seconds once the bucket has left its window (TTL deletes it some time later)"""
+    _, _, length, size = WINDOWS[window]
+    return int((bucket_start(window, at) + length * (size + 1)).timestamp())
+
+
+def window_keys(window, now=None):
+    """Bucket keys of a window, newest (current, partial) bucket first"""
+    _, _, length, size = WINDOWS[window]
+    now = now or datetime.now(timezone.utc)
+    return [bucket_key(window, now - length * i) for i in range(size)]
+
+
+def _add_to_bucket(window, tags, image_url, now):
+    key = {'tag_name': bucket_key(window, now)}
+    names = {f'#t{i}': tag for i, tag in enumerate(tags)}
+    add = ', '.join(f'counts.#t{i} :one' for i in range(len(tags)))
+    covers = ', '.join(f'covers.#t{i} = :img' for i in range(len(tags)))
+    try:
+        # Nested paths need the maps to exist: true for every write but the bucket's first
+        trends_table.update_item(
+            Key=key,
+            UpdateExpression=f'ADD {add} SET {covers}, last_updated = :ts',
+            ConditionExpression='attribute_exists(counts)',
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues={':one': 1, ':img': image_url, ':ts': now.isoformat()},
+        )
+    except trends_table.meta.client.exceptions.ConditionalCheckFailedException:
+        trends_table.update_item(
+            Key=key,
+            UpdateExpression='SET counts = if_not_exists(counts, :empty), covers = if_not_exists(covers, :empty), #ttl = :ttl',
+            ExpressionAttributeNames={'#ttl': 'ttl'},
+            ExpressionAttributeValues={':empty': {}, ':ttl': bucket_ttl(window, now)},
+        )
+        _add_to_bucket(window, tags, image_url, now)
+
+
+def record_in_buckets(tags, image_url, now=None):
+    """
+    Count one photo's tags into the current bucket of every window (one
+    UpdateItem each). Returns True on success; never raises.
+    """
+    tags = list(dict.fromkeys(tag.lower() for tag in tags))
+    if not trends_table or not tags:
+        return False
+    now = now or datetime.now(timezone.utc)
+    try:
+        for window in WINDOWS:
+            _add_to_bucket(window, tags, image_url, now)
+        return True
+    except Exception as e:
+        print(f"⚠️ Failed to record trending buckets: {e}")
+        return False
+
+
+def merge_buckets(buckets):
+    """
+    Window entries (biggest first) from its bucket items: counts summed,
+    cover / last_updated from the newest bucket holding the tag.
+    """
+    totals = {}
+    for bucket in sorted(buckets, key=lambda b: b['tag_name'], reverse=True):
+        for tag, count in (bucket.get('counts') or {}).items():
+            entry = totals.get(tag)
+            if entry is None:
+                entry = totals[tag] = {
+                    'tag_name': tag,
+                    'count': 0,
+                    'cover_image': (bucket.get('covers') or {}).get(tag, ''),
+                    'last_updated': bucket.get('last_updated', ''),
+                }
+            entry['count'] += count
+    return rank(totals.values())
+
+
+def write_buckets(buckets):
+    """Replace bucket items (full rebuild): {(window, bucket start): {'counts', 'covers', 'last_updated'}}"""
+    with trends_table.batch_writer() as batch:
+        for (window, start), bucket in buckets.items():
+            batch.put_item(Item={
+                'tag_name': bucket_key(window, start),
+                'counts': bucket['counts'],
+                'covers': bucket['covers'],
+                'last_updated': bucket['last_updated'],
+                'ttl': bucket_ttl(window, start),
+            })
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark: CPU time vs bytes saved khi nén response JSON
+
+Sử dụng:
+    python bench_compression.py [--items 20] [--repeat 50] [--mbps 5]
+
+Sinh một trang feed giả lập (content dài, contentLower, labelDetails,
+imageMetadata, presigned URLs...) rồi đo cho từng codec/level:
+  - kích thước sau nén, tỉ lệ nén
+  - thời gian nén (ms, trung bình) trên Lambda-like CPU hiện tại
+  - thời gian truyền ước tính ở băng thông --mbps
+Cuối cùng đo theo kích thước body để chọn COMPRESSION_MIN_BYTES.
+
+brotli chỉ được đo nếu đã cài package `brotli`.
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'functions', 'articles'))
+from compression import brotli  # None if the optional package is missing
+
+WORDS = (
+    "biển núi hồ phố cổ hội an đà lạt sapa hạ long cà phê bánh mì phở "
+    "sunset beach mountain lake old town street food coffee market temple "
+    "trải nghiệm tuyệt vời view đẹp giá rẻ nên đi vào mùa thu"
+).split()
+
+
+def synthetic_article(rng, i):
+    content = " ".join(rng.choice(WORDS) for _ in range(rng.randint(80, 250)))
+    title = " ".join(rng.choice(WORDS) for _ in range(6)).title()
+    labels = [
+        {"name": rng.choice(WORDS).title(), "confidence": round(rng.uniform(70, 99), 2),
+         "parents": [rng.choice(WORDS).title()], "instances": rng.randint(0, 3)}
+        for _ in range(rng.randint(5, 15))
+    ]
+    return {
+        "articleId": f"{rng.getrandbits(128):032x}",
+        "ownerId": f"{rng.getrandbits(128):032x}",
+        "username": f"user{i}",
+        "title": title,
+        "titleLower": title.lower(),
+        "content": content,
+        "contentLower": content.lower(),
+        "locationName": "Hội An, Quảng Nam",
+        "locationNameLower": "hội an, quảng nam",
+        "lat": round(rng.uniform(8, 23), 6),
+        "lng": round(rng.uniform(102, 109), 6),
+        "createdAt": f"2025-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}T0{rng.randint(0, 9)}:00:00+00:00",
+        "visibility": "public",
+        "status": "approved",
+        "tags": [rng.choice(WORDS) for _ in range(3)],
+        "autoTags": [l["name"].lower() for l in labels[:5]],
+        "labelDetails": labels,
+        "imageKeys": [f"articles/{rng.getrandbits(64):016x}.jpg" for _ in range(rng.randint(1, 4))],
+        "imageMetadata": {"width": 4032, "height": 3024, "format": "JPEG", "exif": {"Make": "Apple", "Model": "iPhone 13"}},
+        "favoriteCount": rng.randint(0, 500),
+        "ownerAvatarUrl": f"https://bucket.s3.amazonaws.com/avatars/{i}.jpg?X-Amz-Signature={rng.getrandbits(256):064x}",
+    }
+
+
+def timed(fn, data, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        out = fn(data)
+    return out, (time.perf_counter() - start) / repeat * 1000
+
+
+def codecs():
+    yield "gzip-1", lambda d: gzip.compress(d, 1)
+    yield "gzip-6", lambda d: gzip.compress(d, 6)
+    yield "gzip-9", lambda d: gzip.compress(d, 9)
+    if brotli:
+        for q in (1, 4, 6, 11):
+            yield f"br-{q}", (lambda q: lambda d: brotli.compress(d, quality=q))(q)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--mbps", type=float, default=5.0)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    page = {"items": [synthetic_article(rng, i) for i in range(args.items)], "nextToken": "x" * 40}
+    data = json.dumps(page, ensure_ascii=False).encode("utf-8")
+    bytes_per_ms = args.mbps * 1_000_000 / 8 / 1000
+
+    print("=" * 72)
+    print(f"FEED PAGE: {args.items} items, {len(data):,} bytes, link {args.mbps} Mbps")
+    print("=" * 72)
+    print(f"{'codec':<8} {'bytes':>10} {'ratio':>7} {'cpu ms':>8} {'xfer ms':>8} {'total ms':>9}")
+    base_xfer = len(data) / bytes_per_ms
+    print(f"{'none':<8} {len(data):>10,} {1.0:>7.2f} {0.0:>8.2f} {base_xfer:>8.1f} {base_xfer:>9.1f}")
+    for name, fn in codecs():
+        out, ms = timed(fn, data, args.repeat)
+        xfer = len(out) / bytes_per_ms
+        print(f"{name:<8} {len(out):>10,} {len(data) / len(out):>7.2f} {ms:>8.2f} {xfer:>8.1f} {ms + xfer:>9.1f}")
+    if not brotli:
+        print("(brotli not installed - br rows skipped)")
+
+    print()
+    print("=" * 72)
+    print("BODY SIZE vs gzip-6 (threshold COMPRESSION_MIN_BYTES)")
+    print("=" * 72)
+    print(f"{'bytes':>8} {'gzip':>8} {'saved':>8} {'cpu ms':>8} {'saved ms @link':>15}")
+    for size in (128, 256, 512, 1024, 2048, 4096, 16384, 65536):
+        chunk = data[:size]
+        out, ms = timed(lambda d: gzip.compress(d, 6), chunk, args.repeat * 4)
+        saved = size - len(out)
+        print(f"{size:>8,} {len(out):>8,} {saved:>8,} {ms:>8.3f} {saved / bytes_per_ms:>15.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: serialize một trang feed 20 bài (item DynamoDB có Decimal)
+
+Sử dụng:
+    python bench_json_encoder.py [--items 20] [--repeat 500]
+
+So sánh:
+  - old:    _convert_decimal() copy đệ quy + json.dumps (cách cũ của các handler)
+  - stdlib: json_encoder.dumps với json (Decimal/set chuyển trong lúc encode)
+  - orjson: json_encoder.dumps với orjson (nếu đã cài)
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from decimal import Decimal
+
+HERE = os.path.dirname(__file__)
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.join(HERE, '..', 'functions', 'articles'))
+
+import json_encoder
+from bench_compression import synthetic_article
+
+
+def to_dynamo(obj):
+    """Numbers as boto3 returns them (Decimal), tags as a string set"""
+    if isinstance(obj, bool):
+        return obj
+    if isinstance(obj, (int, float)):
+        return Decimal(str(obj))
+    if isinstance(obj, dict):
+        return {k: to_dynamo(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [to_dynamo(v) for v in obj]
+    return obj
+
+
+def _convert_decimal(obj):
+    """The per-handler helper this benchmark replaces"""
+    if isinstance(obj, Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+    elif isinstance(obj, dict):
+        return {k: _convert_decimal(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [_convert_decimal(item) for item in obj]
+    return obj
+
+
+def old_path(page):
+    items = [_convert_decimal(item) for item in page["items"]]
+    return json.dumps({"items": items, "nextToken": page["nextToken"]}, ensure_ascii=False)
+
+
+def stdlib_path(page):
+    return json.dumps(page, ensure_ascii=False, default=json_encoder.to_native)
+
+
+def orjson_path(page):
+    return json_encoder.orjson.dumps(
+        page, default=json_encoder.to_native, option=json_encoder.orjson.OPT_NON_STR_KEYS
+    ).decode("utf-8")
+
+
+def bench(fn, page, repeat):
+    fn(page)  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(page)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    items = []
+    for i in range(args.items):
+        item = to_dynamo(synthetic_article(rng, i))
+        item["tags"] = set(item["tags"])  # SS attribute
+        items.append(item)
+    page = {"items": items, "nextToken": "x" * 40}
+
+    # old path can't encode sets: give it the list version it used to get
+    listed = {**page, "items": [{**it, "tags": sorted(it["tags"])} for it in items]}
+    assert json.loads(old_path(listed)) == json.loads(stdlib_path(listed)), "outputs differ"
+
+    paths = [("old", old_path), ("stdlib", stdlib_path)]
+    if json_encoder.orjson:
+        paths.append(("orjson", orjson_path))
+
+    print("=" * 60)
+    print(f"FEED PAGE: {args.items} items, {len(stdlib_path(page)):,} bytes, {args.repeat} runs")
+    print("=" * 60)
+    baseline = None
+    for name, fn in paths:
+        ms = bench(fn, listed if name == "old" else page, args.repeat)
+        baseline = baseline or ms
+        print(f"{name:<8} {ms:>8.3f} ms/request   {baseline / ms:>5.2f}x   saves {baseline - ms:>6.3f} ms")
+    if not json_encoder.orjson:
+        print("(orjson not installed - fast path skipped)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
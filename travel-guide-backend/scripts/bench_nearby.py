@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Benchmark: tìm bài gần nhất (GET /nearby) - vòng geohash so với brute force
+
+Sử dụng:
+    python bench_nearby.py [--articles 100000] [--queries 200] [--k 20] [--radius 10]
+
+(brute force ~0.2 s mỗi query với 100k bài: 200 queries mất gần một phút)
+
+Bộ dữ liệu tổng hợp: 70% bài tập trung quanh các thành phố du lịch (phân
+phối chuẩn, ~5-15 km), 30% rải đều trên lãnh thổ Việt Nam. gsi_geo_cell
+được mô phỏng trong bộ nhớ (geoCell -> danh sách sắp theo geohash, mỗi
+Query trả tối đa 200 item), chạy đúng thuật toán geo.nearest_in_rings mà
+Lambda dùng.
+
+So sánh với brute force (Scan + haversine cho mọi bài):
+  - kết quả giống hệt nhau (cùng bài, cùng thứ tự)
+  - số item đọc và số Query mỗi request
+  - thời gian CPU mỗi request (không tính độ trễ mạng)
+"""
+
+import os
+import sys
+import time
+import random
+import bisect
+import argparse
+
+HERE = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(HERE, '..', 'functions', 'articles'))
+
+from geo import encode, haversine_km, nearest_in_rings, GEO_CELL_PRECISION
+
+CITIES = [
+    ("Hà Nội", 21.0285, 105.8542), ("TP.HCM", 10.7769, 106.7009),
+    ("Đà Nẵng", 16.0544, 108.2022), ("Hội An", 15.8801, 108.3380),
+    ("Huế", 16.4637, 107.5909), ("Nha Trang", 12.2388, 109.1967),
+    ("Đà Lạt", 11.9404, 108.4583), ("Sa Pa", 22.3364, 103.8438),
+    ("Hạ Long", 20.9517, 107.0800), ("Phú Quốc", 10.2899, 103.9840),
+]
+QUERY_LIMIT = 200  # items per simulated Query page
+CELL_ITEM_CAP = 500  # geo_index.MAX_NEARBY_CELL_ITEMS
+
+
+def synthetic_points(n, rng):
+    points = []
+    for i in range(n):
+        if rng.random() < 0.7:
+            _, lat, lng = rng.choice(CITIES)
+            spread = rng.choice([0.05, 0.1, 0.15])
+            lat, lng = rng.gauss(lat, spread), rng.gauss(lng, spread)
+        else:
+            lat, lng = rng.uniform(8.5, 23.3), rng.uniform(102.2, 109.4)
+        lat, lng = round(lat, 6), round(lng, 6)
+        points.append({"articleId": f"a{i:06d}", "lat": lat, "lng": lng, "geohash": encode(lat, lng)})
+    return points
+
+
+class MemoryGeoIndex:
+    """gsi_geo_cell stand-in: geoCell partitions sorted by geohash"""
+
+    def __init__(self, points):
+        self.partitions = {}
+        for point in sorted(points, key=lambda p: (p["geohash"], p["articleId"])):
+            self.partitions.setdefault(point["geohash"][:GEO_CELL_PRECISION], []).append(point)
+        self.keys = {cell: [p["geohash"] for p in items] for cell, items in self.partitions.items()}
+
+    def query_cell(self, cell):
+        items = self.partitions.get(cell[:GEO_CELL_PRECISION], [])
+        keys = self.keys.get(cell[:GEO_CELL_PRECISION], [])
+        start = bisect.bisect_left(keys, cell)
+        end = bisect.bisect_left(keys, cell + "~")  # "~" sorts after every base-32 char
+        found = items[start:min(end, start + CELL_ITEM_CAP + 1)]
+        truncated = len(found) > CELL_ITEM_CAP
+        found = found[:CELL_ITEM_CAP] if truncated else found
+        return found, max(1, -(-len(found) // QUERY_LIMIT)), truncated
+
+    def read_cells(self, cells):
+        return [self.query_cell(cell) for cell in cells]
+
+
+def brute_force(points, lat, lng, radius_km, k):
+    ranked = []
+    for point in points:
+        distance = haversine_km(lat, lng, point["lat"], point["lng"])
+        if distance <= radius_km:
+            ranked.append((distance, point["articleId"]))
+    ranked.sort()
+    return [article_id for _, article_id in ranked[:k]]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--radius", type=float, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    start = time.perf_counter()
+    points = synthetic_points(args.articles, rng)
+    index = MemoryGeoIndex(points)
+    print(f"Built {args.articles:,} articles / {len(index.partitions)} partitions "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    queries = []
+    for _ in range(args.queries):
+        if rng.random() < 0.7:
+            _, lat, lng = rng.choice(CITIES)
+            queries.append((rng.gauss(lat, 0.1), rng.gauss(lng, 0.1)))
+        else:
+            queries.append((rng.uniform(8.5, 23.3), rng.uniform(102.2, 109.4)))
+
+    ring_ms, scanned, reads, cells, truncated = [], [], [], [], 0
+    results = []
+    for lat, lng in queries:
+        t0 = time.perf_counter()
+        result = nearest_in_rings(lat, lng, args.radius, args.k, index.read_cells)
+        ring_ms.append((time.perf_counter() - t0) * 1000)
+        scanned.append(result["scannedCount"])
+        reads.append(result["readCalls"])
+        cells.append(result["cellsRead"])
+        truncated += result["truncated"]
+        results.append(result)
+
+    brute_ms, mismatches = [], 0
+    for (lat, lng), result in zip(queries, results):
+        t0 = time.perf_counter()
+        expected = brute_force(points, lat, lng, args.radius, args.k)
+        brute_ms.append((time.perf_counter() - t0) * 1000)
+        if not result["truncated"]:
+            mismatches += [item["articleId"] for item in result["items"]] != expected
+
+    def avg(values):
+        return sum(values) / len(values) if values else 0
+
+    print("=" * 60)
+    print(f"NEARBY: k={args.k}, radius={args.radius} km, {args.queries} queries")
+    print("=" * 60)
+    print(f"{'':<24} {'rings':>12} {'brute force':>14}")
+    print(f"{'items read / request':<24} {avg(scanned):>12,.0f} {args.articles:>14,}")
+    print(f"{'Query calls / request':<24} {avg(reads):>12.1f} {'(full Scan)':>14}")
+    print(f"{'cells / request':<24} {avg(cells):>12.1f} {'-':>14}")
+    print(f"{'CPU ms / request':<24} {avg(ring_ms):>12.3f} {avg(brute_ms):>14.3f}")
+    print(f"\nSpeed-up: {avg(brute_ms) / avg(ring_ms):.0f}x, items read: "
+          f"{args.articles / max(avg(scanned), 1):.0f}x fewer")
+    print(f"Truncated: {truncated}, mismatches vs brute force: {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
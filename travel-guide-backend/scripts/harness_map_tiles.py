@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Harness: tile map tĩnh (map_tiles.py) chạy local với S3 giả lập
+
+Sử dụng:
+    python harness_map_tiles.py [--articles 5000] [--events 2000] [--batch 100] [--gsi-lag]
+
+Không gọi AWS: boto3 chỉ cần được cài (pip install boto3). S3 và
+gsi_geo_cell được thay bằng bản trong bộ nhớ:
+  - MemoryS3: put_object / get_object / list_objects_v2 (phân trang 1000 key)
+  - MemoryCloudFront: create_invalidation (đếm số lần gọi và số path)
+  - MemoryGeoIndex: GSI thưa (chỉ bài approved + public), Query theo
+    geoCell + begins_with(geohash), trả tối đa Limit item mỗi trang
+
+Kịch bản:
+  1. build toàn bộ tile từ dữ liệu tổng hợp (như backfill target "map_tiles")
+  2. chạy --events sự kiện ngẫu nhiên: duyệt / từ chối, đổi visibility, dời
+     vị trí, đổi ảnh, xoá - clusterPoint cũ / mới của mỗi sự kiện được gom
+     theo lô --batch như map_worker nhận từ MapUpdatesQueue, mỗi lô gọi
+     refresh_tiles() một lần
+  3. so mọi tile trong S3 giả lập với brute force (tính lại từ đầu)
+
+--gsi-lag: GSI chỉ thấy thay đổi của một lô SAU khi refresh_tiles chạy
+(eventual consistency); tile vẫn phải đúng nhờ các bài của lô được áp lên trên.
+
+Kết quả: số tile ghi mỗi lô (mỗi tile tối đa một lần), số invalidation
+mỗi lô (tối đa một), số Query, kích
+thước tile, và số tile sai so với brute force (phải là 0).
+"""
+
+import os
+import sys
+import json
+import random
+import bisect
+import argparse
+from decimal import Decimal
+
+HERE = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(HERE, '..', 'functions', 'articles'))
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "ap-southeast-1")
+os.environ["MAP_TILES_BUCKET"] = "local-map-tiles"
+os.environ["MAP_TILES_DISTRIBUTION_ID"] = "LOCALDIST"
+
+import map_tiles  # noqa: E402
+from geo import encode, GEO_CELL_PRECISION  # noqa: E402
+from map_clusters import cluster_point  # noqa: E402
+
+CITIES = [
+    ("Hà Nội", 21.0285, 105.8542), ("TP.HCM", 10.7769, 106.7009),
+    ("Đà Nẵng", 16.0544, 108.2022), ("Hội An", 15.8801, 108.3380),
+    ("Đà Lạt", 11.9404, 108.4583), ("Sa Pa", 22.3364, 103.8438),
+]
+
+
+class MemoryS3:
+    """Bucket trong bộ nhớ: key -> (body bytes, headers)"""
+
+    def __init__(self):
+        self.objects = {}
+        self.puts = 0
+
+    def put_object(self, Bucket, Key, Body, ContentType=None, CacheControl=None):
+        self.objects[(Bucket, Key)] = (Body, {"ContentType": ContentType, "CacheControl": CacheControl})
+        self.puts += 1
+
+    def get_object(self, Bucket, Key):
+        body, headers = self.objects[(Bucket, Key)]
+        return {"Body": body, **headers}
+
+    def list_objects_v2(self, Bucket, Prefix="", ContinuationToken=None):
+        keys = sorted(key for bucket, key in self.objects if bucket == Bucket and key.startswith(Prefix))
+        start = int(ContinuationToken or 0)
+        page = keys[start:start + 1000]
+        response = {"Contents": [{"Key": key} for key in page], "IsTruncated": start + 1000 < len(keys)}
+        if response["IsTruncated"]:
+            response["NextContinuationToken"] = str(start + 1000)
+        return response
+
+
+class MemoryCloudFront:
+    """Distribution giả lập: ghi lại các invalidation"""
+
+    def __init__(self):
+        self.invalidations = []
+
+    def create_invalidation(self, DistributionId, InvalidationBatch):
+        paths = InvalidationBatch["Paths"]
+        assert paths["Quantity"] == len(paths["Items"])
+        self.invalidations.append(paths["Items"])
+
+
+class MemoryGeoIndex:
+    """gsi_geo_cell giả lập: các bài visible, sắp theo (geohash, articleId)"""
+
+    def __init__(self):
+        self.items = {}
+        self.queries = 0
+
+    def put(self, article):
+        self.items[article["articleId"]] = article
+
+    def remove(self, article_id):
+        self.items.pop(article_id, None)
+
+    def query(self, IndexName, KeyConditionExpression, ExpressionAttributeValues, ProjectionExpression,
+              Limit, ExclusiveStartKey=None):
+        self.queries += 1
+        cell, prefix = ExpressionAttributeValues[":cell"], ExpressionAttributeValues[":prefix"]
+        rows = sorted(
+            (item["geohash"], item["articleId"]) for item in self.items.values()
+            if item["geohash"][:GEO_CELL_PRECISION] == cell and item["geohash"].startswith(prefix)
+        )
+        start = bisect.bisect_right(rows, (ExclusiveStartKey["geohash"], ExclusiveStartKey["articleId"])) \
+            if ExclusiveStartKey else 0
+        page = rows[start:start + Limit]
+        response = {"Items": [dict(self.items[article_id]) for _, article_id in page]}
+        if start + Limit < len(rows):
+            response["LastEvaluatedKey"] = {"geohash": page[-1][0], "articleId": page[-1][1]}
+        return response
+
+
+def random_article(i, rng):
+    _, lat, lng = rng.choice(CITIES)
+    lat, lng = round(rng.gauss(lat, 0.08), 6), round(rng.gauss(lng, 0.08), 6)
+    return {
+        "articleId": f"a{i:06d}", "createdAt": f"2026-01-01T00:00:{i:06d}",
+        "visibility": "public" if rng.random() < 0.8 else "private",
+        "status": "approved" if rng.random() < 0.7 else "pending",
+        "lat": Decimal(str(lat)), "lng": Decimal(str(lng)), "geohash": encode(lat, lng),
+        "thumbnailKey": f"thumbnails/a{i:06d}_256.webp",
+    }
+
+
+def visible(article):
+    return article.get("visibility") == "public" and article.get("status") == "approved"
+
+
+def expected_tiles(articles):
+    tiles = {}
+    for article in articles.values():
+        if visible(article):
+            tile = map_tiles.point_tile(article)
+            tiles.setdefault(tile, []).append([
+                article["articleId"], round(float(article["lat"]), 6), round(float(article["lng"]), 6),
+                article["thumbnailKey"],
+            ])
+    return {tile: sorted(points) for tile, points in tiles.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=5000)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--gsi-lag", action="store_true")
+    args = parser.parse_args()
+
+    s3, cloudfront, index = MemoryS3(), MemoryCloudFront(), MemoryGeoIndex()
+    map_tiles.s3, map_tiles.cloudfront, map_tiles._table = s3, cloudfront, lambda: index
+    bucket = map_tiles.MAP_TILES_BUCKET
+
+    rng = random.Random(7)
+    articles = {}
+    for i in range(args.articles):
+        article = random_article(i, rng)
+        articles[article["articleId"]] = article
+        if visible(article):
+            index.put(article)
+
+    # 1. Build toàn bộ
+    tiles = {map_tiles.point_tile(a) for a in articles.values() if visible(a)}
+    map_tiles.rebuild_tiles(tiles)
+    print(f"Initial build: {len(tiles)} tiles, {index.queries} queries")
+
+    # 2. Sự kiện, gom theo lô như map_worker
+    writes, queries, invalidations, moves, pending = [], [], [], [], []
+
+    def flush():
+        if not args.gsi_lag:
+            for apply in pending:
+                apply()
+        puts_before, queries_before, calls_before = s3.puts, index.queries, len(cloudfront.invalidations)
+        # clusterPoint hiện tại của các bài trong lô (map_clusters.current_points)
+        current = {
+            article_id: cluster_point(articles[article_id])
+            if article_id in articles and visible(articles[article_id]) else None
+            for article_id, _, _ in moves
+        }
+        map_tiles.refresh_tiles(moves, current)
+        if args.gsi_lag:
+            for apply in pending:
+                apply()
+        if moves:
+            writes.append(s3.puts - puts_before)
+            queries.append(index.queries - queries_before)
+            invalidations.append(len(cloudfront.invalidations) - calls_before)
+        moves.clear()
+        pending.clear()
+
+    next_id = args.articles
+    for event_number in range(args.events):
+        article_id = rng.choice(list(articles))
+        article = articles[article_id]
+        old_point = cluster_point(article) if visible(article) else None
+        kind = rng.choice(["approve", "reject", "visibility", "move", "image", "delete", "create"])
+        if kind == "create":
+            article = random_article(next_id, rng)
+            article["status"] = "approved"  # moderation vừa duyệt
+            next_id += 1
+            article_id, old_point = article["articleId"], None
+        elif kind == "approve":
+            article["status"] = "approved"
+        elif kind == "reject":
+            article["status"] = "rejected"
+        elif kind == "visibility":
+            article["visibility"] = "private" if article["visibility"] == "public" else "public"
+        elif kind == "move":
+            lat = round(float(article["lat"]) + rng.gauss(0, 0.05), 6)
+            lng = round(float(article["lng"]) + rng.gauss(0, 0.05), 6)
+            article.update(lat=Decimal(str(lat)), lng=Decimal(str(lng)), geohash=encode(lat, lng))
+        elif kind == "image":
+            article["thumbnailKey"] = f"thumbnails/{article_id}_{rng.randrange(10**6)}_256.webp"
+
+        deleted = kind == "delete"
+        new_point = cluster_point(article) if visible(article) and not deleted else None
+
+        def apply_to_index(article_id=article_id, article=article, new_point=new_point):
+            if new_point:
+                index.put(article)
+            else:
+                index.remove(article_id)
+
+        # Bảng bài viết đổi ngay (nguồn sự thật); chỉ GSI trễ
+        if deleted:
+            articles.pop(article_id, None)
+        else:
+            articles[article_id] = article
+        pending.append(apply_to_index)
+        if old_point != new_point:
+            moves.append((article_id, old_point, new_point))
+        if len(moves) >= args.batch or event_number == args.events - 1:
+            flush()
+
+    # 3. So với brute force
+    expected = expected_tiles(articles)
+    written = {
+        tile: json.loads(s3.objects[(bucket, map_tiles.tile_key(*tile))][0])
+        for tile in map_tiles.list_tiles()
+    }
+    wrong = [tile for tile in set(expected) | set(written)
+             if expected.get(tile, []) != (written[tile]["points"] if tile in written else None)]
+    sizes = [len(body) for (b, _), (body, _) in s3.objects.items() if b == bucket]
+
+    def avg(values):
+        return sum(values) / len(values) if values else 0
+
+    print("=" * 60)
+    print(f"MAP TILES: z{map_tiles.TILE_ZOOM}, {args.events} events, batches of {args.batch}"
+          f"{' (GSI lag)' if args.gsi_lag else ''}")
+    print("=" * 60)
+    print(f"Tiles in bucket:            {len(written)}")
+    print(f"Batches:                    {len(writes)}")
+    print(f"Tile writes / batch:        avg {avg(writes):.1f}, max {max(writes, default=0)}")
+    print(f"Invalidations / batch:      max {max(invalidations, default=0)}, "
+          f"avg {avg([len(paths) for paths in cloudfront.invalidations[1:]]):.1f} paths")
+    print(f"GSI queries / batch:        avg {avg(queries):.1f}")
+    print(f"Tile size:                  avg {avg(sizes) / 1024:.1f} KB, max {max(sizes, default=0) / 1024:.1f} KB")
+    print(f"Tiles differing from brute force: {len(wrong)}")
+    return 1 if wrong else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Đo kích thước item và response: fields=full so với fields=card
+
+Sử dụng:
+    python measure_card_projection.py [--items 20] [--repeat 200]
+    python measure_card_projection.py --table <ARTICLES_TABLE> [--sample 200] [--items 20]
+
+Mặc định dùng bộ dữ liệu tổng hợp (giống bench_compression.py, thêm các
+trường moderation/validation/geohash mà item thật có). --table lấy mẫu item
+thật bằng Scan (cần AWS credentials).
+
+In ra:
+  - kích thước item DynamoDB trung bình (công thức tính phí: tên + giá trị)
+  - kích thước body JSON một trang `--items` bài, raw và gzip
+  - thời gian serialize một trang
+
+Lưu ý: Query/Scan/BatchGetItem trên bảng chính vẫn tính RCU theo item đầy
+đủ - ProjectionExpression chỉ giảm dữ liệu truyền về Lambda, deserialize và
+response. RCU chỉ giảm khi đọc từ PublicFeedTable hoặc
+gsi_approved_owner_createdAt (INCLUDE đúng các trường card).
+"""
+
+import os
+import ast
+import sys
+import gzip
+import time
+import random
+import argparse
+from decimal import Decimal
+
+HERE = os.path.dirname(__file__)
+ARTICLES_DIR = os.path.join(HERE, '..', 'functions', 'articles')
+sys.path.insert(0, HERE)
+sys.path.insert(0, ARTICLES_DIR)
+
+from json_encoder import dumps
+from geo import encode as geohash_encode
+from bench_compression import synthetic_article
+
+
+def load_card_fields():
+    """feed_store.FEED_FIELDS (= projections.CARD_FIELDS) without importing boto3"""
+    with open(os.path.join(ARTICLES_DIR, 'feed_store.py'), encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, 'id', None) == 'FEED_FIELDS' for t in node.targets):
+            return ast.literal_eval(node.value)
+    raise RuntimeError("FEED_FIELDS not found in feed_store.py")
+
+
+CARD_FIELDS = load_card_fields()
+
+
+def dynamo_size(value):
+    """Approximate DynamoDB size of an attribute value (bytes)"""
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if isinstance(value, bool) or value is None:
+        return 1
+    if isinstance(value, (int, float, Decimal)):
+        digits = len(str(value).replace("-", "").replace(".", "").lstrip("0")) or 1
+        return (digits + 1) // 2 + 1
+    if isinstance(value, dict):
+        return 3 + sum(len(k.encode("utf-8")) + dynamo_size(v) + 1 for k, v in value.items())
+    if isinstance(value, (list, set, tuple)):
+        return 3 + sum(dynamo_size(v) + 1 for v in value)
+    return len(str(value))
+
+
+def item_size(item):
+    return sum(len(k.encode("utf-8")) + dynamo_size(v) for k, v in item.items())
+
+
+def card_of(item):
+    return {k: item[k] for k in CARD_FIELDS if k in item}
+
+
+def synthetic_items(n, rng):
+    items = []
+    for i in range(n):
+        item = synthetic_article(rng, i)
+        item.pop("ownerAvatarUrl", None)  # added by the enricher, not stored
+        item["geohash"] = geohash_encode(item["lat"], item["lng"])
+        item["gh5"] = item["geohash"][:5]
+        item["thumbnailKey"] = item["imageKeys"][0].replace("articles/", "thumbnails/")
+        item["imageKey"] = item["imageKeys"][0]
+        item["moderationStatus"] = "approved"
+        item["moderatedAt"] = item["createdAt"]
+        item["lastAnalyzed"] = item["createdAt"]
+        item["moderationDetails"] = {
+            "labels": [{"Name": "Safe", "Confidence": Decimal("99.1")}],
+            "checkedImages": list(item["imageKeys"]),
+        }
+        item["validationDetails"] = {
+            "isTravelRelated": True,
+            "confidence": Decimal("87.5"),
+            "matchedLabels": item["autoTags"],
+        }
+        items.append(item)
+    return items
+
+
+def sample_table(table_name, sample):
+    import boto3
+    table = boto3.resource("dynamodb").Table(table_name)
+    items, start_key = [], None
+    while len(items) < sample:
+        params = {"Limit": sample}
+        if start_key:
+            params["ExclusiveStartKey"] = start_key
+        response = table.scan(**params)
+        items.extend(response.get("Items", []))
+        start_key = response.get("LastEvaluatedKey")
+        if not start_key:
+            break
+    return items[:sample]
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--table")
+    parser.add_argument("--sample", type=int, default=200)
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.table:
+        items = sample_table(args.table, args.sample)
+        source = f"{len(items)} items sampled from {args.table}"
+    else:
+        items = synthetic_items(max(args.sample, args.items), random.Random(7))
+        source = f"{len(items)} synthetic items"
+    if not items:
+        print("❌ No items")
+        return 1
+    cards = [card_of(item) for item in items]
+
+    full_avg = sum(map(item_size, items)) / len(items)
+    card_avg = sum(map(item_size, cards)) / len(cards)
+
+    full_page = {"items": items[:args.items], "nextToken": "x" * 40}
+    card_page = {"items": cards[:args.items], "nextToken": "x" * 40}
+    full_body = dumps(full_page).encode("utf-8")
+    card_body = dumps(card_page).encode("utf-8")
+
+    print("=" * 60)
+    print(f"CARD PROJECTION ({source}, page = {args.items} items)")
+    print("=" * 60)
+    print(f"{'':<22} {'full':>10} {'card':>10} {'saved':>7}")
+    rows = [
+        ("item size (avg B)", full_avg, card_avg),
+        ("page body (B)", len(full_body), len(card_body)),
+        ("page body gzip (B)", len(gzip.compress(full_body, 6)), len(gzip.compress(card_body, 6))),
+        ("serialize (ms)", timed(lambda: dumps(full_page), args.repeat),
+         timed(lambda: dumps(card_page), args.repeat)),
+    ]
+    for name, full, card in rows:
+        fmt = "{:>10.3f}" if name.endswith("(ms)") else "{:>10,.0f}"
+        print(f"{name:<22} {fmt.format(full)} {fmt.format(card)} {1 - card / full:>6.0%}")
+    dropped = sorted({k for item in items for k in item} - set(CARD_FIELDS))
+    print(f"\nNot in card: {', '.join(dropped)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
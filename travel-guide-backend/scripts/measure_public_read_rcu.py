@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Đo RCU tiêu thụ mỗi trang: đường đọc cũ (GSI + FilterExpression) so với
+đường đọc mới (sparse index / feed table)
+
+Sử dụng:
+    python measure_public_read_rcu.py <ARTICLES_TABLE> <FEED_TABLE> [OWNER_ID] [--limit 20] [--pages 5]
+    python measure_public_read_rcu.py --simulate [--visible-ratio 0.4] [--full-kb 3.5] [--card-kb 1.0]
+
+Mỗi "trang" đọc tới khi đủ `limit` bài hiển thị được (giống paginator),
+cộng dồn ConsumedCapacity (ReturnConsumedCapacity=TOTAL) của mọi lần gọi.
+
+--simulate không cần AWS: áp dụng công thức tính phí Query của DynamoDB
+(tổng kích thước item đã đọc làm tròn lên 4 KB, eventually consistent = 0.5)
+cho một bộ dữ liệu tổng hợp với tỉ lệ bài approved+public cho trước.
+
+So sánh:
+  - Public feed:   gsi_visibility_createdAt + filter status   vs  PublicFeedTable
+  - Profile page:  gsi_owner_createdAt + filter public/status vs  gsi_approved_owner_createdAt
+"""
+
+import sys
+import math
+import random
+import argparse
+
+STATUS_FILTER = '(#status = :approved OR attribute_not_exists(#status))'
+
+
+def read_pages(table, base_params, limit, pages):
+    """[(items_returned, items_read, read_calls, rcu)] for up to `pages` full pages"""
+    results = []
+    start_key = None
+    for _ in range(pages):
+        returned = read = calls = 0
+        rcu = 0.0
+        while returned < limit:
+            params = dict(base_params, Limit=limit, ReturnConsumedCapacity='TOTAL')
+            if start_key:
+                params['ExclusiveStartKey'] = start_key
+            response = table.query(**params)
+            calls += 1
+            returned += response.get('Count', 0)
+            read += response.get('ScannedCount', 0)
+            rcu += response.get('ConsumedCapacity', {}).get('CapacityUnits', 0)
+            start_key = response.get('LastEvaluatedKey')
+            if not start_key:
+                break
+        results.append((returned, read, calls, rcu))
+        if not start_key:
+            break
+    return results
+
+
+def public_feed_before():
+    return {
+        'IndexName': 'gsi_visibility_createdAt',
+        'KeyConditionExpression': 'visibility = :visibility',
+        'FilterExpression': STATUS_FILTER,
+        'ExpressionAttributeNames': {'#status': 'status'},
+        'ExpressionAttributeValues': {':visibility': 'public', ':approved': 'approved'},
+        'ScanIndexForward': False,
+    }
+
+
+def public_feed_after(feed_key='public'):
+    return {
+        'KeyConditionExpression': 'feedKey = :feed_key',
+        'ExpressionAttributeValues': {':feed_key': feed_key},
+        'ScanIndexForward': False,
+    }
+
+
+def profile_before(owner_id):
+    return {
+        'IndexName': 'gsi_owner_createdAt',
+        'KeyConditionExpression': 'ownerId = :owner_id',
+        'FilterExpression': '#visibility = :visibility AND ' + STATUS_FILTER,
+        'ExpressionAttributeNames': {'#status': 'status', '#visibility': 'visibility'},
+        'ExpressionAttributeValues': {':owner_id': owner_id, ':visibility': 'public', ':approved': 'approved'},
+        'ScanIndexForward': False,
+    }
+
+
+def profile_after(owner_id):
+    return {
+        'IndexName': 'gsi_approved_owner_createdAt',
+        'KeyConditionExpression': 'approvedOwnerId = :owner_id',
+        'ExpressionAttributeValues': {':owner_id': owner_id},
+        'ScanIndexForward': False,
+    }
+
+
+def print_comparison(title, before, after):
+    print("=" * 72)
+    print(title)
+    print("=" * 72)
+    print(f"{'page':>4} | {'before: items/read/calls/RCU':>30} | {'after: items/read/calls/RCU':>30}")
+    for i in range(max(len(before), len(after))):
+        b = before[i] if i < len(before) else None
+        a = after[i] if i < len(after) else None
+        fmt = lambda r: f"{r[0]:>4} / {r[1]:>5} / {r[2]:>2} / {r[3]:>7.1f}" if r else "-"
+        print(f"{i + 1:>4} | {fmt(b):>30} | {fmt(a):>30}")
+
+    total_before = sum(r[3] for r in before)
+    total_after = sum(r[3] for r in after)
+    print("-" * 72)
+    print(f"RCU/page before: {total_before / max(len(before), 1):.2f}")
+    print(f"RCU/page after:  {total_after / max(len(after), 1):.2f}")
+    if total_before:
+        print(f"Saving: {100 * (1 - total_after / total_before):.1f}%")
+    print()
+
+
+def simulate_pages(sizes_kb, visible, limit, pages, filtered):
+    """
+    Same shape as read_pages() over a synthetic, newest-first item list.
+    Like paginator.paginate(), a page stops at the limit-th returned item and
+    the next page resumes right after it; the whole read call is still charged.
+    """
+    results = []
+    pos = 0
+    for _ in range(pages):
+        returned = read = calls = 0
+        rcu = 0.0
+        while returned < limit and pos < len(sizes_kb):
+            chunk = range(pos, min(pos + limit, len(sizes_kb)))
+            calls += 1
+            read += len(chunk)
+            rcu += 0.5 * math.ceil(sum(sizes_kb[i] for i in chunk) / 4)
+            pos = chunk.stop
+            for i in chunk:
+                if visible[i] or not filtered:
+                    returned += 1
+                    if returned == limit:
+                        pos = i + 1
+                        break
+        results.append((returned, read, calls, rcu))
+        if pos >= len(sizes_kb):
+            break
+    return results
+
+
+def run_simulation(args):
+    rng = random.Random(42)
+    n = args.limit * args.pages * 20
+    visible = [rng.random() < args.visible_ratio for _ in range(n)]
+    full = [max(0.2, rng.gauss(args.full_kb, args.full_kb / 4)) for _ in range(n)]
+    card = [max(0.2, rng.gauss(args.card_kb, args.card_kb / 4)) for _ in range(n)]
+
+    # Before: GSI (ProjectionType ALL) pays for every item read, visible or not
+    before = simulate_pages(full, visible, args.limit, args.pages, filtered=True)
+    # After: sparse index / feed table only contains visible items, card projection
+    after = simulate_pages([card[i] for i in range(n) if visible[i]],
+                           [True] * sum(visible), args.limit, args.pages, filtered=False)
+    print_comparison(
+        f"SIMULATED (visible ratio={args.visible_ratio}, full={args.full_kb}KB, card={args.card_kb}KB, limit={args.limit})",
+        before, after
+    )
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('articles_table', nargs='?')
+    parser.add_argument('feed_table', nargs='?')
+    parser.add_argument('owner_id', nargs='?')
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--pages', type=int, default=5)
+    parser.add_argument('--feed-key', default='public',
+                        help="feed partition to read; with FEED_SHARDS > 1 pass one shard, e.g. public#0")
+    parser.add_argument('--simulate', action='store_true')
+    parser.add_argument('--visible-ratio', type=float, default=0.4)
+    parser.add_argument('--full-kb', type=float, default=3.5)
+    parser.add_argument('--card-kb', type=float, default=1.0)
+    args = parser.parse_args()
+
+    if args.simulate:
+        return run_simulation(args)
+    if not args.articles_table or not args.feed_table:
+        parser.error("articles_table and feed_table are required (or use --simulate)")
+
+    import boto3
+    dynamodb = boto3.resource('dynamodb')
+    articles_table = dynamodb.Table(args.articles_table)
+    feed_table = dynamodb.Table(args.feed_table)
+
+    print_comparison(
+        f"PUBLIC FEED (limit={args.limit})",
+        read_pages(articles_table, public_feed_before(), args.limit, args.pages),
+        read_pages(feed_table, public_feed_after(args.feed_key), args.limit, args.pages),
+    )
+
+    if args.owner_id:
+        print_comparison(
+            f"PROFILE PAGE owner={args.owner_id} (limit={args.limit})",
+            read_pages(articles_table, profile_before(args.owner_id), args.limit, args.pages),
+            read_pages(articles_table, profile_after(args.owner_id), args.limit, args.pages),
+        )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -111,9 +111,32 @@ export default function HomePage() {
   const [tagFilter, setTagFilter] = useState(''); // Tag filter state
   const [hoveredLocation, setHoveredLocation] = useState(null); // Track hovered location for tooltip
   const searchInputRef = useRef(null); // Ref for search input
+  const [suggestions, setSuggestions] = useState([]); // Type-ahead suggestions
   const feedContainerRef = useRef(null); // Ref for scrollable feed container
   const mapType = user?.mapTypePref || 'roadmap';
   
+  // Type-ahead: fetch suggestions shortly after the user stops typing
+  useEffect(() => {
+    const q = searchQuery.trim();
+    if (q.length < 2) {
+      setSuggestions([]);
+      return undefined;
+    }
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const response = await api.suggestSearch(q);
+        if (!cancelled) setSuggestions(response?.suggestions || []);
+      } catch (err) {
+        if (!cancelled) setSuggestions([]);
+      }
+    }, 150);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [searchQuery]);
+
   // Hide tooltip on scroll
   useEffect(() => {
     const handleScroll = () => {
@@ -214,6 +237,9 @@ export default function HomePage() {
   // New posts detection state - store the latest createdAt timestamp
   const [latestCreatedAt, setLatestCreatedAt] = useState(null);
 
+  // Backend sửa lỗi chính tả ("phu quok" -> "phu quoc"): nextToken thuộc về query đã sửa
+  const correctedQueryRef = useRef(null);
+
   // Define loadPosts BEFORE any useEffect that uses it
   const loadPosts = useCallback(async (token = null, query = '', tag = '') => {
     try {
@@ -235,12 +261,13 @@ export default function HomePage() {
         // Nếu có search query, dùng searchArticles với q parameter
         console.log('🔍 Searching with query:', query.trim());
         response = await api.searchArticles({
-          q: query.trim(),
+          q: (token && correctedQueryRef.current) || query.trim(),
           scope: scope,
           limit: 50,  // Increased limit for better search results with filters
           nextToken: token
         });
         console.log('📦 Query search response:', response);
+        if (!token) correctedQueryRef.current = response.correctedQuery || null;
       } else {
         // Nếu không có query hoặc tag, dùng listArticles bình thường
         response = await api.listArticles({
@@ -363,6 +390,19 @@ export default function HomePage() {
       console.log('🔍 Checking for new posts (no cache)...');
       console.log('📅 Current latestCreatedAt:', latestCreatedAt);
       
+      // ✅ Public feed: keys-only poll endpoint (count + IDs, no enrichment)
+      if (scope === 'public') {
+        const result = await api.getNewPostsSince(latestCreatedAt);
+        console.log(`⏱️ API call took: ${Date.now() - startTime}ms`);
+        const count = result.count || 0;
+        if (count > 0) {
+          console.log(`✨ Found ${count}${result.hasMore ? '+' : ''} new posts`);
+        } else {
+          console.log('ℹ️ No new posts found');
+        }
+        return count;
+      }
+      
       // ✅ Use listArticlesNoCache to bypass cache for real-time updates
       const response = await api.listArticlesNoCache({
         scope: scope,
@@ -821,8 +861,15 @@ export default function HomePage() {
                         value={searchQuery}
                         onChange={(e) => setSearchQuery(e.target.value)}
                         onKeyPress={handleSearch}
+                        list="search-suggestions"
+                        autoComplete="off"
                         className={`search-input-gradient w-full px-5 py-3 pr-14 text-base placeholder:text-gray-400 ${isDarkMode ? 'dark-mode' : 'light-mode'}`}
                       />
+                      <datalist id="search-suggestions">
+                        {suggestions.map((s) => (
+                          <option key={`${s.kind}:${s.text}`} value={s.text} />
+                        ))}
+                      </datalist>
                       <button 
                         onClick={handleSearch}
                         className={`absolute right-3 top-1/2 -translate-y-1/2 transition-colors ${
@@ -46,6 +46,7 @@ export default function SmartGalleryPage() {
   const L = TEXT[language] || TEXT.vi;
   const navigate = useNavigate();
   const [trendingTags, setTrendingTags] = useState([]);
+  const [weeklyTags, setWeeklyTags] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
 
@@ -56,9 +57,14 @@ export default function SmartGalleryPage() {
       
       // ✅ Add cache-busting parameter for force refresh
       const cacheBuster = forceRefresh ? `&_t=${Date.now()}` : '';
-      const response = await galleryApi.getTrendingTags({ limit: 20, cacheBuster });
+      // This week (7-day window) and all time: two single-read requests in parallel
+      const [weekly, allTime] = await Promise.all([
+        galleryApi.getTrendingTags({ limit: 10, timeWindow: '7d', cacheBuster }),
+        galleryApi.getTrendingTags({ limit: 20, timeWindow: 'all', cacheBuster }),
+      ]);
       
-      setTrendingTags(response.items || []);
+      setWeeklyTags(weekly.items || []);
+      setTrendingTags(allTime.items || []);
     } catch (err) {
       console.error('Error loading trending tags:', err);
       setError(L.loadError);
@@ -123,7 +129,7 @@ export default function SmartGalleryPage() {
             <h3 className="text-xl font-bold text-red-400 mb-2">{L.error}</h3>
             <p className="text-red-300/80 mb-6">{error}</p>
             <button
-              onClick={loadTrendingTags}
+              onClick={() => loadTrendingTags(true)}
               className="bg-red-500 hover:bg-red-600 text-white px-6 py-3 rounded-xl font-medium transition-colors"
             >
               {L.tryAgain}
@@ -147,6 +153,7 @@ export default function SmartGalleryPage() {
         ) : (
           <div className="space-y-8">
             {/* Trending Tags - This Week */}
+            {weeklyTags.length > 0 && (
             <div>
               <div className="flex items-center justify-between mb-4">
                 <h2 className="text-xl font-bold text-white flex items-center gap-2">
@@ -161,7 +168,7 @@ export default function SmartGalleryPage() {
                 </button>
               </div>
               <div className="grid grid-cols-3 sm:grid-cols-4 md:grid-cols-6 lg:grid-cols-8 xl:grid-cols-10 gap-2">
-                {trendingTags.slice(0, 10).map((tag, index) => (
+                {weeklyTags.map((tag, index) => (
                   <TrendingTagCard
                     key={`week-${tag.tag_name}-${index}`}
                     tag={tag}
@@ -170,9 +177,10 @@ export default function SmartGalleryPage() {
                 ))}
               </div>
             </div>
+            )}
 
             {/* All Time Most Popular */}
-            {trendingTags.length > 10 && (
+            {trendingTags.length > 0 && (
               <div>
                 <div className="flex items-center justify-between mb-4">
                   <h2 className="text-xl font-bold text-white flex items-center gap-2">
@@ -181,7 +189,7 @@ export default function SmartGalleryPage() {
                   </h2>
                 </div>
                 <div className="grid grid-cols-3 sm:grid-cols-4 md:grid-cols-6 lg:grid-cols-8 xl:grid-cols-10 gap-2">
-                  {trendingTags.slice(10).map((tag, index) => (
+                  {trendingTags.map((tag, index) => (
                     <TrendingTagCard
                       key={`all-${tag.tag_name}-${index}`}
                       tag={tag}
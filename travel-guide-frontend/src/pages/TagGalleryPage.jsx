@@ -1,5 +1,5 @@
 // pages/TagGalleryPage.jsx
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import { ArrowLeft, MapPin, ExternalLink } from 'lucide-react';
 import { useLanguage } from '../context/LanguageContext';
@@ -20,6 +20,7 @@ const TEXT = {
     tags: 'Tags:',
     viewHome: 'Xem trang chủ',
     loadError: 'Không thể tải ảnh. Vui lòng thử lại sau.',
+    loadMore: 'Xem thêm ảnh',
   },
   en: {
     backToTrending: 'Back to Trending Tags',
@@ -35,6 +36,7 @@ const TEXT = {
     tags: 'Tags:',
     viewHome: 'View Home',
     loadError: 'Unable to load photos. Please try again later.',
+    loadMore: 'Load more photos',
   },
 };
 
@@ -47,25 +49,36 @@ export default function TagGalleryPage() {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [selectedPhoto, setSelectedPhoto] = useState(null);
+  const [nextToken, setNextToken] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  // Display keys already shown: dedupe across pages too
+  const seenKeysRef = useRef(new Set());
 
-  const loadPhotos = useCallback(async () => {
+  // token = null: first page (newest photos); else the page after it
+  const loadPhotos = useCallback(async (token = null) => {
     if (!tagName) return;
     
     try {
-      setLoading(true);
+      if (token) {
+        setLoadingMore(true);
+      } else {
+        setLoading(true);
+        seenKeysRef.current = new Set();
+      }
       setError(null);
       
       console.log('🔍 Loading photos for tag:', tagName);
       const response = await galleryApi.getArticlesByTag({ 
         tag: tagName.toLowerCase(),
-        limit: 50 
+        limit: 50,
+        nextToken: token,
       });
       
       console.log('📦 Photos response:', response);
       
       // Dedupe photos by display key (image_url || imageKeys[0] || imageKey)
       const uniquePhotos = [];
-      const seenKeys = new Set();
+      const seenKeys = seenKeysRef.current;
       
       for (const photo of (response.items || [])) {
         const displayKey = photo.image_url || photo.imageKeys?.[0] || photo.imageKey;
@@ -76,12 +89,14 @@ export default function TagGalleryPage() {
       }
       
       console.log(`✅ Deduped: ${response.items?.length || 0} → ${uniquePhotos.length} unique photos`);
-      setPhotos(uniquePhotos);
+      setPhotos((prev) => (token ? [...prev, ...uniquePhotos] : uniquePhotos));
+      setNextToken(response.nextToken || null);
     } catch (err) {
       console.error('Error loading photos:', err);
       setError(L.loadError);
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   }, [tagName, L.loadError]);
 
@@ -157,7 +172,7 @@ export default function TagGalleryPage() {
             <h3 className="text-xl font-bold text-red-400 mb-2">{L.error}</h3>
             <p className="text-red-300/80 mb-6">{error}</p>
             <button
-              onClick={loadPhotos}
+              onClick={() => loadPhotos()}
               className="bg-red-500 hover:bg-red-600 text-white px-6 py-3 rounded-xl font-medium transition-colors"
             >
               {L.tryAgain}
@@ -227,6 +242,19 @@ export default function TagGalleryPage() {
             ))}
           </div>
         )}
+
+        {/* Next page (newest first, cursor from the previous page) */}
+        {!loading && !error && nextToken && (
+          <div className="flex justify-center mt-8">
+            <button
+              onClick={() => loadPhotos(nextToken)}
+              disabled={loadingMore}
+              className="bg-[#92ADA4] hover:bg-[#7d9a91] disabled:opacity-60 text-white px-6 py-3 rounded-xl font-medium transition-colors"
+            >
+              {loadingMore ? '...' : L.loadMore}
+            </button>
+          </div>
+        )}
       </div>
 
       {/* Photo Modal */}
@@ -29,6 +29,17 @@ const getFromCache = (key) => {
 };
 const setToCache = (key, data) => requestCache.set(key, { data, timestamp: Date.now() });
 
+// ===== ETag cache: revalidate with If-None-Match, 304 → reuse the last body =====
+const etagCache = new Map(); // cacheKey -> { etag, data }
+const ETAG_CACHE_MAX = 100;
+const setEtag = (key, etag, data) => {
+  etagCache.delete(key);
+  etagCache.set(key, { etag, data });
+  if (etagCache.size > ETAG_CACHE_MAX) {
+    etagCache.delete(etagCache.keys().next().value); // bỏ entry cũ nhất
+  }
+};
+
 // ===== Fetch helper (Giữ nguyên) =====
 function authHeaders(hasBody = false) {
   const idToken = localStorage.getItem("idToken");
@@ -58,12 +69,23 @@ async function http(method, path, body, { raw = false, useCache = false } = {})
   const fullUrl = `${API_BASE}${path}`;
   console.log(`🌐 ${method} ${fullUrl}`);
 
+  const headers = authHeaders(!!body);
+  const known = method === "GET" && !raw ? etagCache.get(cacheKey) : null;
+  if (known) headers["If-None-Match"] = known.etag;
+
   const res = await fetch(fullUrl, {
     method,
-    headers: authHeaders(!!body),
+    headers,
     body: body ? JSON.stringify(body) : undefined,
   });
 
+  // ✅ 304: server confirmed our copy is current (no body downloaded/parsed)
+  if (res.status === 304 && known) {
+    console.log(`♻️ 304 Not Modified ${path}`);
+    if (useCache) setToCache(cacheKey, known.data);
+    return known.data;
+  }
+
   if (!res.ok) {
     let errMsg = `${res.status} ${res.statusText}`;
     
@@ -104,6 +126,11 @@ async function http(method, path, body, { raw = false, useCache = false } = {})
 
   const data = raw ? res : (res.status === 204 ? null : await res.json());
 
+  if (method === "GET" && !raw) {
+    const etag = res.headers.get("ETag");
+    if (etag) setEtag(cacheKey, etag, data);
+  }
+
   if (useCache && method === "GET") setToCache(cacheKey, data);
   return data;
 }
@@ -184,17 +211,28 @@ export function listArticles({ scope = "public", limit = 10, nextToken } = {}) {
   return http("GET", `/articles?${params.toString()}`, null, { useCache: true });
 }
 
-export function searchArticles({ bbox, q = "", tags = "", scope = "public", limit = 10, nextToken } = {}) {
+export function searchArticles({ bbox, q = "", tags = "", tagMode, sort, scope = "public", limit = 10, nextToken } = {}) {
   const params = new URLSearchParams();
   params.set("scope", scope);
-  if (bbox) params.set("bbox", bbox);
+  if (bbox) params.set("bbox", bbox); // "minLng,minLat,maxLng,maxLat"
   if (q) params.set("q", q);
   if (tags) params.set("tags", tags);
+  if (tagMode) params.set("tagMode", tagMode); // "any" (default) | "all"
+  if (sort) params.set("sort", sort); // "recent" (default) | "relevance" (cần q; item có score)
   if (limit) params.set("limit", String(limit));
+  // Ít kết quả vì gõ sai? Response có correctedQuery: trang sau phải gửi q=correctedQuery
   if (nextToken) params.set("nextToken", nextToken);
   return http("GET", `/search?${params.toString()}`, null, { useCache: true });
 }
 
+// Gợi ý khi gõ (địa điểm, tag, tiêu đề); không phân biệt dấu: "hoi a" -> "Hội An"
+export function suggestSearch(q, { limit = 8 } = {}) {
+  const params = new URLSearchParams();
+  params.set("q", q);
+  if (limit) params.set("limit", String(limit));
+  return http("GET", `/search/suggest?${params.toString()}`, null, { useCache: true });
+}
+
 // ===== User Articles =====
 export function getUserArticles(userId, { limit = 20, nextToken, forceRefresh = false } = {}) {
   const params = new URLSearchParams();
@@ -326,6 +364,7 @@ export function listFavoriteArticles({ limit = 10, nextToken } = {}) {
 // ===== Utils =====
 export function clearCache() {
   requestCache.clear();
+  etagCache.clear();
   console.log('🗑️ All cache cleared');
 }
 
@@ -340,6 +379,9 @@ export function clearCacheForEndpoint(path) {
   }
   
   keysToDelete.forEach(key => requestCache.delete(key));
+  for (const key of Array.from(etagCache.keys())) {
+    if (key.includes(path)) etagCache.delete(key);
+  }
   
   if (keysToDelete.length > 0) {
     console.log(`🗑️ Cleared ${keysToDelete.length} cache entries for ${path}`);
@@ -375,6 +417,16 @@ export function listArticlesNoCache({ scope = "public", limit = 10, nextToken }
   });
 }
 
+// ✨ NEW: Lightweight poll - count + IDs of approved posts newer than `since`
+// (no article bodies, no profile enrichment, no presigned URLs)
+export function getNewPostsSince(since) {
+  const params = new URLSearchParams();
+  params.set("since", since);
+  return http("GET", `/articles/new?${params.toString()}`, null, {
+    useCache: false  // ✅ NO CACHE for real-time polling
+  });
+}
+
 const articleService = {
   getUploadUrl,
   uploadToS3,
@@ -384,7 +436,9 @@ const articleService = {
   deleteArticle,
   listArticles,
   listArticlesNoCache,  // ✨ NEW
+  getNewPostsSince,     // ✨ NEW
   searchArticles,
+  suggestSearch,
   getUserArticles,  // ✨ NEW
   createArticleWithUpload,
   createArticleWithMultipleFiles,
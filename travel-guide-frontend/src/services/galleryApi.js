@@ -12,7 +12,8 @@ const API_BASE = (
  * 
  * @param {Object} options - Query options
  * @param {number} options.limit - Number of tags to return (default: 20)
- * @returns {Promise<{items: Array, total_tags: number}>}
+ * @param {string} options.timeWindow - '24h' | '7d' (photos of that window only) | 'all' (default)
+ * @returns {Promise<{items: Array, total_tags: number, window: string}>}
  * 
  * Response format:
  * {
@@ -24,13 +25,14 @@ const API_BASE = (
  *       last_updated: "2024-01-01T00:00:00Z"
  *     }
  *   ],
- *   total_tags: 245
+ *   total_tags: 245,
+ *   window: "all"
  * }
  */
-export async function getTrendingTags({ limit = 20, cacheBuster = '' } = {}) {
+export async function getTrendingTags({ limit = 20, timeWindow = 'all', cacheBuster = '' } = {}) {
   try {
     // ✅ Add cache-busting parameter to bypass CloudFront/API Gateway cache
-    const url = `${API_BASE}/gallery/trending?limit=${limit}${cacheBuster}`;
+    const url = `${API_BASE}/gallery/trending?limit=${limit}&window=${encodeURIComponent(timeWindow)}${cacheBuster}`;
     
     // ❌ KHÔNG thêm custom headers vào GET request để tránh CORS preflight
     const response = await fetch(url, {
@@ -51,7 +53,7 @@ export async function getTrendingTags({ limit = 20, cacheBuster = '' } = {}) {
 }
 
 /**
- * Get articles by tag - Query from GalleryPhotosTable
+ * Get articles by tag - newest first from the tag -> photo index
  * More reliable than searching ArticlesTable by autoTags
  * 
  * Returns all photos that contain the specified tag
@@ -59,7 +61,8 @@ export async function getTrendingTags({ limit = 20, cacheBuster = '' } = {}) {
  * @param {Object} options - Query options
  * @param {string} options.tag - Tag to search for (required)
  * @param {number} options.limit - Number of articles to return (default: 10)
- * @returns {Promise<{items: Array}>}
+ * @param {string} options.nextToken - Cursor of the next page (from the previous response)
+ * @returns {Promise<{items: Array, nextToken?: string}>}
  * 
  * Response format:
  * {
@@ -75,13 +78,16 @@ export async function getTrendingTags({ limit = 20, cacheBuster = '' } = {}) {
  *   ]
  * }
  */
-export async function getArticlesByTag({ tag, limit = 10 } = {}) {
+export async function getArticlesByTag({ tag, limit = 10, nextToken } = {}) {
   try {
     if (!tag) {
       throw new Error('tag parameter is required');
     }
     
-    const url = `${API_BASE}/gallery/articles?tag=${encodeURIComponent(tag)}&limit=${limit}`;
+    let url = `${API_BASE}/gallery/articles?tag=${encodeURIComponent(tag)}&limit=${limit}`;
+    if (nextToken) {
+      url += `&nextToken=${encodeURIComponent(nextToken)}`;
+    }
     console.log('🔍 Fetching articles by tag:', url);
     
     const response = await fetch(url, {
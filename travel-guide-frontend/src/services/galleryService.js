@@ -45,19 +45,23 @@ export async function getTrendingTags({ limit = 20 } = {}) {
 }
 
 /**
- * Get articles by tag - Query from GalleryPhotosTable
+ * Get articles by tag - newest first from the tag -> photo index
  * @param {Object} options - Query options
  * @param {string} options.tag - Tag to search for (required)
  * @param {number} options.limit - Number of articles to return (default: 10)
- * @returns {Promise<{items: Array}>}
+ * @param {string} options.nextToken - Cursor of the next page (from the previous response)
+ * @returns {Promise<{items: Array, nextToken?: string}>}
  */
-export async function getArticlesByTag({ tag, limit = 10 } = {}) {
+export async function getArticlesByTag({ tag, limit = 10, nextToken } = {}) {
   try {
     if (!tag) {
       throw new Error('tag parameter is required');
     }
     
-    const url = `${API_BASE}/gallery/articles?tag=${encodeURIComponent(tag)}&limit=${limit}&_t=${Date.now()}`;
+    let url = `${API_BASE}/gallery/articles?tag=${encodeURIComponent(tag)}&limit=${limit}&_t=${Date.now()}`;
+    if (nextToken) {
+      url += `&nextToken=${encodeURIComponent(nextToken)}`;
+    }
     console.log('🔍 Fetching articles by tag:', url);
     
     const response = await fetch(url, {